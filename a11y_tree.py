@@ -0,0 +1,263 @@
+import json
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+
+CLICKABLE_ROLES = {
+    "button",
+    "link",
+    "menuitem",
+    "menuitemcheckbox",
+    "menuitemradio",
+    "tab",
+    "checkbox",
+    "radio",
+    "switch",
+    "option",
+    "treeitem",
+}
+INPUT_ROLES = {"textbox", "searchbox", "combobox", "spinbutton"}
+TEXT_ROLES = {"text", "paragraph"}
+PRUNED_ROLES = {"generic", "none", "presentation", "group", "list", "rowgroup", "img"}
+DIALOG_ROLES = {"dialog", "alertdialog"}
+
+PRICE_RE = re.compile(r"\d[\d\s ]*(?:[.,]\d+)?\s?(?:₽|руб|р\.|\$|€|£)", re.I)
+LINE_RE = re.compile(r"^(\s*)- (.*)$")
+KEY_RE = re.compile(r'^[^\s:"\[]+(?:\s+"(?:[^"\\]|\\.)*")?(?:\s*\[[^\]]*\])*')
+ROLE_RE = re.compile(r'^(\S+?)(?:\s+"((?:[^"\\]|\\.)*)")?((?:\s*\[[^\]]*\])*)\s*$')
+
+MAX_NAME_CHARS = 120
+MAX_LINE_TEXT_CHARS = 200
+
+
+def _read_quoted(text: str) -> Tuple[str, str]:
+    if text.startswith('"'):
+        try:
+            value, end = json.JSONDecoder().raw_decode(text)
+            return str(value), text[end:]
+        except ValueError:
+            return text.strip('"'), ""
+    chars = []
+    i = 1
+    while i < len(text):
+        if text[i] == "'":
+            if text[i + 1 : i + 2] == "'":
+                chars.append("'")
+                i += 2
+                continue
+            break
+        chars.append(text[i])
+        i += 1
+    return "".join(chars), text[i + 1 :]
+
+
+def _unquote(value: str) -> str:
+    if value[:1] in ("'", '"'):
+        return _read_quoted(value)[0]
+    return value
+
+
+def _split_entry(content: str) -> Tuple[str, str]:
+    if content[:1] in ("'", '"'):
+        key, rest = _read_quoted(content)
+    else:
+        match = KEY_RE.match(content)
+        if not match:
+            return content, ""
+        key, rest = match.group(0), content[match.end():]
+    rest = rest.strip()
+    value = _unquote(rest[1:].strip()) if rest.startswith(":") else ""
+    return key, value
+
+
+def _parse_role(key: str) -> Tuple[str, str, str]:
+    match = ROLE_RE.match(key.strip())
+    if not match:
+        return key.strip(), "", ""
+    role, name, attrs = match.groups()
+    if name:
+        try:
+            name = json.loads(f'"{name}"')
+        except ValueError:
+            pass
+    return role, name or "", " ".join((attrs or "").split())
+
+
+def parse_aria_snapshot(snapshot: str) -> List[Dict[str, Any]]:
+    nodes: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, Dict[str, Any]]] = []
+    for line in snapshot.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        indent = len(match.group(1))
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        parent = stack[-1][1] if stack else None
+
+        key, value = _split_entry(match.group(2))
+        if key.startswith("/"):
+            if parent is not None:
+                parent["props"][key[1:]] = value
+            continue
+
+        role, name, attrs = _parse_role(key)
+        node = {
+            "role": role,
+            "name": name,
+            "attrs": attrs,
+            "text": value,
+            "parent": parent,
+            "children": [],
+            "props": {},
+        }
+        if parent is not None:
+            parent["children"].append(node)
+        nodes.append(node)
+        stack.append((indent, node))
+    return nodes
+
+
+def _is_pruned(node: Dict[str, Any]) -> bool:
+    return node["role"] in PRUNED_ROLES and not node["name"] and not node["text"]
+
+
+def _node_line(node: Dict[str, Any]) -> str:
+    text = node["text"][:MAX_LINE_TEXT_CHARS]
+    if node["role"] in TEXT_ROLES or (node["role"] in PRUNED_ROLES and not node["name"]):
+        return text
+    line = node["role"]
+    if node["name"]:
+        line += f' "{node["name"][:MAX_NAME_CHARS]}"'
+    if node["attrs"]:
+        line += f" {node['attrs']}"
+    if text:
+        line += f": {text}"
+    return line
+
+
+def _in_dialog(node: Dict[str, Any]) -> bool:
+    parent = node["parent"]
+    while parent is not None:
+        if parent["role"] in DIALOG_ROLES:
+            return True
+        parent = parent["parent"]
+    return False
+
+
+def _near_price(node: Dict[str, Any]) -> bool:
+    parent = node["parent"]
+    if parent is None:
+        return False
+    if "has_price" not in parent:
+        parent["has_price"] = any(
+            PRICE_RE.search(f"{child['name']} {child['text']}") for child in parent["children"]
+        )
+    return parent["has_price"]
+
+
+def build_a11y_state(
+    snapshot: str,
+    max_elements: int,
+    max_inputs: int,
+    max_text_chars: int,
+) -> Dict[str, Any]:
+    nodes = parse_aria_snapshot(snapshot)
+    elements: List[Dict[str, Any]] = []
+    input_elements: List[Dict[str, Any]] = []
+    occurrences: Dict[Tuple[str, str], int] = {}
+    role_occurrences: Dict[str, int] = {}
+    tree: List[Dict[str, Any]] = []
+    text_lines: List[str] = []
+    text_chars = 0
+
+    for node in nodes:
+        parent = node["parent"]
+        if parent is None:
+            node["depth"] = 0
+        else:
+            node["depth"] = parent["depth"] + (0 if _is_pruned(parent) else 1)
+        if _is_pruned(node):
+            continue
+
+        role, name = node["role"], node["name"]
+        nth = occurrences.get((role, name), 0)
+        occurrences[(role, name)] = nth + 1
+        role_nth = role_occurrences.get(role, 0)
+        role_occurrences[role] = role_nth + 1
+        if not name:
+            # get_by_role without a name matches every element of the role.
+            nth = role_nth
+
+        line = _node_line(node)
+        kind, element = None, None
+        if role in CLICKABLE_ROLES and len(elements) < max_elements:
+            kind = "clickable"
+            element = {
+                "index": len(elements),
+                "tag": role,
+                "text": name[:MAX_NAME_CHARS],
+                "href": node["props"].get("url"),
+                "selector": "",
+                "nth": nth,
+                "frame": 0,
+                "role": role,
+                "accessible_name": name,
+                "signals": {
+                    "in_viewport": False,
+                    "in_dialog": _in_dialog(node),
+                    "near_price": _near_price(node),
+                },
+            }
+            elements.append(element)
+        elif role in INPUT_ROLES and len(input_elements) < max_inputs:
+            kind = "input"
+            element = {
+                "index": len(input_elements),
+                "type": role,
+                "placeholder": node["props"].get("placeholder", ""),
+                "name": "",
+                "label": name[:MAX_NAME_CHARS],
+                "selector": "",
+                "nth": nth,
+                "frame": 0,
+                "role": role,
+                "accessible_name": name,
+            }
+            input_elements.append(element)
+        elif text_chars + len(line) > max_text_chars:
+            continue
+        else:
+            text_chars += len(line) + 1
+
+        tree.append({"depth": node["depth"], "line": line, "kind": kind, "element": element})
+        if element is None:
+            text_lines.append("  " * node["depth"] + line)
+
+    return {
+        "body_text": "\n".join(text_lines),
+        "clickable_elements": elements,
+        "input_elements": input_elements,
+        "a11y_tree": tree,
+    }
+
+
+def render_a11y_tree(
+    tree: List[Dict[str, Any]],
+    clickables: List[Dict[str, Any]],
+    inputs: List[Dict[str, Any]],
+) -> str:
+    visible = {id(el) for el in clickables} | {id(inp) for inp in inputs}
+    lines = []
+    for node in tree:
+        element: Optional[Dict[str, Any]] = node["element"]
+        prefix = ""
+        if element is not None:
+            if id(element) not in visible:
+                continue
+            if node["kind"] == "clickable":
+                prefix = f"[{element['index']}] "
+            else:
+                prefix = f"[input {element['index']}] "
+        lines.append("  " * node["depth"] + prefix + node["line"])
+    return "\n".join(lines) + "\n"
@@ -1,18 +1,69 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import json
-from openai import OpenAI
-from config import OPENAI_API_KEY, OPENAI_MODEL, MAX_STEPS
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from config import (
+    MAX_STEPS,
+    TRAJECTORY_CACHE_ENABLED,
+    STREAMING_ENABLED,
+    STREAM_RESTARTS,
+    ELEMENT_RANKING_ENABLED,
+    CHECKPOINT_ENABLED,
+    CHECKPOINT_STORAGE_EVERY_STEPS,
+)
 from browser_controller import BrowserController
-from memory import ConversationMemory
+from memory import ConversationMemory, ProgressMonitor
+from model_router import ModelRouter
+from observation_diff import ObservationDiffer
+from history import ConversationHistory
+from trajectory_cache import TrajectoryCache, TrajectorySession
+from checkpoint import CheckpointStore, RunCheckpoint
+from element_ranking import rank_elements
 from tools import get_tool_schemas, execute_tool
-import json
+from approvals import ConsoleApprover
+from llm_client import get_llm_client
+from tracing import tracer, llm_usage
+from streaming import ToolCallStream
+from token_counter import get_encoding, tokenizer_name
 
 
 class AutonomousAgent:
-    def __init__(self, browser: BrowserController):
+    def __init__(
+        self,
+        browser: BrowserController,
+        client: Optional[Any] = None,
+        trajectory_cache: Optional[TrajectoryCache] = None,
+        approver: Optional[Any] = None,
+        checkpoints: Optional[CheckpointStore] = None,
+    ):
         self.browser = browser
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.approver = approver or ConsoleApprover()
+        self.client = client or get_llm_client()
         self.memory = ConversationMemory(max_steps_in_memory=10)
+        self.monitor = ProgressMonitor()
+        self.router = ModelRouter()
+        self.current_model = self.router.strong_model
+        self.differ = ObservationDiffer()
+        self.history: ConversationHistory = None
+        self.log_prefix = ""
+        self.actions_per_call: List[int] = []
+        if trajectory_cache is None and TRAJECTORY_CACHE_ENABLED:
+            trajectory_cache = TrajectoryCache()
+        self.trajectory_cache = trajectory_cache
+        self.trajectory: Optional[TrajectorySession] = None
+        if checkpoints is None and CHECKPOINT_ENABLED:
+            checkpoints = CheckpointStore()
+        self.checkpoints = checkpoints
+        self.checkpoint: Optional[RunCheckpoint] = None
+        self.storage_checkpoint: Optional[Tuple[str, int]] = None
+        self.first_step = 1
+        self.ranking_stats: List[Dict[str, Any]] = []
+        self.step_timings: List[Dict[str, Any]] = []
+        self.streaming = STREAMING_ENABLED
+        self._phase_children: List[List[float]] = []
+        self.system_prompt = self._build_system_prompt()
+        self.tools = get_tool_schemas()
 
     def _build_system_prompt(self) -> str:
         return (
@@ -59,6 +110,16 @@ class AutonomousAgent:
             "visible, overlays etc.), change your strategy (try other elements, inputs "
             "or navigation) instead of repeating the same failing action.\n\n"
 
+            "On search or list pages, when several candidates look plausible, use "
+            "explore_links to preview them together in one step instead of opening "
+            "and going back from each one.\n\n"
+
+            "You may return several tool calls in one response when the next actions "
+            "are obvious (for example: type into the search field with press_enter, "
+            "then click a result only if you already see it). They are executed in "
+            "order; the rest are skipped as soon as one fails or the page navigates, "
+            "because element indices are then no longer valid.\n\n"
+
             "Do not rely on specific labels, selectors or URLs. Base all decisions "
             "only on the visible texts, structure and on the observations you receive.\n"
         )
@@ -68,115 +129,536 @@ class AutonomousAgent:
         tools: List[Dict[str, Any]],
     ):
         return self.client.chat.completions.create(
-            model=OPENAI_MODEL,
+            model=self.current_model,
             messages=messages,
             tools=tools,
             tool_choice="auto",
         )
-    def run(self, user_task: str):
-        tools = get_tool_schemas()
-        system_prompt = self._build_system_prompt()
 
-        messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": (
-                    f"User task: {user_task}\n"
-                    "You will receive observations of the current page and "
-                    "must use tools to achieve the goal."
-                ),
-            },
-        ]
-
-        for step in range(1, MAX_STEPS + 1):
-            observation = self.browser.get_observation()
-            memory_text = self.memory.as_text()
-
-            obs_content = (
-                f"STEP {step}.\n"
-                f"Task: {user_task}\n\n"
-                f"Short memory of previous steps:\n{memory_text}\n\n"
-                f"Current page:\n"
-                f"URL: {observation['url']}\n"
-                f"Title: {observation['title']}\n"
-                f"Body (truncated): {observation['body_text']}\n\n"
-                f"Clickable elements (index, tag, text, href):\n"
+    def _open_stream(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]):
+        return self.client.chat.completions.create(
+            model=self.current_model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+    def _stream_model_call(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        batch: Dict[str, Any],
+    ):
+        for attempt in range(STREAM_RESTARTS + 1):
+            stream = ToolCallStream()
+            try:
+                for chunk in self._open_stream(messages, tools):
+                    for tool_call in stream.feed(chunk):
+                        self._dispatch_tool_call(batch, tool_call)
+            except Exception as e:
+                if self._stream_broken(stream, e, attempt):
+                    return stream.response()
+                continue
+            for tool_call in stream.finish():
+                self._dispatch_tool_call(batch, tool_call)
+            return stream.response()
+
+    def _stream_broken(self, stream: ToolCallStream, error: Exception, attempt: int) -> bool:
+        if stream.ready:
+            # Actions already ran in the browser; keep them in history instead of failing.
+            self._log(
+                f"[AGENT] Model stream broke after {len(stream.ready)} dispatched "
+                f"tool calls: {error}"
             )
+            return True
+        if attempt == STREAM_RESTARTS:
+            raise error
+        self._log(f"[AGENT] Model stream broke before any tool call, restarting: {error}")
+        return False
+
+    def _log(self, text: str) -> None:
+        print(f"{self.log_prefix}{text}")
+
+    @contextmanager
+    def _phase(self, name: str, **attrs):
+        timings = self.step_timings[-1]
+        settle_before = getattr(self.browser, "settle_ms_total", 0.0)
+        self._phase_children.append([0.0, 0.0])
+        started = time.perf_counter()
+        try:
+            with tracer.span(name, **attrs) as span:
+                yield span
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            nested_ms, nested_settle_ms = self._phase_children.pop()
+            settle_total_ms = getattr(self.browser, "settle_ms_total", 0.0) - settle_before
+            settle_ms = settle_total_ms - nested_settle_ms
+            if settle_ms:
+                timings["settle"] = timings.get("settle", 0.0) + settle_ms
+            timings[name] = timings.get(name, 0.0) + elapsed_ms - nested_ms - settle_ms
+            if self._phase_children:
+                self._phase_children[-1][0] += elapsed_ms
+                self._phase_children[-1][1] += settle_total_ms
 
-            for el in observation["clickable_elements"]:
+    def _start_run(
+        self, user_task: str, resume: Optional[Dict[str, Any]] = None
+    ) -> ConversationHistory:
+        self.differ.reset()
+        self.monitor.reset()
+        self.router.reset()
+        self.actions_per_call = []
+        self.ranking_stats = []
+        self.step_timings = []
+        self._phase_children = []
+        tracer.start_run(user_task)
+        tracer.event("tokenizer", encoding=tokenizer_name())
+        if get_encoding() is None:
+            self._log(
+                "[AGENT] tiktoken is unavailable, token budgets use the "
+                f"{tokenizer_name()} estimate"
+            )
+        self.trajectory = (
+            self.trajectory_cache.start_run(user_task, self._page_url())
+            if self.trajectory_cache and resume is None
+            else None
+        )
+        self.history = ConversationHistory(
+            self.system_prompt,
+            (
+                f"User task: {user_task}\n"
+                "You will receive observations of the current page and "
+                "must use tools to achieve the goal."
+            ),
+        )
+        self.first_step = 1
+        self.checkpoint = None
+        self.storage_checkpoint = None
+        if resume is not None:
+            self.history.turns = resume["turns"]
+            self.memory.steps = resume["memory"]
+            self.first_step = resume["step"] + 1
+        if self.checkpoints is not None:
+            self.checkpoint = (
+                self.checkpoints.reopen(resume)
+                if resume is not None
+                else self.checkpoints.create(user_task)
+            )
+            self._log(f"[AGENT] Checkpoint log: {self.checkpoint.path}")
+        return self.history
+
+    def _page_url(self) -> str:
+        try:
+            return self.browser.page.url
+        except Exception:
+            return ""
+
+    def _load_checkpoint(self, run_id: Optional[str]) -> Dict[str, Any]:
+        if self.checkpoints is None:
+            raise RuntimeError("Checkpointing is disabled")
+        run_id = run_id or self.checkpoints.latest()
+        if run_id is None:
+            raise ValueError("No unfinished run to resume")
+        state = self.checkpoints.load(run_id)
+        if state["status"] is not None:
+            raise ValueError(f"Run {run_id} already ended with status {state['status']}")
+        self._log(f"[AGENT] Resuming run {run_id} after step {state['step']} at {state['url']}")
+        return state
+
+    def _write_checkpoint(self, step: int, storage_state: Optional[Dict[str, Any]]) -> None:
+        try:
+            self.checkpoint.step(
+                step,
+                self.history.turns[-1],
+                self.memory.steps,
+                self._page_url(),
+                storage_state,
+            )
+        except (OSError, TypeError, ValueError) as e:
+            self._log(f"[AGENT] Checkpoint write failed: {e}")
+
+    def _storage_state_due(self, step: int) -> bool:
+        try:
+            url = self.browser.page.url
+        except Exception:
+            return False
+        last = self.storage_checkpoint
+        if (
+            last is not None
+            and last[0] == url
+            and step - last[1] < CHECKPOINT_STORAGE_EVERY_STEPS
+        ):
+            return False
+        self.storage_checkpoint = (url, step)
+        return True
+
+    def _checkpoint(self, step: int) -> None:
+        if self.checkpoint is None:
+            return
+        with self._phase("checkpoint"):
+            storage_state = None
+            if self._storage_state_due(step):
+                try:
+                    storage_state = self.browser.storage_state()
+                except Exception:
+                    pass
+            self._write_checkpoint(step, storage_state)
+
+    def _begin_step(
+        self, step: int, user_task: str, observation: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        memory_text = self.memory.as_text()
+
+        obs_content = f"STEP {step}.\n\n" + self.monitor.hint()
+        if ELEMENT_RANKING_ENABLED:
+            with tracer.span("rank_elements") as span:
+                kept, stats = rank_elements(
+                    observation["clickable_elements"],
+                    user_task,
+                    memory_text,
+                    serializer=self.differ.serializer,
+                )
+                span.set(**stats)
+            observation["clickable_elements"] = kept
+            self.browser.restrict_elements(kept)
+            self.ranking_stats.append(stats)
+            if stats["pruned"]:
                 obs_content += (
-                    f"  [{el['index']}] <{el['tag']}> "
-                    f"text='{el['text']}' href={el['href']}\n"
+                    f"Showing {stats['kept']} of {stats['candidates']} clickable elements, "
+                    "selected by relevance to the task.\n\n"
                 )
+        if self.history.needs_full_observation():
+            self.differ.reset()
+        page_content, full = self.differ.render(observation)
+        obs_content += page_content
 
-            obs_content += "\nInput elements (index, type, placeholder, label, name):\n"
-            for inp in observation.get("input_elements", []):
-                obs_content += (
-                    f"  [{inp['index']}] type={inp['type']} "
-                    f"placeholder='{inp['placeholder']}' "
-                    f"label='{inp['label']}' "
-                    f"name='{inp['name']}'\n"
+        self.history.start_turn(step, observation, obs_content, full)
+        return self.history.build()
+
+    def _assistant_message(self, msg) -> Dict[str, Any]:
+        assistant_message: Dict[str, Any] = {
+            "role": "assistant",
+            "content": msg.content or "",
+        }
+
+        if msg.tool_calls:
+            assistant_message["tool_calls"] = []
+            for tc in msg.tool_calls:
+                assistant_message["tool_calls"].append(
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {
+                            "name": tc.function.name,
+                            "arguments": tc.function.arguments,
+                        },
+                    }
                 )
+        return assistant_message
 
-            messages.append({"role": "user", "content": obs_content})
-            #print(obs_content)
+    def _record_tool_result(
+        self,
+        observation: Dict[str, Any],
+        tool_call,
+        tool_name: str,
+        args_dict: Dict[str, Any],
+        result_text: str,
+    ) -> None:
+        self.memory.add_step(
+            observation=observation,
+            action={"tool": tool_name, "args": args_dict},
+            result=result_text,
+        )
+        self.monitor.record_action(tool_name, args_dict, result_text)
+        self.history.add_action({"tool": tool_name, "args": args_dict}, result_text)
+        if self.trajectory is not None:
+            self.trajectory.record(observation, tool_name, args_dict, result_text)
 
-            response = self._make_model_call(messages, tools)
-            msg = response.choices[0].message
+        self.history.add_message(
+            {
+                "role": "tool",
+                "name": tool_name,
+                "tool_call_id": tool_call.id,
+                "content": result_text,
+            }
+        )
+
+    def _replay_message(self, step: int, observation: Dict[str, Any]):
+        if self.trajectory is None:
+            return None
+        replay = self.trajectory.next_replay(observation)
+        if replay is None:
+            return None
+        tool_name, args = replay
+        self._log(f"[AGENT] Replaying cached step: {tool_name} {args}")
+        tool_call = SimpleNamespace(
+            id=f"replay_{step}",
+            function=SimpleNamespace(
+                name=tool_name, arguments=json.dumps(args, ensure_ascii=False)
+            ),
+        )
+        return SimpleNamespace(content="", tool_calls=[tool_call])
+
+    def _finish_run(self, finished: Optional[str], status: Optional[str] = None) -> None:
+        status = status or ("finished" if finished is not None else "max_steps")
+        tracer.end_run(status)
+        self._log(f"[AGENT] Progress monitor: {self.monitor.stats}")
+        self._log(f"[AGENT] Model routing: {self.router.snapshot()}")
+        if self.trajectory is not None:
+            self.trajectory.finish(finished is not None)
+        if self.checkpoint is not None:
+            if status == "error":
+                self.checkpoint.close()
+                self._log(f"[AGENT] Run {self.checkpoint.run_id} can be resumed")
+            else:
+                self.checkpoint.finish(status)
+            self.checkpoint = None
 
-            assistant_message: Dict[str, Any] = {
-                "role": "assistant",
-                "content": msg.content or "",
+    def _abort_run(self) -> None:
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+            self._log(f"[AGENT] Run {self.checkpoint.run_id} can be resumed")
+            self.checkpoint = None
+        tracer.end_run("error")
+
+    def _stalled(self, step: int, diagnostic: str) -> Dict[str, Any]:
+        self._finish_run(None, status="stalled")
+        self._log(f"\n[AGENT] {diagnostic}")
+        return {
+            "status": "stalled",
+            "summary": diagnostic,
+            "steps": step,
+            "steps_saved": self.monitor.stats["steps_saved"],
+        }
+
+    def _model_failed(self, step: int, error: Exception) -> Dict[str, Any]:
+        self._finish_run(None, status="error")
+        self._log(f"\n[AGENT] Model call failed after retries: {error}")
+        return {"status": "error", "summary": str(error), "steps": step}
+
+    def _record_skipped_tool_call(self, tool_call, tool_name: str, reason: str) -> None:
+        self._log(f"[AGENT] Skipping tool {tool_name}: {reason}")
+        self.history.add_message(
+            {
+                "role": "tool",
+                "name": tool_name,
+                "tool_call_id": tool_call.id,
+                "content": f"Skipped: not executed because {reason}.",
             }
+        )
 
-            if msg.tool_calls:
-                assistant_message["tool_calls"] = []
-                for tc in msg.tool_calls:
-                    assistant_message["tool_calls"].append(
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments,
-                            },
-                        }
-                    )
-
-            messages.append(assistant_message)
-
-            if not msg.tool_calls:
-                if msg.content:
-                    print(f"[MODEL] {msg.content}")
-                continue
+    def _batch_stop_reason(self, result_text: str, state_before, state_after) -> Optional[str]:
+        if result_text.startswith("TASK_FINISHED:"):
+            return "the task was finished"
+        if result_text.startswith(("ERROR", "User denied", "Unknown tool", "Blocked:")):
+            return "a previous action in this turn failed"
+        if state_before != state_after:
+            return "the page navigated and element indices changed"
+        return None
 
-            tool_call = msg.tool_calls[0]
-            tool_name = tool_call.function.name
-            args_dict: Dict[str, Any] = json.loads(tool_call.function.arguments or "{}")
+    def _new_batch(self, observation: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "observation": observation,
+            "started": time.perf_counter(),
+            "entries": [],
+            "executed": 0,
+            "finished": None,
+            "stop_reason": None,
+        }
 
-            print(f"[AGENT] Calling tool {tool_name} with args {args_dict}")
-            result_text = execute_tool(self.browser, tool_name, args_dict)
-            print(f"[TOOL RESULT] {result_text}")
+    def _before_tool(self, batch: Dict[str, Any], tool_call) -> Optional[Dict[str, Any]]:
+        tool_name = tool_call.function.name
+        if batch["stop_reason"] is not None:
+            batch["entries"].append(
+                {"tool_call": tool_call, "tool_name": tool_name, "skipped": batch["stop_reason"]}
+            )
+            return None
 
-            self.memory.add_step(
-                observation=observation,
-                action={"tool": tool_name, "args": args_dict},
-                result=result_text,
+        try:
+            args_dict: Dict[str, Any] = json.loads(tool_call.function.arguments or "{}")
+        except ValueError as e:
+            self.router.escalate("invalid_json")
+            entry = {
+                "tool_call": tool_call,
+                "tool_name": tool_name,
+                "args": {},
+                "state_before": None,
+            }
+            self._after_tool(
+                batch, entry, f"ERROR executing {tool_name}: invalid JSON arguments ({e})"
             )
+            return None
+        if not batch["executed"]:
+            self.step_timings[-1]["first_action_ms"] = (
+                time.perf_counter() - batch["started"]
+            ) * 1000
+        entry = {
+            "tool_call": tool_call,
+            "tool_name": tool_name,
+            "args": args_dict,
+            "state_before": self.browser.page_state_token(),
+        }
+        blocked = self.monitor.check_action(tool_name, args_dict)
+        if blocked:
+            self._after_tool(batch, entry, blocked)
+            return None
+        self._log(f"[AGENT] Calling tool {tool_name} with args {args_dict}")
+        return entry
 
-            messages.append(
-                {
-                    "role": "tool",
-                    "name": tool_name,
-                    "tool_call_id": tool_call.id,
-                    "content": result_text,
-                }
+    def _after_tool(self, batch: Dict[str, Any], entry: Dict[str, Any], result_text: str) -> None:
+        batch["executed"] += 1
+        self.router.note_tool_result(result_text)
+        self._log(f"[TOOL RESULT] {result_text}")
+        entry["result"] = result_text
+        batch["entries"].append(entry)
+        if result_text.startswith("TASK_FINISHED:"):
+            batch["finished"] = result_text
+        batch["stop_reason"] = self._batch_stop_reason(
+            result_text, entry["state_before"], self.browser.page_state_token()
+        )
+
+    def _dispatch_tool_call(self, batch: Dict[str, Any], tool_call) -> None:
+        entry = self._before_tool(batch, tool_call)
+        if entry is None:
+            return
+        with self._phase("tool", tool=entry["tool_name"]) as span:
+            result_text = execute_tool(
+                self.browser, entry["tool_name"], entry["args"], self.approver
             )
+            span.set(result=result_text[:200])
+        self._after_tool(batch, entry, result_text)
+
+    def _undispatched_tool_calls(self, batch: Dict[str, Any], msg) -> List[Any]:
+        return (msg.tool_calls or [])[len(batch["entries"]):]
+
+    def _record_batch(self, batch: Dict[str, Any]) -> Optional[str]:
+        for entry in batch["entries"]:
+            if "skipped" in entry:
+                self._record_skipped_tool_call(
+                    entry["tool_call"], entry["tool_name"], entry["skipped"]
+                )
+            else:
+                self._record_tool_result(
+                    batch["observation"],
+                    entry["tool_call"],
+                    entry["tool_name"],
+                    entry["args"],
+                    entry["result"],
+                )
+        self.actions_per_call.append(batch["executed"])
+        return batch["finished"]
+
+    def time_to_first_action(self) -> float:
+        samples = [t["first_action_ms"] for t in self.step_timings if "first_action_ms" in t]
+        return sum(samples) / len(samples) if samples else 0.0
+
+    def observation_cache_hits(self) -> int:
+        return sum(1 for t in self.step_timings if t.get("observation_cached"))
+
+    def actions_per_llm_call(self) -> float:
+        if not self.actions_per_call:
+            return 0.0
+        return sum(self.actions_per_call) / len(self.actions_per_call)
+
+    def resume(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        state = self._load_checkpoint(run_id)
+        self.browser.restore_checkpoint(state["url"], state["storage_state"])
+        return self.run(state["task"], resume=state)
+
+    def run(self, user_task: str, resume: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._start_run(user_task, resume)
+        try:
+            return self._run_steps(user_task)
+        finally:
+            self._abort_run()
+
+    def _start_step(self, step: int) -> None:
+        self.step_timings.append({"step": step})
+        tracer.set_step(step)
+
+    def _note_observation(self, span) -> None:
+        cached = getattr(self.browser, "last_observation_cached", False)
+        self.step_timings[-1]["observation_cached"] = cached
+        span.set(cached=cached)
+
+    def _check_progress(self, step: int, observation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        stalled = self.monitor.observe(step, observation)
+        if stalled:
+            return self._stalled(step, stalled)
+        if self.monitor.warnings:
+            self.router.escalate("stall")
+        return None
+
+    def _prepare_step(self, step: int, user_task: str, observation: Dict[str, Any]):
+        with self._phase("prompt_build"):
+            messages = self._begin_step(step, user_task, observation)
+        batch = self._new_batch(observation)
+        msg = self._replay_message(step, observation)
+        if msg is None:
+            self.current_model = self.router.choose(observation)
+        return messages, batch, msg
+
+    def _call_model(self, messages: List[Dict[str, Any]], batch: Dict[str, Any]):
+        with self._phase("model", model=self.current_model) as span:
+            if self.streaming:
+                response = self._stream_model_call(messages, self.tools, batch)
+            else:
+                response = self._make_model_call(messages, self.tools)
+            span.set(**llm_usage(response))
+        return response
+
+    def _model_message(self, step: int, messages: List[Dict[str, Any]], response):
+        self.router.record(
+            self.current_model, self.step_timings[-1]["model"], llm_usage(response)
+        )
+        self.history.record_prompt_tokens(step, messages, getattr(response, "usage", None))
+        return response.choices[0].message
+
+    def _end_step(self, msg, batch: Dict[str, Any]) -> Optional[str]:
+        self.history.add_message(self._assistant_message(msg))
+        if not msg.tool_calls:
+            self.router.escalate("low_confidence")
+            self.actions_per_call.append(0)
+            if msg.content:
+                self._log(f"[MODEL] {msg.content}")
+            return None
+        return self._record_batch(batch)
+
+    def _finished(self, step: int, finished: str) -> Dict[str, Any]:
+        self._finish_run(finished)
+        self._log("\n[AGENT] Task finished.")
+        self._log(finished)
+        return {"status": "finished", "summary": finished, "steps": step}
+
+    def _out_of_steps(self) -> Dict[str, Any]:
+        self._finish_run(None)
+        self._log("\n[AGENT] Reached max steps without explicitly finishing the task.")
+        return {"status": "max_steps", "summary": "", "steps": MAX_STEPS}
+
+    def _run_steps(self, user_task: str) -> Dict[str, Any]:
+        for step in range(self.first_step, MAX_STEPS + 1):
+            self._start_step(step)
+            with self._phase("extraction") as span:
+                observation = self.browser.get_observation()
+                self._note_observation(span)
+            stopped = self._check_progress(step, observation)
+            if stopped:
+                return stopped
+
+            messages, batch, msg = self._prepare_step(step, user_task, observation)
+            if msg is None:
+                try:
+                    response = self._call_model(messages, batch)
+                except Exception as e:
+                    return self._model_failed(step, e)
+                msg = self._model_message(step, messages, response)
 
-            if result_text.startswith("TASK_FINISHED:"):
-                print("\n[AGENT] Task finished.")
-                print(result_text)
-                return
+            for tool_call in self._undispatched_tool_calls(batch, msg):
+                self._dispatch_tool_call(batch, tool_call)
+            finished = self._end_step(msg, batch)
+            self._checkpoint(step)
+            if finished:
+                return self._finished(step, finished)
 
-        print("\n[AGENT] Reached max steps without explicitly finishing the task.")
+        return self._out_of_steps()
@@ -0,0 +1,178 @@
+import asyncio
+import importlib
+import statistics
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Callable
+from config import APPROVAL_POLICY, APPROVAL_TIMEOUT_S
+
+APPROVE_ANSWERS = ("y", "yes", "д", "да")
+
+Policy = Callable[[str, Dict[str, Any]], Optional[bool]]
+
+
+def ask_policy(tool_name: str, tool_args: Dict[str, Any]) -> Optional[bool]:
+    return None
+
+
+def allow_policy(tool_name: str, tool_args: Dict[str, Any]) -> Optional[bool]:
+    return True
+
+
+def deny_policy(tool_name: str, tool_args: Dict[str, Any]) -> Optional[bool]:
+    return False
+
+
+BUILTIN_POLICIES = {"ask": ask_policy, "allow": allow_policy, "deny": deny_policy}
+
+
+def load_policy(spec: str = APPROVAL_POLICY) -> Policy:
+    if spec in BUILTIN_POLICIES:
+        return BUILTIN_POLICIES[spec]
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def confirm_prompt(tool_name: str, tool_args: Dict[str, Any]) -> str:
+    return (
+        f"[SECURITY] Модель хочет выполнить потенциально опасное действие "
+        f"{tool_name}({tool_args}). Разрешить? [y/N]: "
+    )
+
+
+_console_lock = threading.Lock()
+
+
+def _ask_console(tool_name: str, tool_args: Dict[str, Any]) -> bool:
+    with _console_lock:
+        answer = input(confirm_prompt(tool_name, tool_args))
+    return answer.strip().lower() in APPROVE_ANSWERS
+
+
+class ConsoleApprover:
+    def __init__(self, policy: Optional[Policy] = None):
+        self.policy = policy or load_policy()
+
+    def approve(self, tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        decision = self.policy(tool_name, tool_args)
+        if decision is not None:
+            return decision
+        return _ask_console(tool_name, tool_args)
+
+    async def approve_async(self, tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        decision = self.policy(tool_name, tool_args)
+        if decision is not None:
+            return decision
+        return await asyncio.to_thread(_ask_console, tool_name, tool_args)
+
+
+class TaskApprover:
+    def __init__(self, queue: "ApprovalQueue", task_id: Any):
+        self.queue = queue
+        self.task_id = task_id
+
+    def approve(self, tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        raise RuntimeError("Queued approvals are only available to async agents")
+
+    async def approve_async(self, tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        return await self.queue.request(tool_name, tool_args, task_id=self.task_id)
+
+
+class ApprovalQueue:
+    def __init__(self, policy: Optional[Policy] = None, timeout_s: float = APPROVAL_TIMEOUT_S):
+        self.policy = policy or load_policy()
+        self.timeout_s = timeout_s
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.latencies_ms: List[float] = []
+        self.max_depth = 0
+        self.stats = {
+            "requested": 0,
+            "approved": 0,
+            "denied": 0,
+            "expired": 0,
+            "policy_approved": 0,
+            "policy_denied": 0,
+        }
+        self._lock = threading.Lock()
+
+    def for_task(self, task_id: Any) -> TaskApprover:
+        return TaskApprover(self, task_id)
+
+    async def request(
+        self, tool_name: str, tool_args: Dict[str, Any], task_id: Any = None
+    ) -> bool:
+        decision = self.policy(tool_name, tool_args)
+        if decision is not None:
+            with self._lock:
+                self.stats["policy_approved" if decision else "policy_denied"] += 1
+            return decision
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = uuid.uuid4().hex[:8]
+        created = time.time()
+        with self._lock:
+            self.stats["requested"] += 1
+            self.pending[request_id] = {
+                "id": request_id,
+                "task_id": task_id,
+                "tool": tool_name,
+                "args": tool_args,
+                "created": created,
+                "future": future,
+                "loop": loop,
+            }
+            self.max_depth = max(self.max_depth, len(self.pending))
+        print(f"[APPROVAL] {request_id} task {task_id}: {tool_name}({tool_args}) is waiting")
+
+        try:
+            approved = await asyncio.wait_for(future, self.timeout_s)
+            outcome = "approved" if approved else "denied"
+        except asyncio.TimeoutError:
+            approved, outcome = False, "expired"
+        with self._lock:
+            self.pending.pop(request_id, None)
+            self.stats[outcome] += 1
+            self.latencies_ms.append((time.time() - created) * 1000)
+        print(f"[APPROVAL] {request_id} {outcome}")
+        return approved
+
+    def resolve(self, request_id: str, approved: bool) -> bool:
+        with self._lock:
+            entry = self.pending.get(request_id)
+        if entry is None or entry["future"].done():
+            return False
+
+        def _set(future: asyncio.Future) -> None:
+            if not future.done():
+                future.set_result(approved)
+
+        entry["loop"].call_soon_threadsafe(_set, entry["future"])
+        return True
+
+    def list_pending(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "id": entry["id"],
+                    "task_id": entry["task_id"],
+                    "tool": entry["tool"],
+                    "args": entry["args"],
+                    "waiting_s": round(now - entry["created"], 1),
+                }
+                for entry in self.pending.values()
+            ]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+            metrics: Dict[str, Any] = dict(self.stats)
+            metrics["pending"] = len(self.pending)
+            metrics["max_pending"] = self.max_depth
+        if latencies:
+            metrics["latency_ms_p50"] = round(statistics.median(latencies), 1)
+            metrics["latency_ms_p95"] = round(latencies[int(0.95 * (len(latencies) - 1))], 1)
+            metrics["latency_ms_max"] = round(latencies[-1], 1)
+        return metrics
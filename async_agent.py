@@ -0,0 +1,138 @@
+from typing import List, Dict, Any, Optional
+from config import MAX_STEPS, STREAM_RESTARTS
+from agent import AutonomousAgent
+from async_browser_controller import AsyncBrowserController
+from tools import execute_tool_async
+from tracing import llm_usage
+from streaming import ToolCallStream
+from llm_client import AsyncLLMClient
+from trajectory_cache import TrajectoryCache
+
+
+class AsyncAutonomousAgent(AutonomousAgent):
+    def __init__(
+        self,
+        browser: AsyncBrowserController,
+        client: Optional[Any] = None,
+        approver: Optional[Any] = None,
+        trajectory_cache: Optional[TrajectoryCache] = None,
+    ):
+        super().__init__(
+            browser,
+            client=client or AsyncLLMClient(),
+            trajectory_cache=trajectory_cache,
+            approver=approver,
+        )
+
+    async def _make_model_call(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+    ):
+        return await self.client.chat.completions.create(
+            model=self.current_model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+        )
+
+    async def _open_stream(self, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]):
+        return await self.client.chat.completions.create(
+            model=self.current_model,
+            messages=messages,
+            tools=tools,
+            tool_choice="auto",
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+    async def _stream_model_call(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: List[Dict[str, Any]],
+        batch: Dict[str, Any],
+    ):
+        for attempt in range(STREAM_RESTARTS + 1):
+            stream = ToolCallStream()
+            try:
+                async for chunk in await self._open_stream(messages, tools):
+                    for tool_call in stream.feed(chunk):
+                        await self._dispatch_tool_call(batch, tool_call)
+            except Exception as e:
+                if self._stream_broken(stream, e, attempt):
+                    return stream.response()
+                continue
+            for tool_call in stream.finish():
+                await self._dispatch_tool_call(batch, tool_call)
+            return stream.response()
+
+    async def _dispatch_tool_call(self, batch: Dict[str, Any], tool_call) -> None:
+        entry = self._before_tool(batch, tool_call)
+        if entry is None:
+            return
+        with self._phase("tool", tool=entry["tool_name"]) as span:
+            result_text = await execute_tool_async(
+                self.browser, entry["tool_name"], entry["args"], self.approver
+            )
+            span.set(result=result_text[:200])
+        self._after_tool(batch, entry, result_text)
+
+    async def _checkpoint(self, step: int) -> None:
+        if self.checkpoint is None:
+            return
+        with self._phase("checkpoint"):
+            storage_state = None
+            if self._storage_state_due(step):
+                try:
+                    storage_state = await self.browser.storage_state()
+                except Exception:
+                    pass
+            self._write_checkpoint(step, storage_state)
+
+    async def resume(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        state = self._load_checkpoint(run_id)
+        await self.browser.restore_checkpoint(state["url"], state["storage_state"])
+        return await self.run(state["task"], resume=state)
+
+    async def run(self, user_task: str, resume: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self._start_run(user_task, resume)
+        try:
+            return await self._run_steps(user_task)
+        finally:
+            self._abort_run()
+
+    async def _call_model(self, messages: List[Dict[str, Any]], batch: Dict[str, Any]):
+        with self._phase("model", model=self.current_model) as span:
+            if self.streaming:
+                response = await self._stream_model_call(messages, self.tools, batch)
+            else:
+                response = await self._make_model_call(messages, self.tools)
+            span.set(**llm_usage(response))
+        return response
+
+    async def _run_steps(self, user_task: str) -> Dict[str, Any]:
+        for step in range(self.first_step, MAX_STEPS + 1):
+            self._start_step(step)
+            with self._phase("extraction") as span:
+                observation = await self.browser.get_observation()
+                self._note_observation(span)
+            stopped = self._check_progress(step, observation)
+            if stopped:
+                return stopped
+
+            messages, batch, msg = self._prepare_step(step, user_task, observation)
+            if msg is None:
+                try:
+                    response = await self._call_model(messages, batch)
+                except Exception as e:
+                    return self._model_failed(step, e)
+                msg = self._model_message(step, messages, response)
+
+            for tool_call in self._undispatched_tool_calls(batch, msg):
+                await self._dispatch_tool_call(batch, tool_call)
+            finished = self._end_step(msg, batch)
+            await self._checkpoint(step)
+            if finished:
+                return self._finished(step, finished)
+
+        return self._out_of_steps()
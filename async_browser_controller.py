@@ -0,0 +1,353 @@
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from playwright.async_api import Browser, BrowserContext, Page
+from config import (
+    MAX_PAGE_TEXT_CHARS,
+    EXTRACTION_MAX_ELEMENTS,
+    MAX_INPUT_ELEMENTS,
+    OBSERVATION_MODE,
+    A11Y_SNAPSHOT_TIMEOUT_MS,
+    NETWORK_PROFILE,
+    OBSERVATION_CACHE_ENABLED,
+    FRAME_EXTRACTION_ENABLED,
+    MAX_CHILD_FRAMES,
+    FRAME_EXTRACT_TIMEOUT_MS,
+    EXPLORE_MAX_TABS,
+    EXPLORE_TAB_TIMEOUT_MS,
+    EXPLORE_SUMMARY_CHARS,
+)
+from browser_controller import BrowserController, observation_mode_for_url
+from dom_extractor import (
+    async_extract_page_state,
+    async_probe_frame_versions,
+    child_frames,
+    COLLECT_TEXT_SCRIPT,
+)
+from page_settle import AsyncPageSettler, DOM_VERSION_SCRIPT
+from observation_cache import ObservationCache
+from a11y_tree import build_a11y_state
+from checkpoint import local_storage_script
+from network_policy import RoutingPolicy
+from tracing import tracer
+
+
+class AsyncBrowserController:
+    def __init__(
+        self,
+        context: BrowserContext,
+        page: Page,
+        settler: AsyncPageSettler,
+        network: RoutingPolicy,
+        observation_mode: str = OBSERVATION_MODE,
+    ):
+        self.observation_mode = observation_mode
+        self.context = context
+        self.page = page
+        self.settler = settler
+        self.network = network
+        self.network_step_stats: List[Dict[str, Any]] = []
+        self.last_settle: Dict[str, Any] = {}
+        self.settle_ms_total = 0.0
+
+        self.current_elements: List[Dict[str, Any]] = []
+        self.current_inputs: List[Dict[str, Any]] = []
+        self.frames: List[Any] = []
+        self.max_child_frames = MAX_CHILD_FRAMES if FRAME_EXTRACTION_ENABLED else 0
+        self.background_pages: List[Page] = []
+        self.last_observation_ms = 0.0
+        self.observation_cache = ObservationCache(OBSERVATION_CACHE_ENABLED)
+        self.last_observation_cached = False
+
+    @classmethod
+    async def create(
+        cls,
+        browser: Browser,
+        storage_state: Optional[Any] = None,
+        network_profile: str = NETWORK_PROFILE,
+    ) -> "AsyncBrowserController":
+        context = await browser.new_context(locale="ru-RU", storage_state=storage_state)
+        return await cls.from_context(context, network_profile)
+
+    @classmethod
+    async def from_context(
+        cls, context: BrowserContext, network_profile: str = NETWORK_PROFILE
+    ) -> "AsyncBrowserController":
+        context.set_default_timeout(15000)
+        context.set_default_navigation_timeout(20000)
+        network = RoutingPolicy(network_profile)
+        await network.install_async(context)
+        settler = AsyncPageSettler(context)
+        await settler.install_scripts(context)
+        page = context.pages[0] if context.pages else await context.new_page()
+        return cls(context, page, settler, network)
+
+    def _sync_to_latest_page(self) -> None:
+        try:
+            pages = [
+                p
+                for p in self.context.pages
+                if not p.is_closed() and p not in self.background_pages
+            ]
+        except Exception:
+            return
+
+        if not pages:
+            return
+
+        latest = pages[-1]
+        if latest is not self.page:
+            self.page = latest
+            self.observation_cache.invalidate()
+
+    def restrict_elements(self, elements: List[Dict[str, Any]]) -> None:
+        self.current_elements = elements
+
+    def page_state_token(self) -> Tuple[int, str]:
+        try:
+            return len(self.context.pages), self.page.url
+        except Exception:
+            return 0, ""
+
+    async def _settle(self, reason: str, since: float) -> Dict[str, Any]:
+        with tracer.span("settle", reason=reason) as span:
+            self.last_settle = await self.settler.settle(self.page, reason, since)
+            span.set(
+                waited_for=self.last_settle["waited_for"],
+                navigated=self.last_settle["navigated"],
+                timed_out=self.last_settle["timed_out"],
+            )
+        self.settle_ms_total += self.last_settle["elapsed_ms"]
+        return self.last_settle
+
+    def _locator(self, item: Dict[str, Any]):
+        frame_index = item.get("frame", 0)
+        root = self.page
+        if frame_index:
+            root = self.frames[frame_index] if frame_index < len(self.frames) else None
+            if root is None or root.is_detached():
+                raise RuntimeError(f"Frame {frame_index} is no longer attached")
+        if item.get("role"):
+            name = item["accessible_name"] or None
+            return root.get_by_role(item["role"], name=name, exact=True).nth(item["nth"])
+        return root.locator(item["selector"]).nth(item["nth"])
+
+    async def goto(self, url: str):
+        since = self.settler.mark()
+        await self.page.goto(url, wait_until="domcontentloaded", timeout=10000)
+        await self._settle("goto", since)
+
+    async def _explore_tab(self, index: int, href: str, timeout_ms: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        page = await self.context.new_page()
+        self.background_pages.append(page)
+        try:
+            await page.goto(href, wait_until="commit", timeout=timeout_ms)
+            remaining_ms = timeout_ms - (time.perf_counter() - started) * 1000
+            partial = False
+            try:
+                await page.wait_for_load_state("load", timeout=max(1.0, remaining_ms))
+            except Exception:
+                partial = True
+            text = await page.evaluate(COLLECT_TEXT_SCRIPT, EXPLORE_SUMMARY_CHARS * 2)
+            return BrowserController._explore_summary(
+                index, href, page, await page.title(), text, started, partial
+            )
+        except Exception as e:
+            return BrowserController._explore_error(index, href, e)
+        finally:
+            try:
+                await page.close()
+                self.background_pages.remove(page)
+            except Exception:
+                pass
+
+    async def explore_links(
+        self,
+        indices: List[int],
+        max_tabs: int = EXPLORE_MAX_TABS,
+        timeout_ms: int = EXPLORE_TAB_TIMEOUT_MS,
+    ) -> List[Dict[str, Any]]:
+        targets = BrowserController._explore_targets(self.current_elements, indices, max_tabs)
+        return await asyncio.gather(
+            *(self._explore_tab(index, href, timeout_ms) for index, href in targets)
+        )
+
+    async def storage_state(self) -> Dict[str, Any]:
+        return await self.context.storage_state()
+
+    async def restore_checkpoint(
+        self, url: Optional[str], storage_state: Optional[Dict[str, Any]]
+    ):
+        if storage_state:
+            await self.context.add_cookies(storage_state.get("cookies") or [])
+            if storage_state.get("origins"):
+                await self.context.add_init_script(
+                    script=local_storage_script(storage_state["origins"])
+                )
+        if url and url != "about:blank":
+            await self.goto(url)
+
+    async def click_by_element_index(self, index: int):
+        element = BrowserController._find_by_index(self.current_elements, index, "Element")
+        locator = self._locator(element)
+
+        since = self.settler.mark()
+        await locator.click(timeout=10000)
+        await self._settle("click", since)
+
+    async def type_text(self, selector: str, text: str, press_enter: bool = False):
+        loc = self.page.locator(selector).first
+        since = self.settler.mark()
+        await loc.click()
+        await loc.fill("")
+        await loc.type(text)
+        if press_enter:
+            await loc.press("Enter")
+        await self._settle("type", since)
+
+    async def press_key(self, key: str):
+        since = self.settler.mark()
+        await self.page.keyboard.press(key)
+        await self._settle("press_key", since)
+
+    async def type_into_input_index(self, index: int, text: str, press_enter: bool = False):
+        meta = BrowserController._find_by_index(self.current_inputs, index, "Input")
+        locator = self._locator(meta)
+
+        since = self.settler.mark()
+        await locator.click()
+        await locator.fill(text)
+
+        if press_enter:
+            await locator.press("Enter")
+        await self._settle("type_enter" if press_enter else "type", since)
+
+    def mode_for_url(self, url: Optional[str] = None) -> str:
+        try:
+            url = url or self.page.url
+        except Exception:
+            return self.observation_mode
+        mode = observation_mode_for_url(url, self.observation_mode)
+        # Only the script and accessibility-tree extractors have async versions.
+        return mode if mode == "a11y" else "script"
+
+    async def _dom_state_key(self, mode: str) -> Optional[Tuple]:
+        if not self.observation_cache.enabled:
+            return None
+        try:
+            version = await self.page.evaluate(DOM_VERSION_SCRIPT)
+            frames = tuple(frame.url for frame in self.page.frames)
+            url = self.page.url
+        except Exception:
+            return None
+        if version is None:
+            return None
+        return (id(self.page), mode, url, frames, tuple(version))
+
+    async def _probe_frame_versions(self) -> Tuple:
+        try:
+            frames = child_frames(self.page, self.max_child_frames)
+        except Exception:
+            return ()
+        return await async_probe_frame_versions(frames, FRAME_EXTRACT_TIMEOUT_MS)
+
+    async def get_observation(self) -> Dict[str, Any]:
+        self._sync_to_latest_page()
+        self.network_step_stats.append(self.network.take_step_stats())
+        started = time.perf_counter()
+        mode = self.mode_for_url()
+        key = await self._dom_state_key(mode)
+        versions = None
+        if self.observation_cache.needs_frame_versions(key):
+            versions = await self._probe_frame_versions()
+        observation = self.observation_cache.lookup(key, versions)
+        self.last_observation_cached = observation is not None
+        if observation is not None:
+            self.current_elements = list(observation["clickable_elements"])
+            self.current_inputs = list(observation["input_elements"])
+            self.last_observation_ms = (time.perf_counter() - started) * 1000
+            return observation
+
+        observation = await self._get_observation_a11y() if mode == "a11y" else None
+        if observation is not None:
+            self.observation_cache.store(key, observation, ())
+            self.last_observation_ms = (time.perf_counter() - started) * 1000
+            return observation
+
+        try:
+            url = self.page.url
+        except Exception:
+            url = "about:blank"
+        try:
+            with tracer.span("extract_script") as span:
+                state = await async_extract_page_state(
+                    self.page,
+                    max_elements=EXTRACTION_MAX_ELEMENTS,
+                    max_inputs=MAX_INPUT_ELEMENTS,
+                    max_text_chars=MAX_PAGE_TEXT_CHARS,
+                    max_frames=self.max_child_frames,
+                    frame_timeout_ms=FRAME_EXTRACT_TIMEOUT_MS,
+                )
+                span.set(
+                    elements=len(state["clickable_elements"]), frames=len(state["frames"]) - 1
+                )
+        except Exception:
+            state = {
+                "title": "",
+                "body_text": "",
+                "clickable_elements": [],
+                "input_elements": [],
+                "frames": [],
+                "frame_versions": (),
+            }
+            key = None
+
+        self.current_elements = state["clickable_elements"]
+        self.current_inputs = state["input_elements"]
+        self.frames = state["frames"]
+        self.last_observation_ms = (time.perf_counter() - started) * 1000
+
+        observation = {
+            "url": url,
+            "title": state["title"],
+            "body_text": state["body_text"],
+            "clickable_elements": state["clickable_elements"],
+            "input_elements": state["input_elements"],
+        }
+        self.observation_cache.store(key, observation, state["frame_versions"])
+        return observation
+
+    async def _get_observation_a11y(self) -> Optional[Dict[str, Any]]:
+        try:
+            url = self.page.url
+            title = await self.page.title()
+            with tracer.span("extract_a11y") as span:
+                snapshot = await self.page.locator("body").aria_snapshot(
+                    timeout=A11Y_SNAPSHOT_TIMEOUT_MS
+                )
+                state = build_a11y_state(
+                    snapshot,
+                    max_elements=EXTRACTION_MAX_ELEMENTS,
+                    max_inputs=MAX_INPUT_ELEMENTS,
+                    max_text_chars=MAX_PAGE_TEXT_CHARS,
+                )
+                span.set(elements=len(state["clickable_elements"]), nodes=len(state["a11y_tree"]))
+        except Exception:
+            return None
+
+        self.current_elements = state["clickable_elements"]
+        self.current_inputs = state["input_elements"]
+        self.frames = [self.page.main_frame]
+
+        return {
+            "url": url,
+            "title": title,
+            "body_text": state["body_text"],
+            "clickable_elements": state["clickable_elements"],
+            "input_elements": state["input_elements"],
+            "a11y_tree": state["a11y_tree"],
+        }
+
+    async def close(self):
+        await self.context.close()
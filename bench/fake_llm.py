@@ -0,0 +1,145 @@
+import json
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+from history import message_tokens
+
+
+def _matches(value: Optional[str], needle: str) -> bool:
+    return needle.lower() in (value or "").lower()
+
+
+class ScriptedChatClient:
+    def __init__(
+        self,
+        browser,
+        script: List[List[Dict[str, Any]]],
+        base_url: str,
+        latency_ms: float = 0.0,
+    ):
+        self.browser = browser
+        self.script = script
+        self.base_url = base_url.rstrip("/")
+        self.latency_ms = latency_ms
+        self.cursor = 0
+        self.calls = 0
+        self.failures: List[str] = []
+        self.previous_messages: List[Dict[str, Any]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _find_element(self, text: str) -> Optional[int]:
+        for el in self.browser.current_elements:
+            if _matches(el.get("text"), text):
+                return el["index"]
+        return None
+
+    def _find_input(self, label: str) -> Optional[int]:
+        for inp in self.browser.current_inputs:
+            if any(_matches(inp.get(f), label) for f in ("label", "placeholder", "name")):
+                return inp["index"]
+        return None
+
+    def _resolve(self, action: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        tool = action["tool"]
+        if tool == "navigate":
+            return {"url": action["url"].replace("{base}", self.base_url)}
+        if tool == "click_element":
+            index = self._find_element(action["text"])
+            return None if index is None else {"index": index}
+        if tool == "type_into_input_index":
+            index = self._find_input(action["input"])
+            if index is None:
+                return None
+            return {
+                "index": index,
+                "text": action["text"],
+                "press_enter": action.get("press_enter", False),
+            }
+        return {k: v for k, v in action.items() if k != "tool"}
+
+    def _tool_call(self, number: int, tool: str, args: Dict[str, Any]):
+        return SimpleNamespace(
+            id=f"call_{self.calls}_{number}",
+            type="function",
+            function=SimpleNamespace(name=tool, arguments=json.dumps(args, ensure_ascii=False)),
+        )
+
+    def _cached_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        cached = 0
+        for previous, current in zip(self.previous_messages, messages):
+            if previous != current:
+                break
+            cached += message_tokens(current)
+        self.previous_messages = list(messages)
+        return cached
+
+    def _stream(self, response):
+        message = response.choices[0].message
+        for number, tool_call in enumerate(message.tool_calls):
+            arguments = tool_call.function.arguments
+            middle = len(arguments) // 2
+            for part, piece in enumerate((arguments[:middle], arguments[middle:])):
+                function = SimpleNamespace(
+                    name=tool_call.function.name if part == 0 else None, arguments=piece
+                )
+                delta = SimpleNamespace(
+                    content=None,
+                    tool_calls=[
+                        SimpleNamespace(
+                            index=number,
+                            id=tool_call.id if part == 0 else None,
+                            function=function,
+                        )
+                    ],
+                )
+                yield SimpleNamespace(
+                    choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+                    usage=None,
+                )
+        delta = SimpleNamespace(content=None, tool_calls=None)
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(index=0, delta=delta, finish_reason="tool_calls")],
+            usage=None,
+        )
+        yield SimpleNamespace(choices=[], usage=response.usage)
+
+    def create(self, model: str, messages: List[Dict[str, Any]], **kwargs):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        if self.cursor < len(self.script):
+            actions = self.script[self.cursor]
+            self.cursor += 1
+        else:
+            actions = [{"tool": "finish_task", "summary": "Script exhausted"}]
+
+        tool_calls = []
+        for number, action in enumerate(actions):
+            args = self._resolve(action)
+            if args is None:
+                target = action.get("text") or action.get("input")
+                self.failures.append(f"step {self.cursor}: {target!r} not found")
+                tool_calls = [
+                    self._tool_call(0, "finish_task", {"summary": f"FAILED: {target!r} not found"})
+                ]
+                self.cursor = len(self.script)
+                break
+            tool_calls.append(self._tool_call(number, action["tool"], args))
+
+        message = SimpleNamespace(role="assistant", content=None, tool_calls=tool_calls)
+        usage = SimpleNamespace(
+            prompt_tokens=sum(message_tokens(m) for m in messages),
+            completion_tokens=20 * len(tool_calls),
+            total_tokens=None,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=self._cached_tokens(messages)),
+        )
+        usage.total_tokens = usage.prompt_tokens + usage.completion_tokens
+        response = SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="tool_calls")],
+            usage=usage,
+        )
+        if kwargs.get("stream"):
+            return self._stream(response)
+        return response
@@ -0,0 +1,348 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import List, Dict, Any, Tuple
+
+from agent import AutonomousAgent
+from browser_controller import BrowserController, OBSERVATION_MODES
+from checkpoint import CheckpointStore
+from history import estimate_tokens
+from observation_format import SERIALIZERS
+from token_counter import tokenizer_name
+from trajectory_cache import TrajectoryCache
+from bench.fake_llm import ScriptedChatClient
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SITES_DIR = os.path.join(BENCH_DIR, "sites")
+TASKS_PATH = os.path.join(BENCH_DIR, "tasks.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+PHASES = ("extraction", "prompt_build", "model", "tool", "settle", "checkpoint")
+EXTRACTION_PAGES = ("catalog.html", "heavy.html")
+HEAVY_LINKS = 3000
+HEAVY_TARGET = "Special offer: Burger"
+REGRESSION_THRESHOLD = 0.10
+REGRESSION_MIN_DELTA_MS = 5.0
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def build_sites(target_dir: str, heavy_links: int = HEAVY_LINKS) -> str:
+    sites_dir = os.path.join(target_dir, "sites")
+    shutil.copytree(SITES_DIR, sites_dir)
+
+    rows = []
+    for i in range(heavy_links):
+        if i and i % 100 == 0:
+            rows.append(f"<h2>Section {i // 100}</h2>")
+        if i == heavy_links - heavy_links // 10:
+            rows.append(f'<p><a href="product.html?id=1">{HEAVY_TARGET}</a> <span>199 ₽</span></p>')
+        rows.append(f'<p><a href="catalog.html#item-{i}">Item {i} of the big list</a></p>')
+
+    with open(os.path.join(sites_dir, "heavy.html"), "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+            "<title>Bench Food - All offers</title>\n"
+            "<link rel=\"stylesheet\" href=\"style.css\">\n</head>\n<body>\n"
+            "<h1>All offers</h1>\n"
+            + "\n".join(rows)
+            + "\n</body>\n</html>\n"
+        )
+    return sites_dir
+
+
+def serve(directory: str) -> Tuple[ThreadingHTTPServer, str]:
+    handler = partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run_task(
+    browser: BrowserController,
+    spec: Dict[str, Any],
+    base_url: str,
+    latency_ms: float,
+    verbose: bool,
+) -> Dict[str, Any]:
+    browser.goto("about:blank")
+    client = ScriptedChatClient(browser, spec["script"], base_url, latency_ms=latency_ms)
+    checkpoint_dir = tempfile.mkdtemp(prefix="bench-checkpoints-")
+    agent = AutonomousAgent(
+        browser,
+        client=client,
+        trajectory_cache=TrajectoryCache(path=None),
+        checkpoints=CheckpointStore(checkpoint_dir),
+    )
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    try:
+        with output:
+            result = agent.run(spec["task"])
+    finally:
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    phases = {phase: 0.0 for phase in PHASES}
+    for timings in agent.step_timings:
+        for phase in PHASES:
+            phases[phase] += timings.get(phase, 0.0)
+    prompt_tokens = [e["estimated_tokens"] for e in agent.history.prompt_tokens_per_step]
+    prompt_cache_hit_rate = agent.history.prefix_cache_hit_rate()
+
+    return {
+        "ok": result["status"] == "finished" and not client.failures,
+        "failures": client.failures,
+        "steps": result["steps"],
+        "llm_calls": client.calls,
+        "wall_ms": wall_ms,
+        "first_action_ms": agent.time_to_first_action(),
+        "observation_cache_hits": agent.observation_cache_hits(),
+        "steps_saved": agent.monitor.stats["steps_saved"],
+        "escalation_rate": agent.router.escalation_rate(),
+        "models": agent.router.snapshot()["models"],
+        "phases_ms": phases,
+        "prompt_tokens_total": sum(prompt_tokens),
+        "prompt_tokens_max": max(prompt_tokens, default=0),
+        "prompt_cache_hit_rate": prompt_cache_hit_rate,
+    }
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "ok": all(r["ok"] for r in runs),
+        "failures": sorted({f for r in runs for f in r["failures"]}),
+        "steps": statistics.median(r["steps"] for r in runs),
+        "llm_calls": statistics.median(r["llm_calls"] for r in runs),
+        "wall_ms": statistics.median(r["wall_ms"] for r in runs),
+        "first_action_ms": statistics.median(r["first_action_ms"] for r in runs),
+        "observation_cache_hits": statistics.median(r["observation_cache_hits"] for r in runs),
+        "steps_saved": statistics.median(r["steps_saved"] for r in runs),
+        "escalation_rate": statistics.median(r["escalation_rate"] for r in runs),
+        "models": runs[-1]["models"],
+        "phases_ms": {
+            phase: statistics.median(r["phases_ms"][phase] for r in runs) for phase in PHASES
+        },
+        "prompt_tokens_total": statistics.median(r["prompt_tokens_total"] for r in runs),
+        "prompt_tokens_max": statistics.median(r["prompt_tokens_max"] for r in runs),
+        "prompt_cache_hit_rate": statistics.median(r["prompt_cache_hit_rate"] for r in runs),
+    }
+
+
+def observation_tokens(observation: Dict[str, Any]) -> Dict[str, int]:
+    tokens = {}
+    for name, serializer_class in SERIALIZERS.items():
+        serializer = serializer_class()
+        serializer.begin(observation)
+        tokens[name] = estimate_tokens(serializer.full(observation))
+    return tokens
+
+
+def bench_extraction(
+    browser: BrowserController,
+    base_url: str,
+    repeats: int,
+    pages: Tuple[str, ...] = EXTRACTION_PAGES,
+) -> Dict[str, Any]:
+    original_mode = browser.observation_mode
+    cache_enabled = browser.observation_cache.enabled
+    browser.observation_cache.enabled = False
+    results = {}
+    try:
+        for page in pages:
+            browser.goto(page if "://" in page else f"{base_url}/{page}")
+            for mode in OBSERVATION_MODES:
+                browser.observation_mode = mode
+                samples = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    observation = browser.get_observation()
+                    samples.append((time.perf_counter() - started) * 1000)
+                results[f"{page}:{mode}"] = {
+                    "median_ms": statistics.median(samples),
+                    "max_ms": max(samples),
+                    "elements": len(observation["clickable_elements"]),
+                    "tokens": observation_tokens(observation),
+                }
+    finally:
+        browser.observation_mode = original_mode
+        browser.observation_cache.enabled = cache_enabled
+    return results
+
+
+def flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    metrics = {}
+    for name, summary in report["tasks"].items():
+        for key in (
+            "steps",
+            "llm_calls",
+            "wall_ms",
+            "first_action_ms",
+            "prompt_tokens_total",
+            "prompt_tokens_max",
+        ):
+            metrics[f"{name}.{key}"] = summary[key]
+        for phase, value in summary["phases_ms"].items():
+            metrics[f"{name}.{phase}_ms"] = value
+    for name, result in report["extraction"].items():
+        metrics[f"extraction.{name}.median_ms"] = result["median_ms"]
+        for serializer, tokens in result.get("tokens", {}).items():
+            metrics[f"extraction.{name}.tokens_{serializer}"] = tokens
+    return metrics
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = REGRESSION_THRESHOLD,
+) -> List[str]:
+    regressions = []
+    current_metrics = flatten(current)
+    baseline_metrics = flatten(baseline)
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>10}")
+    for key, value in current_metrics.items():
+        base = baseline_metrics.get(key)
+        if base is None:
+            print(f"{key:<44}{'-':>12}{value:>12.1f}{'new':>10}")
+            continue
+        change = (value - base) / base if base else 0.0
+        regressed = value > base * (1 + threshold)
+        if key.endswith("_ms") and value - base < REGRESSION_MIN_DELTA_MS:
+            regressed = False
+        mark = "  <-- REGRESSION" if regressed else ""
+        print(f"{key:<44}{base:>12.1f}{value:>12.1f}{change:>+10.1%}{mark}")
+        if regressed:
+            regressions.append(key)
+    return regressions
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'task':<14}{'ok':>4}{'steps':>7}{'llm':>5}{'wall ms':>10}{'1st act ms':>12}"
+    header += "".join(f"{phase:>14}" for phase in PHASES)
+    header += f"{'prompt tok':>12}{'max tok':>9}{'cached':>8}{'escal':>7}"
+    print(header)
+    for name, s in report["tasks"].items():
+        row = f"{name:<14}{'yes' if s['ok'] else 'NO':>4}{s['steps']:>7}{s['llm_calls']:>5}"
+        row += f"{s['wall_ms']:>10.0f}{s['first_action_ms']:>12.1f}"
+        row += "".join(f"{s['phases_ms'][phase]:>14.1f}" for phase in PHASES)
+        row += f"{s['prompt_tokens_total']:>12.0f}{s['prompt_tokens_max']:>9.0f}"
+        row += f"{s.get('prompt_cache_hit_rate', 0.0):>8.0%}{s.get('escalation_rate', 0.0):>7.0%}"
+        print(row)
+        for model, stats in s.get("models", {}).items():
+            print(
+                f"    {model}: {stats['calls']} calls, {stats['latency_ms_avg']:.0f} ms avg, "
+                f"{stats['prompt_tokens']} prompt / {stats['completion_tokens']} completion tokens"
+            )
+        for failure in s["failures"]:
+            print(f"    {failure}")
+
+    formats = list(SERIALIZERS)
+    print(f"\n{'extraction':<40}{'median ms':>12}{'max ms':>10}{'elements':>10}", end="")
+    print("".join(f"{'tok ' + name:>14}" for name in formats))
+    for name, r in report["extraction"].items():
+        tokens = r.get("tokens", {})
+        print(
+            f"{name[-40:]:<40}{r['median_ms']:>12.1f}{r['max_ms']:>10.1f}{r['elements']:>10}"
+            + "".join(f"{tokens.get(fmt, 0):>14}" for fmt in formats)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the agent loop")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tasks", nargs="*", help="Task names from bench/tasks.json")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated LLM latency")
+    parser.add_argument("--heavy-links", type=int, default=HEAVY_LINKS)
+    parser.add_argument(
+        "--observation-mode", choices=OBSERVATION_MODES, default="script",
+        help="Observation mode used by the agent during task runs",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument(
+        "--pages", nargs="*", default=list(EXTRACTION_PAGES),
+        help="Pages for the extraction and serialization table (bench pages or full URLs)",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show agent logs")
+    args = parser.parse_args()
+
+    with open(TASKS_PATH, encoding="utf-8") as f:
+        specs = json.load(f)
+    if args.tasks:
+        specs = [spec for spec in specs if spec["name"] in args.tasks]
+
+    with tempfile.TemporaryDirectory(prefix="agent-bench-") as tmp:
+        server, base_url = serve(build_sites(tmp, args.heavy_links))
+        browser = BrowserController(
+            user_data_dir=os.path.join(tmp, "user_data"),
+            observation_mode=args.observation_mode,
+            headless=True,
+        )
+        try:
+            tasks = {}
+            for spec in specs:
+                runs = [
+                    run_task(browser, spec, base_url, args.latency_ms, args.verbose)
+                    for _ in range(args.repeats)
+                ]
+                tasks[spec["name"]] = summarize(runs)
+            extraction = bench_extraction(browser, base_url, args.repeats, tuple(args.pages))
+        finally:
+            browser.close()
+            server.shutdown()
+
+    report = {
+        "settings": {
+            "repeats": args.repeats,
+            "latency_ms": args.latency_ms,
+            "heavy_links": args.heavy_links,
+            "observation_mode": args.observation_mode,
+            "tokenizer": tokenizer_name(),
+        },
+        "tasks": tasks,
+        "extraction": extraction,
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n[BENCH] Baseline saved to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != report["settings"]:
+            print("[BENCH] Warning: baseline was recorded with different settings")
+        regressions = compare(report, baseline)
+        if regressions:
+            print(f"\n[BENCH] {len(regressions)} metric(s) regressed by more than "
+                  f"{REGRESSION_THRESHOLD:.0%}")
+            sys.exit(1)
+        print("\n[BENCH] No regressions")
+
+    if not all(s["ok"] for s in tasks.values()):
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
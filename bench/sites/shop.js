@@ -0,0 +1,42 @@
+const PRODUCTS = [
+    { id: 1, name: "Classic Burger", price: 349 },
+    { id: 2, name: "Cheese Burger", price: 389 },
+    { id: 3, name: "Chicken Burger", price: 359 },
+    { id: 4, name: "Veggie Burger", price: 329 },
+    { id: 5, name: "French Fries", price: 149 },
+    { id: 6, name: "Onion Rings", price: 169 },
+    { id: 7, name: "Cola 0.5 L", price: 119 },
+    { id: 8, name: "Orange Juice", price: 139 },
+    { id: 9, name: "Caesar Salad", price: 299 },
+    { id: 10, name: "Tomato Soup", price: 249 },
+    { id: 11, name: "Apple Pie", price: 159 },
+    { id: 12, name: "Milkshake", price: 199 },
+];
+
+function renderChrome() {
+    const header = document.querySelector("header");
+    const sections = ["Home", "Restaurants", "Groceries", "Pharmacy", "Flowers", "Pets",
+        "Electronics", "Books", "Sports", "Kids", "Beauty", "Offers", "Help", "Login"];
+    header.innerHTML = sections.map((s) => `<a href="catalog.html#${s.toLowerCase()}">${s}</a>`).join("")
+        + ` <a href="cart.html">Cart (${cart().length})</a>`;
+    const footer = document.querySelector("footer");
+    const links = [];
+    for (let i = 1; i <= 40; i++) {
+        links.push(`<a href="catalog.html#info-${i}">Info page ${i}</a>`);
+    }
+    footer.innerHTML = links.join("");
+}
+
+function cart() {
+    return JSON.parse(localStorage.getItem("bench-cart") || "[]");
+}
+
+function addToCart(id) {
+    const items = cart();
+    items.push(id);
+    localStorage.setItem("bench-cart", JSON.stringify(items));
+}
+
+function productById(id) {
+    return PRODUCTS.find((p) => p.id === id);
+}
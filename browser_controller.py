@@ -1,28 +1,99 @@
-from typing import List, Dict, Any, Tuple
+import time
+from urllib.parse import urlparse
+from typing import List, Dict, Any, Optional, Tuple
 from playwright.sync_api import sync_playwright, Page
 from bs4 import BeautifulSoup
-from config import MAX_PAGE_TEXT_CHARS, MAX_ELEMENTS, MAX_INPUT_ELEMENTS
+from config import (
+    MAX_PAGE_TEXT_CHARS,
+    MAX_ELEMENTS,
+    EXTRACTION_MAX_ELEMENTS,
+    MAX_INPUT_ELEMENTS,
+    OBSERVATION_MODE,
+    SITE_OBSERVATION_MODES,
+    A11Y_SNAPSHOT_TIMEOUT_MS,
+    NETWORK_PROFILE,
+    OBSERVATION_CACHE_ENABLED,
+    FRAME_EXTRACTION_ENABLED,
+    MAX_CHILD_FRAMES,
+    FRAME_EXTRACT_TIMEOUT_MS,
+    EXPLORE_MAX_TABS,
+    EXPLORE_TAB_TIMEOUT_MS,
+    EXPLORE_SUMMARY_CHARS,
+)
+from dom_extractor import (
+    extract_page_state,
+    extract_page_text,
+    normalize_body_text,
+    child_frames,
+    probe_frame_versions,
+)
+from page_settle import PageSettler, DOM_VERSION_SCRIPT
+from observation_cache import ObservationCache
+from a11y_tree import build_a11y_state
+from checkpoint import local_storage_script
+from network_policy import RoutingPolicy
+from tracing import tracer
+
+OBSERVATION_MODES = ("script", "legacy", "a11y")
+
+
+def observation_mode_for_url(url: str, default: str) -> str:
+    try:
+        host = urlparse(url).hostname or ""
+    except Exception:
+        return default
+    for site, mode in SITE_OBSERVATION_MODES.items():
+        if host == site or host.endswith("." + site):
+            return mode
+    return default
 
 
 class BrowserController:
-    def __init__(self, user_data_dir: str = "user_data"):
+    def __init__(
+        self,
+        user_data_dir: str = "user_data",
+        observation_mode: str = OBSERVATION_MODE,
+        network_profile: str = NETWORK_PROFILE,
+        headless: bool = False,
+    ):
+        for mode in [observation_mode, *SITE_OBSERVATION_MODES.values()]:
+            if mode not in OBSERVATION_MODES:
+                raise ValueError(f"Unknown observation mode {mode!r}")
+        self.observation_mode = observation_mode
         self.playwright = sync_playwright().start()
         self.context = self.playwright.chromium.launch_persistent_context(
             user_data_dir=user_data_dir,
-            headless=False,
+            headless=headless,
             locale="ru-RU",
         )
+        self.network = RoutingPolicy(network_profile)
+        self.network.install(self.context)
+        self.network_step_stats: List[Dict[str, Any]] = []
         self.page: Page = self.context.pages[0] if self.context.pages else self.context.new_page()
 
         self.context.set_default_timeout(15000)
         self.context.set_default_navigation_timeout(20000)
+        self.settler = PageSettler(self.context)
+        self.last_settle: Dict[str, Any] = {}
+        self.settle_ms_total = 0.0
 
         self.current_elements = []
         self.current_inputs = []
-        
+        self.frames: List[Any] = []
+        self.max_child_frames = MAX_CHILD_FRAMES if FRAME_EXTRACTION_ENABLED else 0
+        self.last_frame_versions: Optional[Tuple] = None
+        self.background_pages: List[Page] = []
+        self.last_observation_ms = 0.0
+        self.observation_cache = ObservationCache(OBSERVATION_CACHE_ENABLED)
+        self.last_observation_cached = False
+
     def _sync_to_latest_page(self) -> None:
         try:
-            pages = [p for p in self.context.pages if not p.is_closed()]
+            pages = [
+                p
+                for p in self.context.pages
+                if not p.is_closed() and p not in self.background_pages
+            ]
         except Exception:
             return
 
@@ -32,69 +103,344 @@ class BrowserController:
         latest = pages[-1]
         if latest is not self.page:
             self.page = latest
+            self.observation_cache.invalidate()
 
     
+    def restrict_elements(self, elements: List[Dict[str, Any]]) -> None:
+        self.current_elements = elements
+
+    def page_state_token(self) -> Tuple[int, str]:
+        try:
+            return len(self.context.pages), self.page.url
+        except Exception:
+            return 0, ""
+
+    def _settle(self, reason: str, since: float) -> Dict[str, Any]:
+        with tracer.span("settle", reason=reason) as span:
+            self.last_settle = self.settler.settle(self.page, reason, since)
+            span.set(
+                waited_for=self.last_settle["waited_for"],
+                navigated=self.last_settle["navigated"],
+                timed_out=self.last_settle["timed_out"],
+            )
+        self.settle_ms_total += self.last_settle["elapsed_ms"]
+        return self.last_settle
+
+    @staticmethod
+    def _find_by_index(items: List[Dict[str, Any]], index: int, kind: str) -> Dict[str, Any]:
+        for item in items:
+            if item["index"] == index:
+                return item
+        raise IndexError(f"{kind} index {index} is out of range")
+
+    def _locator(self, item: Dict[str, Any]):
+        frame_index = item.get("frame", 0)
+        root = self.page
+        if frame_index:
+            root = self.frames[frame_index] if frame_index < len(self.frames) else None
+            if root is None or root.is_detached():
+                raise RuntimeError(f"Frame {frame_index} is no longer attached")
+        if item.get("role"):
+            name = item["accessible_name"] or None
+            return root.get_by_role(item["role"], name=name, exact=True).nth(item["nth"])
+        return root.locator(item["selector"]).nth(item["nth"])
+
     def goto(self, url: str):
-        self.page.goto(url, wait_until="networkidle", timeout=10000)
+        since = self.settler.mark()
+        self.page.goto(url, wait_until="domcontentloaded", timeout=10000)
+        self._settle("goto", since)
+
+    @staticmethod
+    def _explore_targets(
+        elements: List[Dict[str, Any]], indices: List[int], max_tabs: int
+    ) -> List[Tuple[int, str]]:
+        targets: List[Tuple[int, str]] = []
+        seen = set()
+        for index in indices:
+            element = BrowserController._find_by_index(elements, index, "Element")
+            href = element.get("href") or ""
+            if urlparse(href).scheme not in ("http", "https"):
+                raise ValueError(f"Element {index} is not a link that can be opened in a tab")
+            if href in seen:
+                continue
+            seen.add(href)
+            targets.append((index, href))
+        if not targets:
+            raise ValueError("No links to explore")
+        return targets[:max_tabs]
+
+    @staticmethod
+    def _explore_summary(
+        index: int, href: str, page, title: str, text: str, started: float, partial: bool
+    ) -> Dict[str, Any]:
+        text = " ".join((text or "").split())
+        if len(text) > EXPLORE_SUMMARY_CHARS:
+            text = text[:EXPLORE_SUMMARY_CHARS] + "…"
+        return {
+            "index": index,
+            "href": href,
+            "url": page.url,
+            "title": title,
+            "text": text,
+            "partial": partial,
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+
+    @staticmethod
+    def _explore_error(index: int, href: str, error: Exception) -> Dict[str, Any]:
+        message = (str(error).splitlines() or [type(error).__name__])[0]
+        return {"index": index, "href": href, "error": message}
+
+    def _close_background_pages(self) -> None:
+        for page in list(self.background_pages):
+            try:
+                page.close()
+            except Exception:
+                continue
+            self.background_pages.remove(page)
+
+    def explore_links(
+        self,
+        indices: List[int],
+        max_tabs: int = EXPLORE_MAX_TABS,
+        timeout_ms: int = EXPLORE_TAB_TIMEOUT_MS,
+    ) -> List[Dict[str, Any]]:
+        targets = self._explore_targets(self.current_elements, indices, max_tabs)
+        # The sync API blocks per call: tabs are opened one after another, each up to its
+        # response commit, and then waited on in order. Only the async controller fans out.
+        tabs: List[Tuple[int, str, Any, float]] = []
+        results: Dict[int, Dict[str, Any]] = {}
+        try:
+            for index, href in targets:
+                started = time.perf_counter()
+                page = self.context.new_page()
+                self.background_pages.append(page)
+                try:
+                    page.goto(href, wait_until="commit", timeout=timeout_ms)
+                except Exception as e:
+                    results[index] = self._explore_error(index, href, e)
+                    continue
+                tabs.append((index, href, page, started))
 
-    def click_by_element_index(self, index: int):
-        if index < 0 or index >= len(self.current_elements):
-            raise IndexError(f"Element index {index} is out of range")
+            for index, href, page, started in tabs:
+                remaining_ms = timeout_ms - (time.perf_counter() - started) * 1000
+                partial = False
+                try:
+                    page.wait_for_load_state("load", timeout=max(1.0, remaining_ms))
+                except Exception:
+                    partial = True
+                try:
+                    text = extract_page_text(page, EXPLORE_SUMMARY_CHARS * 2)
+                    results[index] = self._explore_summary(
+                        index, href, page, page.title(), text, started, partial
+                    )
+                except Exception as e:
+                    results[index] = self._explore_error(index, href, e)
+        finally:
+            self._close_background_pages()
+            try:
+                self.page.bring_to_front()
+            except Exception:
+                pass
+        return [results[index] for index, _ in targets]
+
+    def storage_state(self) -> Dict[str, Any]:
+        return self.context.storage_state()
+
+    def restore_checkpoint(self, url: Optional[str], storage_state: Optional[Dict[str, Any]]):
+        if storage_state:
+            self.context.add_cookies(storage_state.get("cookies") or [])
+            if storage_state.get("origins"):
+                self.context.add_init_script(
+                    script=local_storage_script(storage_state["origins"])
+                )
+        if url and url != "about:blank":
+            self.goto(url)
 
-        element = self.current_elements[index]
-        locator = self.page.locator(element["selector"]).nth(element["nth"])
+    def click_by_element_index(self, index: int):
+        element = self._find_by_index(self.current_elements, index, "Element")
+        locator = self._locator(element)
 
+        since = self.settler.mark()
         locator.click(timeout=10000)
-        self.page.wait_for_timeout(5000)
+        self._settle("click", since)
 
     
     def type_text(self, selector: str, text: str, press_enter: bool = False):
         loc = self.page.locator(selector).first
+        since = self.settler.mark()
         loc.click()
         loc.fill("")
         loc.type(text)
         if press_enter:
             loc.press("Enter")
+        self._settle("type", since)
 
     def press_key(self, key: str):
+        since = self.settler.mark()
         self.page.keyboard.press(key)
+        self._settle("press_key", since)
 
     def type_into_input_index(self, index: int, text: str, press_enter: bool = False):
-        if index < 0 or index >= len(self.current_inputs):
-            raise IndexError(f"Input index {index} is out of range")
-
-        meta = self.current_inputs[index]
-        locator = self.page.locator("input, textarea").nth(meta["index"])
+        meta = self._find_by_index(self.current_inputs, index, "Input")
+        locator = self._locator(meta)
 
+        since = self.settler.mark()
         locator.click()
         locator.fill(text)
 
         if press_enter:
             locator.press("Enter")
-            self.page.wait_for_timeout(1500)
-        self.page.wait_for_timeout(300)
+        self._settle("type_enter" if press_enter else "type", since)
 
 
     def get_observation(self) -> Dict[str, Any]:
         self._sync_to_latest_page()
+        self.network_step_stats.append(self.network.take_step_stats())
+        started = time.perf_counter()
+        mode = self.mode_for_url()
+        key = self._dom_state_key(mode)
+        versions = None
+        if self.observation_cache.needs_frame_versions(key):
+            versions = self._probe_frame_versions()
+        observation = self.observation_cache.lookup(key, versions)
+        self.last_observation_cached = observation is not None
+        if observation is not None:
+            self.current_elements = list(observation["clickable_elements"])
+            self.current_inputs = list(observation["input_elements"])
+        else:
+            self.last_frame_versions = None
+            if mode == "script":
+                observation = self._get_observation_script()
+            elif mode == "a11y":
+                observation = self._get_observation_a11y()
+            else:
+                observation = self._get_observation_legacy()
+            if key is not None and self.last_frame_versions is None:
+                self.last_frame_versions = (
+                    versions if versions is not None else self._probe_frame_versions()
+                )
+            self.observation_cache.store(key, observation, self.last_frame_versions or ())
+        self.last_observation_ms = (time.perf_counter() - started) * 1000
+        return observation
+
+    def mode_for_url(self, url: Optional[str] = None) -> str:
+        try:
+            url = url or self.page.url
+        except Exception:
+            return self.observation_mode
+        return observation_mode_for_url(url, self.observation_mode)
+
+    def _dom_state_key(self, mode: str) -> Optional[Tuple]:
+        if not self.observation_cache.enabled:
+            return None
+        try:
+            version = self.page.evaluate(DOM_VERSION_SCRIPT)
+            frames = tuple(frame.url for frame in self.page.frames)
+            url = self.page.url
+        except Exception:
+            return None
+        if version is None:
+            return None
+        return (id(self.page), mode, url, frames, tuple(version))
+
+    def _probe_frame_versions(self) -> Tuple:
+        try:
+            frames = child_frames(self.page, self.max_child_frames)
+        except Exception:
+            return ()
+        return probe_frame_versions(frames, FRAME_EXTRACT_TIMEOUT_MS)
+
+    def _get_observation_script(self) -> Dict[str, Any]:
         try:
             url = self.page.url
         except Exception:
             url = "about:blank"
         try:
+            with tracer.span("extract_script") as span:
+                state = extract_page_state(
+                    self.page,
+                    max_elements=EXTRACTION_MAX_ELEMENTS,
+                    max_inputs=MAX_INPUT_ELEMENTS,
+                    max_text_chars=MAX_PAGE_TEXT_CHARS,
+                    max_frames=self.max_child_frames,
+                    frame_timeout_ms=FRAME_EXTRACT_TIMEOUT_MS,
+                )
+                span.set(
+                    elements=len(state["clickable_elements"]), frames=len(state["frames"]) - 1
+                )
+        except Exception:
+            return self._get_observation_legacy()
+
+        self.current_elements = state["clickable_elements"]
+        self.current_inputs = state["input_elements"]
+        self.frames = state["frames"]
+        self.last_frame_versions = state["frame_versions"]
+
+        return {
+            "url": url,
+            "title": state["title"],
+            "body_text": state["body_text"],
+            "clickable_elements": state["clickable_elements"],
+            "input_elements": state["input_elements"],
+        }
+
+    def _get_observation_a11y(self) -> Dict[str, Any]:
+        try:
+            url = self.page.url
             title = self.page.title()
+            with tracer.span("extract_a11y") as span:
+                snapshot = self.page.locator("body").aria_snapshot(
+                    timeout=A11Y_SNAPSHOT_TIMEOUT_MS
+                )
+                state = build_a11y_state(
+                    snapshot,
+                    max_elements=EXTRACTION_MAX_ELEMENTS,
+                    max_inputs=MAX_INPUT_ELEMENTS,
+                    max_text_chars=MAX_PAGE_TEXT_CHARS,
+                )
+                span.set(elements=len(state["clickable_elements"]), nodes=len(state["a11y_tree"]))
         except Exception:
-            title = ""
+            return self._get_observation_script()
+
+        self.current_elements = state["clickable_elements"]
+        self.current_inputs = state["input_elements"]
+        self.frames = [self.page.main_frame]
+
+        return {
+            "url": url,
+            "title": title,
+            "body_text": state["body_text"],
+            "clickable_elements": state["clickable_elements"],
+            "input_elements": state["input_elements"],
+            "a11y_tree": state["a11y_tree"],
+        }
+
+    def _body_text_from_html(self) -> str:
         try:
             html = self.page.content()
         except Exception:
             html = ""
 
-        soup = BeautifulSoup(html or "", "html.parser")
+        with tracer.span("bs4_parse", html_chars=len(html or "")):
+            soup = BeautifulSoup(html or "", "html.parser")
+            body_text = " ".join(soup.stripped_strings)
+        return normalize_body_text(body_text, MAX_PAGE_TEXT_CHARS)
 
-        body_text = " ".join(soup.stripped_strings)
-        if len(body_text) > MAX_PAGE_TEXT_CHARS:
-            body_text = body_text[:MAX_PAGE_TEXT_CHARS] + "…"
+    def _get_observation_legacy(self) -> Dict[str, Any]:
+        try:
+            url = self.page.url
+        except Exception:
+            url = "about:blank"
+        try:
+            title = self.page.title()
+        except Exception:
+            title = ""
+        try:
+            with tracer.span("extract_text"):
+                body_text = extract_page_text(self.page, MAX_PAGE_TEXT_CHARS)
+        except Exception:
+            body_text = self._body_text_from_html()
 
         elements: List[Dict[str, Any]] = []
 
@@ -201,6 +547,8 @@ class BrowserController:
                         "placeholder": placeholder[:120],
                         "name": name[:120],
                         "label": label_text.strip()[:120],
+                        "selector": "input, textarea",
+                        "nth": i,
                     }
                 )
         except Exception:
@@ -214,4 +562,10 @@ class BrowserController:
             "body_text": body_text,
             "clickable_elements": elements,
             "input_elements": input_elements,
-        }
\ No newline at end of file
+        }
+
+    def close(self):
+        try:
+            self.context.close()
+        finally:
+            self.playwright.stop()
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Tuple
+from config import CHECKPOINT_DIR, CHECKPOINT_FSYNC
+
+TERMINAL_STATUSES = ("finished", "max_steps", "stalled")
+
+SEED_STORAGE_SCRIPT = """
+(origins) => {
+    try {
+        if (sessionStorage.getItem("__agentSeeded")) {
+            return;
+        }
+        const entry = origins.find((o) => o.origin === location.origin);
+        if (entry) {
+            for (const item of entry.localStorage) {
+                if (localStorage.getItem(item.name) === null) {
+                    localStorage.setItem(item.name, item.value);
+                }
+            }
+        }
+        sessionStorage.setItem("__agentSeeded", "1");
+    } catch (e) {}
+}
+"""
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(
+        json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def read_records(path: str) -> Tuple[List[Dict[str, Any]], int]:
+    records: List[Dict[str, Any]] = []
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line.decode("utf-8")))
+            except ValueError:
+                break
+            valid_bytes += len(line)
+    return records, valid_bytes
+
+
+def local_storage_script(origins: List[Dict[str, Any]]) -> str:
+    return f"({SEED_STORAGE_SCRIPT})({json.dumps(origins, ensure_ascii=False)})"
+
+
+class RunCheckpoint:
+    def __init__(self, path: str, run_id: str, fsync: bool = CHECKPOINT_FSYNC):
+        self.path = path
+        self.run_id = run_id
+        self.fsync = fsync
+        self.storage_digest: Optional[str] = None
+        self.stats = {"records": 0, "bytes": 0, "storage_writes": 0}
+        # Storage state holds cookies and tokens, so the log is readable by the owner only.
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self.file = os.fdopen(fd, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.stats["records"] += 1
+        self.stats["bytes"] += len(line)
+
+    def step(
+        self,
+        step: int,
+        turn: Dict[str, Any],
+        memory: List[Dict[str, Any]],
+        url: str,
+        storage_state: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        record = {
+            "type": "step",
+            "step": step,
+            "time": time.time(),
+            "url": url,
+            "memory": memory,
+            "turn": turn,
+        }
+        if storage_state is not None:
+            digest = _digest(storage_state)
+            if digest != self.storage_digest:
+                record["storage_state"] = storage_state
+                self.storage_digest = digest
+                self.stats["storage_writes"] += 1
+        self.write(record)
+
+    def finish(self, status: str) -> None:
+        self.write({"type": "run_end", "status": status, "time": time.time()})
+        self.close()
+
+    def close(self) -> None:
+        if not self.file.closed:
+            self.file.close()
+
+
+class CheckpointStore:
+    def __init__(self, directory: str = CHECKPOINT_DIR, fsync: bool = CHECKPOINT_FSYNC):
+        self.directory = directory
+        self.fsync = fsync
+
+    def path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.jsonl")
+
+    def create(self, task: str) -> RunCheckpoint:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        run_id = new_run_id()
+        checkpoint = RunCheckpoint(self.path(run_id), run_id, self.fsync)
+        checkpoint.write({"type": "run_start", "task": task, "time": time.time()})
+        return checkpoint
+
+    def load(self, run_id: str) -> Dict[str, Any]:
+        records, valid_bytes = read_records(self.path(run_id))
+        if not records or records[0].get("type") != "run_start":
+            raise ValueError(f"Checkpoint {run_id} has no run_start record")
+        state: Dict[str, Any] = {
+            "run_id": run_id,
+            "task": records[0]["task"],
+            "step": 0,
+            "turns": [],
+            "memory": [],
+            "url": None,
+            "storage_state": None,
+            "status": None,
+            "valid_bytes": valid_bytes,
+        }
+        for record in records[1:]:
+            if record["type"] == "step":
+                state["step"] = record["step"]
+                state["turns"].append(record["turn"])
+                state["memory"] = record["memory"]
+                state["url"] = record["url"]
+                if "storage_state" in record:
+                    state["storage_state"] = record["storage_state"]
+            elif record["type"] == "run_end":
+                state["status"] = record["status"]
+        return state
+
+    def reopen(self, state: Dict[str, Any]) -> RunCheckpoint:
+        path = self.path(state["run_id"])
+        os.truncate(path, state["valid_bytes"])
+        checkpoint = RunCheckpoint(path, state["run_id"], self.fsync)
+        if state["storage_state"] is not None:
+            checkpoint.storage_digest = _digest(state["storage_state"])
+        return checkpoint
+
+    def latest(self, task: Optional[str] = None) -> Optional[str]:
+        if not os.path.isdir(self.directory):
+            return None
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".jsonl")
+        ]
+        for path in sorted(paths, key=os.path.getmtime, reverse=True):
+            run_id = os.path.basename(path)[: -len(".jsonl")]
+            try:
+                state = self.load(run_id)
+            except (OSError, ValueError, KeyError):
+                continue
+            if state["status"] in TERMINAL_STATUSES:
+                continue
+            if task is None or state["task"] == task:
+                return run_id
+        return None
@@ -6,8 +6,111 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 
+ROUTER_ENABLED = os.getenv("AGENT_ROUTER", "1") == "1"
+ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "gpt-4.1-nano")
+ROUTER_STRONG_MODEL = os.getenv("ROUTER_STRONG_MODEL", OPENAI_MODEL)
+ROUTER_ESCALATE_ON = [
+    r
+    for r in os.getenv(
+        "ROUTER_ESCALATE_ON", "tool_error,invalid_json,low_confidence,stage_change,stall"
+    ).split(",")
+    if r
+]
+ROUTER_STRONG_STEPS = 2
+ROUTER_STAGE_KEYWORDS = [
+    "cart", "checkout", "login", "payment", "корзин", "оформ", "оплат", "вход",
+]
+
 MAX_PAGE_TEXT_CHARS = 4000
 MAX_ELEMENTS = 200
 MAX_STEPS = 25
+LOOP_HINT_REPEATS = 2
+LOOP_BLOCK_REPEATS = 3
+STALL_ABORT_STEPS = 6
 MAX_INPUT_ELEMENTS = 30
 SECURITY_CONFIRM_WORDS = ["pay", "order", "delete", "оплат", "заказ", "удал"]
+APPROVAL_POLICY = os.getenv("APPROVAL_POLICY", "ask")
+APPROVAL_TIMEOUT_S = float(os.getenv("APPROVAL_TIMEOUT_S", "600"))
+OBSERVATION_MODE = os.getenv("OBSERVATION_MODE", "script")
+SITE_OBSERVATION_MODES = dict(
+    p.split("=", 1) for p in os.getenv("SITE_OBSERVATION_MODES", "").split(",") if "=" in p
+)
+A11Y_SNAPSHOT_TIMEOUT_MS = 5000
+
+SETTLE_MAX_MS = 5000
+SETTLE_MIN_MS = 150
+SETTLE_DOM_QUIET_MS = 300
+SETTLE_NETWORK_QUIET_MS = 300
+SETTLE_POLL_MS = 50
+SETTLE_LONG_REQUEST_MS = 3000
+SETTLE_SITE_OVERRIDES = {}
+
+OBS_DIFF_MAX_RATIO = 0.6
+OBSERVATION_FORMAT = os.getenv("OBSERVATION_FORMAT", "compact")
+MAX_PAGE_TEXT_TOKENS = 1000
+TOKENIZER_FALLBACK_ENCODING = "o200k_base"
+
+HISTORY_TOKEN_BUDGET = 24000
+HISTORY_SUMMARY_STEPS = 30
+HISTORY_RESYNC_RATIO = 0.75
+HISTORY_COMPACT_TARGET_RATIO = 0.6
+
+AGENT_CONCURRENCY = 8
+SCHEDULER_HEADLESS = True
+
+CONTEXT_POOL_SIZE = 4
+CONTEXT_POOL_MAX_USES = 20
+CONTEXT_POOL_HEALTH_TIMEOUT_MS = 2000
+PROFILE_SNAPSHOT_PATH = "profile_snapshot.json"
+PROFILE_SEED_URLS = ["https://eda.yandex.ru"]
+
+NETWORK_PROFILE = os.getenv("NETWORK_PROFILE", "agent")
+
+TRAJECTORY_CACHE_ENABLED = True
+TRAJECTORY_CACHE_PATH = "trajectories.json"
+TRAJECTORY_CACHE_MAX_ENTRIES = 200
+TRAJECTORY_CACHE_TTL_S = 7 * 24 * 3600
+TRAJECTORY_MIN_SIMILARITY = 0.5
+
+ELEMENT_RANKING_ENABLED = True
+EXTRACTION_MAX_ELEMENTS = 1000 if ELEMENT_RANKING_ENABLED else MAX_ELEMENTS
+ELEMENT_TOKEN_BUDGET = 2500
+RANK_MEMORY_WEIGHT = 0.3
+RANK_BOOST_DIALOG = 2.0
+RANK_BOOST_VIEWPORT = 1.0
+RANK_BOOST_PRICE = 1.0
+
+TRACE_ENABLED = os.getenv("AGENT_TRACE", "0") == "1"
+TRACE_DIR = "traces"
+TRACE_EXPORTERS = [p for p in os.getenv("AGENT_TRACE_EXPORTERS", "").split(",") if p]
+
+STREAMING_ENABLED = os.getenv("AGENT_STREAMING", "1") == "1"
+STREAM_RESTARTS = 2
+
+CHECKPOINT_ENABLED = os.getenv("AGENT_CHECKPOINT", "1") == "1"
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_FSYNC = os.getenv("AGENT_CHECKPOINT_FSYNC", "0") == "1"
+CHECKPOINT_STORAGE_EVERY_STEPS = 10
+
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_CONNECT_TIMEOUT_S = 10.0
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_S = 0.5
+LLM_RETRY_MAX_S = 20.0
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0")) or None
+LLM_POOL_MAX_CONNECTIONS = 32
+LLM_POOL_MAX_KEEPALIVE = 16
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "")
+
+OBSERVATION_CACHE_ENABLED = True
+
+FRAME_EXTRACTION_ENABLED = True
+MAX_CHILD_FRAMES = 8
+FRAME_EXTRACT_TIMEOUT_MS = 1500
+
+EXPLORE_MAX_TABS = 4
+EXPLORE_TAB_TIMEOUT_MS = 8000
+EXPLORE_SUMMARY_CHARS = 400
+
+TASK_SERVER_HOST = os.getenv("TASK_SERVER_HOST", "127.0.0.1")
+TASK_SERVER_PORT = int(os.getenv("TASK_SERVER_PORT", "8765"))
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional, Set
+from urllib.parse import urlparse
+from playwright.async_api import Browser, async_playwright
+from config import (
+    CONTEXT_POOL_SIZE,
+    CONTEXT_POOL_MAX_USES,
+    CONTEXT_POOL_HEALTH_TIMEOUT_MS,
+    PROFILE_SNAPSHOT_PATH,
+    PROFILE_SEED_URLS,
+)
+from async_browser_controller import AsyncBrowserController
+from checkpoint import local_storage_script
+
+CLEARED_STORAGE_TYPES = "local_storage,session_storage,indexeddb,cache_storage,service_workers"
+
+
+async def snapshot_profile(
+    user_data_dir: str = "user_data",
+    path: str = PROFILE_SNAPSHOT_PATH,
+    seed_urls: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=user_data_dir,
+            headless=True,
+            locale="ru-RU",
+        )
+        try:
+            page = context.pages[0] if context.pages else await context.new_page()
+            for url in seed_urls if seed_urls is not None else PROFILE_SEED_URLS:
+                try:
+                    await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+                except Exception:
+                    pass
+            return await context.storage_state(path=path)
+        finally:
+            await context.close()
+
+
+def load_snapshot(path: str = PROFILE_SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ContextPool:
+    def __init__(
+        self,
+        browser: Browser,
+        size: int = CONTEXT_POOL_SIZE,
+        storage_state: Optional[Dict[str, Any]] = None,
+        max_uses: int = CONTEXT_POOL_MAX_USES,
+    ):
+        self.browser = browser
+        self.size = size
+        self.storage_state = storage_state
+        self.max_uses = max_uses
+        self._idle: List[AsyncBrowserController] = []
+        self._uses: Dict[AsyncBrowserController, int] = {}
+        self._origins: Dict[AsyncBrowserController, Set[str]] = {}
+        self._stats = {
+            "acquires": 0,
+            "hits": 0,
+            "misses": 0,
+            "resets": 0,
+            "discarded": 0,
+            "acquire_ms_total": 0.0,
+            "acquire_ms_max": 0.0,
+        }
+
+    async def start(self) -> None:
+        controllers = await asyncio.gather(*(self._create() for _ in range(self.size)))
+        self._idle.extend(controllers)
+
+    async def _create(self) -> AsyncBrowserController:
+        context = await self.browser.new_context(
+            locale="ru-RU", storage_state=self.storage_state
+        )
+        if self.storage_state and self.storage_state.get("origins"):
+            await context.add_init_script(
+                script=local_storage_script(self.storage_state["origins"])
+            )
+        controller = await AsyncBrowserController.from_context(context)
+        self._uses[controller] = 0
+        self._origins[controller] = set()
+        context.on("page", lambda page: self._track_origins(controller, page))
+        for page in context.pages:
+            self._track_origins(controller, page)
+        return controller
+
+    def _track_origins(self, controller: AsyncBrowserController, page) -> None:
+        def on_navigated(frame):
+            parsed = urlparse(frame.url)
+            if parsed.scheme in ("http", "https"):
+                self._origins[controller].add(f"{parsed.scheme}://{parsed.netloc}")
+
+        page.on("framenavigated", on_navigated)
+
+    async def _healthy(self, controller: AsyncBrowserController) -> bool:
+        try:
+            if controller.page.is_closed():
+                return False
+            result = await asyncio.wait_for(
+                controller.page.evaluate("() => 1"),
+                timeout=CONTEXT_POOL_HEALTH_TIMEOUT_MS / 1000,
+            )
+            return result == 1
+        except Exception:
+            return False
+
+    async def _discard(self, controller: AsyncBrowserController) -> None:
+        self._stats["discarded"] += 1
+        self._uses.pop(controller, None)
+        self._origins.pop(controller, None)
+        try:
+            await controller.close()
+        except Exception:
+            pass
+
+    async def acquire(self) -> AsyncBrowserController:
+        started = time.perf_counter()
+        controller = None
+        while self._idle:
+            candidate = self._idle.pop()
+            if await self._healthy(candidate):
+                controller = candidate
+                break
+            await self._discard(candidate)
+
+        if controller is None:
+            self._stats["misses"] += 1
+            controller = await self._create()
+        else:
+            self._stats["hits"] += 1
+
+        self._uses[controller] += 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._stats["acquires"] += 1
+        self._stats["acquire_ms_total"] += elapsed_ms
+        self._stats["acquire_ms_max"] = max(self._stats["acquire_ms_max"], elapsed_ms)
+        return controller
+
+    async def release(self, controller: AsyncBrowserController) -> None:
+        if (
+            len(self._idle) >= self.size
+            or self._uses.get(controller, 0) >= self.max_uses
+            or not await self._reset(controller)
+        ):
+            await self._discard(controller)
+            return
+        self._idle.append(controller)
+
+    async def _reset(self, controller: AsyncBrowserController) -> bool:
+        context = controller.context
+        try:
+            pages = [p for p in context.pages if not p.is_closed()]
+            if not pages:
+                pages = [await context.new_page()]
+            for extra in pages[1:]:
+                await extra.close()
+            page = pages[0]
+            await page.goto("about:blank")
+
+            origins = self._origins.get(controller, set())
+            if origins:
+                cdp = await context.new_cdp_session(page)
+                try:
+                    for origin in origins:
+                        await cdp.send(
+                            "Storage.clearDataForOrigin",
+                            {"origin": origin, "storageTypes": CLEARED_STORAGE_TYPES},
+                        )
+                finally:
+                    await cdp.detach()
+                origins.clear()
+
+            await context.clear_cookies()
+            if self.storage_state and self.storage_state.get("cookies"):
+                await context.add_cookies(self.storage_state["cookies"])
+
+            controller.page = page
+            controller.current_elements = []
+            controller.current_inputs = []
+        except Exception:
+            return False
+        self._stats["resets"] += 1
+        return await self._healthy(controller)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        acquires = stats["acquires"]
+        stats["hit_rate"] = round(stats["hits"] / acquires, 3) if acquires else 0.0
+        stats["acquire_ms_avg"] = round(stats["acquire_ms_total"] / acquires, 1) if acquires else 0.0
+        stats["idle"] = len(self._idle)
+        return stats
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+
+if __name__ == "__main__":
+    state = asyncio.run(snapshot_profile())
+    print(
+        f"Saved {len(state.get('cookies', []))} cookies and "
+        f"{len(state.get('origins', []))} origins to {PROFILE_SNAPSHOT_PATH}"
+    )
@@ -0,0 +1,446 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
+from playwright.sync_api import Page, Frame
+from page_settle import DOM_VERSION_SCRIPT
+
+
+HANDLE_ATTR = "data-agent-id"
+CLICKABLE_SELECTOR = "a, button, [role=button], input[type=submit], input[type=button]"
+INPUT_SELECTOR = "input, textarea"
+
+COLLECT_TEXT_SCRIPT = """
+(maxChars) => {
+    if (!document.body) {
+        return "";
+    }
+    const SKIP_TAGS = new Set([
+        "SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG", "CANVAS", "IFRAME", "OBJECT", "HEAD",
+    ]);
+    const CHROME_SELECTOR = "header, footer, nav, aside, [role=banner], [role=contentinfo], "
+        + "[role=navigation], [role=complementary]";
+
+    const styles = new Map();
+    const styleOf = (el) => {
+        let style = styles.get(el);
+        if (!style) {
+            style = window.getComputedStyle(el);
+            styles.set(el, style);
+        }
+        return style;
+    };
+    const rejects = (el) => SKIP_TAGS.has(el.tagName.toUpperCase())
+        || styleOf(el).display === "none";
+    const textHidden = (el) => {
+        const visibility = styleOf(el).visibility;
+        return visibility === "hidden" || visibility === "collapse";
+    };
+    const blockOf = (el) => {
+        let node = el;
+        while (node.parentElement && node !== document.body) {
+            const display = styleOf(node).display;
+            if (!display.startsWith("inline") && display !== "contents") {
+                return node;
+            }
+            node = node.parentElement;
+        }
+        return node;
+    };
+    const inViewport = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.bottom > 0 && rect.right > 0
+            && rect.top < window.innerHeight && rect.left < window.innerWidth;
+    };
+
+    const lines = [];
+    const emitted = new Set();
+    let total = 0;
+    let lastBlock = null;
+
+    const walkRegion = (root, excluded, viewportOnly) => {
+        if (!root || rejects(root)) {
+            return;
+        }
+        const walker = document.createTreeWalker(
+            root,
+            NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT,
+            {
+                acceptNode(node) {
+                    if (node.nodeType === Node.ELEMENT_NODE) {
+                        if ((excluded && excluded(node)) || rejects(node)) {
+                            return NodeFilter.FILTER_REJECT;
+                        }
+                        return NodeFilter.FILTER_SKIP;
+                    }
+                    return NodeFilter.FILTER_ACCEPT;
+                },
+            },
+        );
+        lastBlock = null;
+        while (total <= maxChars) {
+            const node = walker.nextNode();
+            if (!node) {
+                break;
+            }
+            if (emitted.has(node)) {
+                continue;
+            }
+            const text = node.nodeValue.replace(/\\s+/g, " ").trim();
+            const parent = node.parentElement;
+            if (!text || !parent || textHidden(parent)) {
+                continue;
+            }
+            if (viewportOnly && !inViewport(parent)) {
+                continue;
+            }
+            emitted.add(node);
+            const block = blockOf(parent);
+            if (block === lastBlock && lines.length > 0) {
+                lines[lines.length - 1] += " " + text;
+            } else {
+                lines.push(text);
+                lastBlock = block;
+            }
+            total += text.length + 1;
+        }
+    };
+
+    const overlay = document.querySelector("[role=dialog], [aria-modal='true']");
+    const main = document.querySelector("main, [role=main]") || document.querySelector("article");
+    const isChrome = (el) => el.matches(CHROME_SELECTOR);
+
+    walkRegion(overlay, null, false);
+    walkRegion(main, null, true);
+    walkRegion(main, null, false);
+    walkRegion(document.body, (el) => el === main || el === overlay || isChrome(el), false);
+    walkRegion(document.body, (el) => el === main || el === overlay, false);
+
+    return lines.join("\\n").slice(0, maxChars + 1);
+}
+"""
+
+EXTRACT_SCRIPT = """
+(opts) => {
+    const HANDLE_ATTR = opts.handleAttr;
+    if (!opts.isMain && (window.innerWidth < 2 || window.innerHeight < 2)) {
+        return { title: document.title, bodyText: "", clickables: [], inputs: [] };
+    }
+    if (window.__agentNextId === undefined) {
+        window.__agentNextId = 0;
+        window.__agentHandlePrefix = opts.isMain
+            ? ""
+            : Math.random().toString(36).slice(2, 6) + "-";
+    }
+
+    const handleOf = (el) => {
+        let id = el.getAttribute(HANDLE_ATTR);
+        if (!id) {
+            id = window.__agentHandlePrefix + String(window.__agentNextId++);
+            el.setAttribute(HANDLE_ATTR, id);
+        }
+        return id;
+    };
+
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width <= 0 || rect.height <= 0) {
+            return false;
+        }
+        const style = window.getComputedStyle(el);
+        return style.visibility !== "hidden" && style.visibility !== "collapse";
+    };
+
+    const PRICE_RE = /\\d[\\d\\s\\u00a0]*(?:[.,]\\d+)?\\s?(?:₽|руб|р\\.|\\$|€|£)/i;
+    const nearPrice = (el) => {
+        let node = el;
+        for (let depth = 0; depth < 3 && node; depth++) {
+            if (PRICE_RE.test((node.textContent || "").slice(0, 400))) {
+                return true;
+            }
+            node = node.parentElement;
+        }
+        return false;
+    };
+
+    const overlay = document.querySelector("[role=dialog], [aria-modal='true']");
+    const clickables = [];
+    const seen = new Set();
+    const addClickables = (root) => {
+        for (const el of root.querySelectorAll(opts.clickableSelector)) {
+            if (clickables.length >= opts.maxElements) {
+                return;
+            }
+            if (seen.has(el)) {
+                continue;
+            }
+            seen.add(el);
+            if (!isVisible(el)) {
+                continue;
+            }
+            let text = (el.innerText || "").trim();
+            if (!text) {
+                text = (el.getAttribute("aria-label") || el.getAttribute("title") || "").trim();
+            }
+            const rect = el.getBoundingClientRect();
+            clickables.push({
+                handle: handleOf(el),
+                tag: el.tagName.toLowerCase(),
+                text: text,
+                href: el.getAttribute("href"),
+                inViewport: rect.bottom > 0 && rect.right > 0
+                    && rect.top < window.innerHeight && rect.left < window.innerWidth,
+                inDialog: !!overlay && overlay.contains(el),
+                nearPrice: nearPrice(el),
+            });
+        }
+    };
+
+    if (overlay) {
+        addClickables(overlay);
+    }
+    addClickables(document);
+
+    const inputs = [];
+    for (const el of document.querySelectorAll(opts.inputSelector)) {
+        if (inputs.length >= opts.maxInputs) {
+            break;
+        }
+        const type = (el.getAttribute("type") || "").toLowerCase();
+        if (["hidden", "submit", "button", "image"].includes(type)) {
+            continue;
+        }
+        if (!isVisible(el)) {
+            continue;
+        }
+        inputs.push({
+            handle: handleOf(el),
+            type: type,
+            placeholder: el.getAttribute("placeholder") || "",
+            name: el.getAttribute("name") || "",
+            label: el.labels && el.labels.length > 0 ? el.labels[0].innerText || "" : "",
+        });
+    }
+
+    const collectText = __COLLECT_TEXT__;
+
+    return {
+        title: document.title,
+        bodyText: collectText(opts.maxTextChars),
+        clickables: clickables,
+        inputs: inputs,
+    };
+}
+""".replace("__COLLECT_TEXT__", COLLECT_TEXT_SCRIPT.strip())
+
+
+def handle_selector(handle: str) -> str:
+    return f'[{HANDLE_ATTR}="{handle}"]'
+
+
+def _script_options(
+    max_elements: int, max_inputs: int, max_text_chars: int, is_main: bool = True
+) -> Dict[str, Any]:
+    return {
+        "handleAttr": HANDLE_ATTR,
+        "clickableSelector": CLICKABLE_SELECTOR,
+        "inputSelector": INPUT_SELECTOR,
+        "maxElements": max_elements,
+        "maxInputs": max_inputs,
+        "maxTextChars": max_text_chars,
+        "isMain": is_main,
+    }
+
+
+def child_frames(page, max_frames: int) -> List[Any]:
+    frames = []
+    for frame in page.frames:
+        if len(frames) >= max_frames:
+            break
+        if frame is page.main_frame or frame.is_detached():
+            continue
+        frames.append(frame)
+    return frames
+
+
+def _wrapped(script: str) -> str:
+    return (
+        f"(arg) => ({{ value: ({script.strip()})(arg), "
+        f"version: ({DOM_VERSION_SCRIPT.strip()})() }})"
+    )
+
+
+def evaluate_in_frames(
+    frames: List[Frame], script: str, arg: Any, timeout_ms: float
+) -> List[Optional[Dict[str, Any]]]:
+    if not frames:
+        return []
+    # The sync API blocks on every call, so run the underlying async frames together on its loop.
+    return frames[0]._sync(
+        async_evaluate_in_frames(
+            [frame._impl_obj for frame in frames], script, arg, timeout_ms
+        )
+    )
+
+
+def frame_versions(results: List[Optional[Dict[str, Any]]]) -> Tuple:
+    return tuple(tuple((result or {}).get("version") or ()) for result in results)
+
+
+def probe_frame_versions(frames: List[Frame], timeout_ms: float) -> Tuple:
+    return frame_versions(evaluate_in_frames(frames, "() => null", None, timeout_ms))
+
+
+def merge_frame_states(
+    raws: List[Optional[Dict[str, Any]]],
+    max_elements: int,
+    max_inputs: int,
+    max_text_chars: int,
+) -> Dict[str, Any]:
+    main = raws[0] or {}
+    frame_clickables = []
+    frame_inputs = []
+    frame_texts = []
+    for frame_index, raw in enumerate(raws[1:], 1):
+        if not raw:
+            continue
+        frame_clickables.extend(dict(item, frame=frame_index) for item in raw.get("clickables") or [])
+        frame_inputs.extend(dict(item, frame=frame_index) for item in raw.get("inputs") or [])
+        if raw.get("bodyText"):
+            frame_texts.append(f"[frame {frame_index}]\n{raw['bodyText']}")
+
+    frame_clickables = frame_clickables[: max_elements // 4]
+    frame_inputs = frame_inputs[: max_inputs // 2]
+    clickables = (main.get("clickables") or [])[: max_elements - len(frame_clickables)]
+    inputs = (main.get("inputs") or [])[: max_inputs - len(frame_inputs)]
+
+    body_text = main.get("bodyText") or ""
+    if frame_texts:
+        body_text = "\n".join([body_text[: max_text_chars * 3 // 4]] + frame_texts)
+    return {
+        "title": main.get("title") or "",
+        "bodyText": body_text[: max_text_chars + 1],
+        "clickables": clickables + frame_clickables,
+        "inputs": inputs + frame_inputs,
+    }
+
+
+def extract_page_state(
+    page: Page,
+    max_elements: int,
+    max_inputs: int,
+    max_text_chars: int,
+    max_frames: int = 0,
+    frame_timeout_ms: float = 0,
+) -> Dict[str, Any]:
+    main = page.evaluate(EXTRACT_SCRIPT, _script_options(max_elements, max_inputs, max_text_chars))
+    frames = child_frames(page, max_frames)
+    frame_options = _script_options(max_elements, max_inputs, max_text_chars, is_main=False)
+    results = evaluate_in_frames(frames, EXTRACT_SCRIPT, frame_options, frame_timeout_ms)
+    raws = [main] + [result["value"] if result else None for result in results]
+
+    state = parse_page_state(
+        merge_frame_states(raws, max_elements, max_inputs, max_text_chars), max_text_chars
+    )
+    state["frames"] = [page.main_frame] + frames
+    state["frame_versions"] = frame_versions(results)
+    return state
+
+
+async def async_evaluate_in_frame(frame, script: str, arg: Any, timeout_ms: float):
+    try:
+        return await asyncio.wait_for(frame.evaluate(_wrapped(script), arg), timeout_ms / 1000)
+    except Exception:
+        return None
+
+
+async def async_evaluate_in_frames(
+    frames: List[Any], script: str, arg: Any, timeout_ms: float
+) -> List[Optional[Dict[str, Any]]]:
+    return list(
+        await asyncio.gather(
+            *(async_evaluate_in_frame(frame, script, arg, timeout_ms) for frame in frames)
+        )
+    )
+
+
+async def async_probe_frame_versions(frames: List[Any], timeout_ms: float) -> Tuple:
+    return frame_versions(await async_evaluate_in_frames(frames, "() => null", None, timeout_ms))
+
+
+async def async_extract_page_state(
+    page,
+    max_elements: int,
+    max_inputs: int,
+    max_text_chars: int,
+    max_frames: int = 0,
+    frame_timeout_ms: float = 0,
+) -> Dict[str, Any]:
+    frames = child_frames(page, max_frames)
+    frame_options = _script_options(max_elements, max_inputs, max_text_chars, is_main=False)
+    main, results = await asyncio.gather(
+        page.evaluate(EXTRACT_SCRIPT, _script_options(max_elements, max_inputs, max_text_chars)),
+        async_evaluate_in_frames(frames, EXTRACT_SCRIPT, frame_options, frame_timeout_ms),
+    )
+    raws = [main] + [result["value"] if result else None for result in results]
+    state = parse_page_state(
+        merge_frame_states(raws, max_elements, max_inputs, max_text_chars), max_text_chars
+    )
+    state["frames"] = [page.main_frame] + frames
+    state["frame_versions"] = frame_versions(results)
+    return state
+
+
+def extract_page_text(page: Page, max_text_chars: int) -> str:
+    text = page.evaluate(COLLECT_TEXT_SCRIPT, max_text_chars)
+    return normalize_body_text(text, max_text_chars)
+
+
+def normalize_body_text(text: str, max_text_chars: int) -> str:
+    text = text or ""
+    if len(text) > max_text_chars:
+        text = text[:max_text_chars] + "…"
+    return text
+
+
+def parse_page_state(raw: Dict[str, Any], max_text_chars: int) -> Dict[str, Any]:
+    body_text = normalize_body_text(raw.get("bodyText"), max_text_chars)
+
+    elements: List[Dict[str, Any]] = []
+    for item in raw.get("clickables") or []:
+        elements.append(
+            {
+                "index": len(elements),
+                "tag": item.get("tag") or "unknown",
+                "text": (item.get("text") or "")[:120],
+                "href": item.get("href"),
+                "selector": handle_selector(item["handle"]),
+                "nth": 0,
+                "frame": item.get("frame", 0),
+                "signals": {
+                    "in_viewport": bool(item.get("inViewport")),
+                    "in_dialog": bool(item.get("inDialog")),
+                    "near_price": bool(item.get("nearPrice")),
+                },
+            }
+        )
+
+    input_elements: List[Dict[str, Any]] = []
+    for item in raw.get("inputs") or []:
+        input_elements.append(
+            {
+                "index": len(input_elements),
+                "type": item.get("type") or "",
+                "placeholder": (item.get("placeholder") or "")[:120],
+                "name": (item.get("name") or "")[:120],
+                "label": (item.get("label") or "").strip()[:120],
+                "selector": handle_selector(item["handle"]),
+                "nth": 0,
+                "frame": item.get("frame", 0),
+            }
+        )
+
+    return {
+        "title": raw.get("title") or "",
+        "body_text": body_text,
+        "clickable_elements": elements,
+        "input_elements": input_elements,
+    }
@@ -0,0 +1,117 @@
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from config import (
+    ELEMENT_TOKEN_BUDGET,
+    MAX_ELEMENTS,
+    RANK_MEMORY_WEIGHT,
+    RANK_BOOST_DIALOG,
+    RANK_BOOST_VIEWPORT,
+    RANK_BOOST_PRICE,
+)
+from token_counter import CHARS_PER_TOKEN, count_tokens
+from observation_format import VerboseSerializer, get_serializer
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+STEM_LENGTH = 5
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in re.findall(r"\w+", (text or "").lower()):
+        if len(word) < 2:
+            continue
+        tokens.append(word[:STEM_LENGTH])
+    return tokens
+
+
+def _element_tokens(el: Dict[str, Any]) -> List[str]:
+    return tokenize(f"{el.get('text', '')} {el.get('href') or ''}")
+
+
+def _rough_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def bm25_scores(documents: List[List[str]], query: List[str]) -> List[float]:
+    if not documents or not query:
+        return [0.0] * len(documents)
+    n = len(documents)
+    avg_len = sum(len(d) for d in documents) / n or 1.0
+    doc_freq: Counter = Counter()
+    for doc in documents:
+        doc_freq.update(set(doc))
+
+    query_terms = Counter(query)
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        score = 0.0
+        for term, query_count in query_terms.items():
+            tf = counts.get(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (n - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_len)
+            score += query_count * idf * tf * (BM25_K1 + 1) / norm
+        scores.append(score)
+    return scores
+
+
+def rank_elements(
+    elements: List[Dict[str, Any]],
+    task: str,
+    memory_text: str = "",
+    token_budget: int = ELEMENT_TOKEN_BUDGET,
+    max_elements: int = MAX_ELEMENTS,
+    serializer: Optional[VerboseSerializer] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    serializer = serializer or get_serializer()
+    documents = [_element_tokens(el) for el in elements]
+    task_scores = bm25_scores(documents, tokenize(task))
+    memory_scores = bm25_scores(documents, tokenize(memory_text))
+
+    scored = []
+    for position, el in enumerate(elements):
+        signals = el.get("signals") or {}
+        score = task_scores[position] + RANK_MEMORY_WEIGHT * memory_scores[position]
+        if signals.get("in_dialog"):
+            score += RANK_BOOST_DIALOG
+        if signals.get("in_viewport"):
+            score += RANK_BOOST_VIEWPORT
+        if signals.get("near_price"):
+            score += RANK_BOOST_PRICE
+        scored.append((score, -position, el))
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    selected: List[Tuple[Dict[str, Any], str, int]] = []
+    rough = 0
+    for score, _, el in scored:
+        if len(selected) >= max_elements:
+            break
+        line = serializer.clickable(el)
+        cost = _rough_tokens(line)
+        if rough + cost > token_budget:
+            continue
+        rough += cost
+        selected.append((el, line, cost))
+
+    # Elements are costed by characters; only the kept block is run through the tokenizer.
+    tokens = count_tokens("\n".join(line for _, line, _ in selected))
+    while tokens > token_budget and selected:
+        target = rough * token_budget // tokens
+        while selected and rough > target:
+            rough -= selected.pop()[2]
+        tokens = count_tokens("\n".join(line for _, line, _ in selected))
+
+    kept_ids = {id(el) for el, _, _ in selected}
+    kept = [el for el in elements if id(el) in kept_ids]
+    stats = {
+        "candidates": len(elements),
+        "kept": len(kept),
+        "pruned": len(elements) - len(kept),
+        "tokens": tokens,
+    }
+    return kept, stats
@@ -0,0 +1,153 @@
+import json
+from typing import List, Dict, Any, Optional
+from config import (
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_STEPS,
+    HISTORY_RESYNC_RATIO,
+    HISTORY_COMPACT_TARGET_RATIO,
+)
+from memory import ConversationMemory
+from token_counter import count_tokens
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return count_tokens(text)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        tokens += estimate_tokens(json.dumps(tool_call["function"], ensure_ascii=False))
+    return tokens
+
+
+class ConversationHistory:
+    def __init__(
+        self,
+        system_prompt: str,
+        task_message: str,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+    ):
+        self.head: List[Dict[str, Any]] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": task_message},
+        ]
+        self.token_budget = token_budget
+        self.turns: List[Dict[str, Any]] = []
+        self.compacted = ConversationMemory(max_steps_in_memory=HISTORY_SUMMARY_STEPS)
+        self.compacted_turns = 0
+        self.prompt_tokens_per_step: List[Dict[str, Any]] = []
+        self._last_messages: List[Dict[str, Any]] = []
+
+    def start_turn(self, step: int, observation: Dict[str, Any], content: str, full: bool) -> None:
+        self.turns.append(
+            {
+                "step": step,
+                "observation": {"url": observation.get("url"), "title": observation.get("title")},
+                "full": full,
+                "messages": [{"role": "user", "content": content}],
+                "actions": [],
+            }
+        )
+
+    def add_message(self, message: Dict[str, Any]) -> None:
+        self.turns[-1]["messages"].append(message)
+
+    def add_action(self, action: Dict[str, Any], result: str) -> None:
+        self.turns[-1]["actions"].append({"action": action, "result": result})
+
+    def _turn_tokens(self, turn: Dict[str, Any]) -> int:
+        return sum(message_tokens(m) for m in turn["messages"])
+
+    def _last_full_turn(self) -> Optional[int]:
+        for i in range(len(self.turns) - 1, -1, -1):
+            if self.turns[i]["full"]:
+                return i
+        return None
+
+    def needs_full_observation(self) -> bool:
+        anchor = self._last_full_turn()
+        if anchor is None:
+            return True
+        tokens = sum(message_tokens(m) for m in self.head)
+        tokens += sum(self._turn_tokens(t) for t in self.turns[anchor:])
+        return tokens > self.token_budget * HISTORY_RESYNC_RATIO
+
+    def _compact(self, turn: Dict[str, Any]) -> None:
+        for item in turn["actions"]:
+            self.compacted.add_step(
+                observation=turn["observation"],
+                action=item["action"],
+                result=item["result"],
+            )
+        self.compacted_turns += 1
+
+    def build(self) -> List[Dict[str, Any]]:
+        available = self.token_budget - sum(message_tokens(m) for m in self.head)
+        if self.compacted.steps:
+            available -= estimate_tokens(self.compacted.as_text())
+        turn_tokens = [self._turn_tokens(t) for t in self.turns]
+        keep_from = 0
+        if sum(turn_tokens) > available:
+            target = available * HISTORY_COMPACT_TARGET_RATIO
+            keep_from = len(self.turns) - 1
+            used = turn_tokens[-1]
+            for i in range(len(self.turns) - 2, -1, -1):
+                if used + turn_tokens[i] > target:
+                    break
+                used += turn_tokens[i]
+                keep_from = i
+            anchor = self._last_full_turn()
+            if anchor is not None:
+                keep_from = min(keep_from, anchor)
+
+        for turn in self.turns[:keep_from]:
+            self._compact(turn)
+        self.turns = self.turns[keep_from:]
+
+        messages = list(self.head)
+        if self.compacted.steps:
+            messages.append(
+                {
+                    "role": "user",
+                    "content": (
+                        "Earlier steps (observations compacted):\n" + self.compacted.as_text()
+                    ),
+                }
+            )
+        for turn in self.turns:
+            messages.extend(turn["messages"])
+        return messages
+
+    def record_prompt_tokens(
+        self,
+        step: int,
+        messages: List[Dict[str, Any]],
+        usage: Optional[Any] = None,
+    ) -> Dict[str, Any]:
+        shared = 0
+        for previous, current in zip(self._last_messages, messages):
+            if previous != current:
+                break
+            shared += 1
+        self._last_messages = list(messages)
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        entry = {
+            "step": step,
+            "estimated_tokens": sum(message_tokens(m) for m in messages),
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "cached_tokens": getattr(details, "cached_tokens", None) if details else None,
+            "reused_prefix_tokens": sum(message_tokens(m) for m in messages[:shared]),
+            "messages": len(messages),
+            "compacted_turns": self.compacted_turns,
+        }
+        self.prompt_tokens_per_step.append(entry)
+        return entry
+
+    def prefix_cache_hit_rate(self) -> float:
+        prompt = sum(e["prompt_tokens"] or 0 for e in self.prompt_tokens_per_step)
+        cached = sum(e["cached_tokens"] or 0 for e in self.prompt_tokens_per_step)
+        return cached / prompt if prompt else 0.0
@@ -0,0 +1,359 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import SimpleNamespace
+from typing import Dict, Any, Optional
+import httpx
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    RateLimitError,
+)
+from openai.types.chat import ChatCompletion
+from config import (
+    OPENAI_API_KEY,
+    LLM_TIMEOUT_S,
+    LLM_CONNECT_TIMEOUT_S,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_S,
+    LLM_RETRY_MAX_S,
+    LLM_HEDGE_AFTER_S,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_POOL_MAX_KEEPALIVE,
+    LLM_CACHE_DIR,
+)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+CACHE_KEY_FIELDS = ("model", "messages", "tools", "tool_choice", "temperature")
+STREAM_ONLY_FIELDS = ("stream", "stream_options")
+
+
+def cache_key(request: Dict[str, Any]) -> str:
+    payload = {field: request.get(field) for field in CACHE_KEY_FIELDS}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, data: Dict[str, Any]) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def _as_stream(response):
+    message = response.choices[0].message
+    tool_calls = [
+        SimpleNamespace(
+            index=index,
+            id=tool_call.id,
+            function=SimpleNamespace(
+                name=tool_call.function.name, arguments=tool_call.function.arguments
+            ),
+        )
+        for index, tool_call in enumerate(message.tool_calls or [])
+    ]
+    delta = SimpleNamespace(content=message.content, tool_calls=tool_calls or None)
+    yield SimpleNamespace(
+        choices=[
+            SimpleNamespace(index=0, delta=delta, finish_reason=response.choices[0].finish_reason)
+        ],
+        usage=None,
+    )
+    yield SimpleNamespace(choices=[], usage=response.usage)
+
+
+async def _as_async_stream(response):
+    for chunk in _as_stream(response):
+        yield chunk
+
+
+def _discard_result(future) -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if close is None:
+        return
+    result = close()
+    if asyncio.iscoroutine(result):
+        asyncio.ensure_future(result)
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT_S, connect=LLM_CONNECT_TIMEOUT_S)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+    )
+
+
+class _ResilientClientBase:
+    def __init__(
+        self,
+        max_retries: int,
+        hedge_after_s: Optional[float],
+        cache_dir: Optional[str],
+    ):
+        self.max_retries = max_retries
+        self.hedge_after_s = hedge_after_s
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.stats = {
+            "calls": 0,
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "server_errors": 0,
+            "failed": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        }
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _retryable(self, error: Exception) -> bool:
+        if isinstance(error, RateLimitError):
+            self._count("rate_limited")
+            return True
+        if isinstance(error, APITimeoutError):
+            self._count("timeouts")
+            return True
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS:
+            self._count("server_errors")
+            return True
+        return False
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after:
+                return min(float(retry_after), LLM_RETRY_MAX_S)
+        except ValueError:
+            pass
+        delay = min(LLM_RETRY_MAX_S, LLM_RETRY_BASE_S * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _lookup(self, request: Dict[str, Any]):
+        if self.cache is None:
+            return None, None
+        key = cache_key(request)
+        cached = self.cache.get(key)
+        if cached is None:
+            self._count("cache_misses")
+            return key, None
+        self._count("cache_hits")
+        return key, ChatCompletion.model_validate(cached)
+
+    def _store(self, key: Optional[str], response) -> None:
+        if key is not None:
+            self.cache.put(key, response.model_dump(mode="json"))
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["cache_hits"] + self.stats["cache_misses"]
+        return self.stats["cache_hits"] / lookups if lookups else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["cache_hit_rate"] = round(self.hit_rate(), 3)
+        return stats
+
+
+class LLMClient(_ResilientClientBase):
+    def __init__(
+        self,
+        client: Optional[OpenAI] = None,
+        max_retries: int = LLM_MAX_RETRIES,
+        hedge_after_s: Optional[float] = LLM_HEDGE_AFTER_S,
+        cache_dir: Optional[str] = LLM_CACHE_DIR,
+    ):
+        super().__init__(max_retries, hedge_after_s, cache_dir)
+        self.client = client or OpenAI(
+            api_key=OPENAI_API_KEY,
+            max_retries=0,
+            timeout=_timeout(),
+            http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=LLM_POOL_MAX_CONNECTIONS)
+
+    def _request(self, request: Dict[str, Any]):
+        self._count("requests")
+        return self.client.chat.completions.create(**request)
+
+    def _hedged(self, request: Dict[str, Any]):
+        primary = self._executor.submit(self._request, request)
+        done, _ = wait([primary], timeout=self.hedge_after_s)
+        if done:
+            return primary.result()
+
+        self._count("hedged")
+        hedge = self._executor.submit(self._request, request)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    for other in {primary, hedge} - {future}:
+                        other.add_done_callback(_discard_result)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _with_retries(self, request: Dict[str, Any], hedge: bool):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if hedge and self.hedge_after_s:
+                    return self._hedged(request)
+                return self._request(request)
+            except Exception as e:
+                if not self._retryable(e) or attempt == self.max_retries:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                time.sleep(self._retry_delay(attempt, e))
+
+    def create(self, **request):
+        self._count("calls")
+        stream = request.get("stream", False)
+        key, cached = self._lookup(request)
+        if cached is not None:
+            return _as_stream(cached) if stream else cached
+        if key is None:
+            return self._with_retries(request, hedge=True)
+
+        plain = {k: v for k, v in request.items() if k not in STREAM_ONLY_FIELDS}
+        response = self._with_retries(plain, hedge=True)
+        self._store(key, response)
+        return _as_stream(response) if stream else response
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.client.close()
+
+
+class AsyncLLMClient(_ResilientClientBase):
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        max_retries: int = LLM_MAX_RETRIES,
+        hedge_after_s: Optional[float] = LLM_HEDGE_AFTER_S,
+        cache_dir: Optional[str] = LLM_CACHE_DIR,
+    ):
+        super().__init__(max_retries, hedge_after_s, cache_dir)
+        self.client = client or AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            max_retries=0,
+            timeout=_timeout(),
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        )
+
+    async def _request(self, request: Dict[str, Any]):
+        self._count("requests")
+        return await self.client.chat.completions.create(**request)
+
+    async def _hedged(self, request: Dict[str, Any]):
+        primary = asyncio.ensure_future(self._request(request))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after_s)
+        if done:
+            return primary.result()
+
+        self._count("hedged")
+        hedge = asyncio.ensure_future(self._request(request))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        for other in {primary, hedge} - {task}:
+                            other.add_done_callback(_discard_result)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _with_retries(self, request: Dict[str, Any], hedge: bool):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if hedge and self.hedge_after_s:
+                    return await self._hedged(request)
+                return await self._request(request)
+            except Exception as e:
+                if not self._retryable(e) or attempt == self.max_retries:
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                await asyncio.sleep(self._retry_delay(attempt, e))
+
+    async def create(self, **request):
+        self._count("calls")
+        stream = request.get("stream", False)
+        key, cached = self._lookup(request)
+        if cached is not None:
+            return _as_async_stream(cached) if stream else cached
+        if key is None:
+            return await self._with_retries(request, hedge=True)
+
+        plain = {k: v for k, v in request.items() if k not in STREAM_ONLY_FIELDS}
+        response = await self._with_retries(plain, hedge=True)
+        self._store(key, response)
+        return _as_async_stream(response) if stream else response
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+_shared_client: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = LLMClient()
+        return _shared_client
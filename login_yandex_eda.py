@@ -1,4 +1,5 @@
 from playwright.sync_api import sync_playwright
+from config import PROFILE_SNAPSHOT_PATH
 
 def main():
     with sync_playwright() as p:
@@ -8,6 +9,7 @@ def main():
         )
         page = context.pages[0] if context.pages else context.new_page()
         page.goto("https://eda.yandex.ru")
+        context.storage_state(path=PROFILE_SNAPSHOT_PATH)
         context.close()
 
 if __name__ == "__main__":
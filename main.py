@@ -1,19 +1,34 @@
+import argparse
 from browser_controller import BrowserController
 from agent import AutonomousAgent
 
 def main():
-    print("Надо сюда ввести задачу (например: 'Закажи бургер из яндекс еды на мой адрес').\n")
+    parser = argparse.ArgumentParser(description="Run the browser agent.")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        help="Continue an interrupted run from checkpoints/ (run id, latest by default).",
+    )
+    args = parser.parse_args()
 
-    task = input("Опиши задачу для агента: ").strip()
-    if not task:
-        print("Пустая задача. Закрытие")
-        return
+    task = ""
+    if not args.resume:
+        print("Надо сюда ввести задачу (например: 'Закажи бургер из яндекс еды на мой адрес').\n")
+
+        task = input("Опиши задачу для агента: ").strip()
+        if not task:
+            print("Пустая задача. Закрытие")
+            return
 
     browser = BrowserController(user_data_dir="user_data")
     agent = AutonomousAgent(browser)
 
     try:
-        agent.run(task)
+        if args.resume:
+            agent.resume(None if args.resume == "latest" else args.resume)
+        else:
+            agent.run(task)
         input(
             "\nАгент закончил. Теперь ты можешь вручную ввести данные карты "
             "и завершить заказ в открытом браузере.\n"
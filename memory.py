@@ -1,4 +1,8 @@
-from typing import List, Dict
+import json
+import re
+from collections import Counter, deque
+from typing import List, Dict, Deque, Optional, Tuple
+from config import MAX_STEPS, LOOP_HINT_REPEATS, LOOP_BLOCK_REPEATS, STALL_ABORT_STEPS
 
 
 class ConversationMemory:
@@ -31,3 +35,148 @@ class ConversationMemory:
                 f"Action={step['action']}, Result={step['result']}"
             )
         return "\n".join(lines)
+
+
+def state_fingerprint(observation: Dict) -> Tuple:
+    elements = tuple(
+        (el.get("role") or el.get("tag"), el.get("text"), el.get("href"))
+        for el in observation.get("clickable_elements") or []
+    )
+    inputs = tuple(
+        (inp.get("type"), inp.get("placeholder"), inp.get("label"))
+        for inp in observation.get("input_elements") or []
+    )
+    # Digits are masked so timers and live prices do not look like a new page.
+    text = re.sub(r"\d+", "#", (observation.get("body_text") or "")[:1000])
+    return (observation.get("url"), hash((elements, inputs, text)))
+
+
+def action_fingerprint(tool_name: str, args: Dict) -> Tuple:
+    return (tool_name, json.dumps(args, sort_keys=True, ensure_ascii=False))
+
+
+def _changes_page(tool_name: str, args: Dict) -> bool:
+    if tool_name in ("type_into_input_index", "type_into_selector"):
+        return bool(args.get("press_enter"))
+    if tool_name == "press_key":
+        return args.get("key") == "Enter"
+    return tool_name not in ("finish_task", "explore_links")
+
+
+class ProgressMonitor:
+    def __init__(
+        self,
+        hint_repeats: int = LOOP_HINT_REPEATS,
+        block_repeats: int = LOOP_BLOCK_REPEATS,
+        stall_abort_steps: int = STALL_ABORT_STEPS,
+        max_steps: int = MAX_STEPS,
+    ):
+        self.hint_repeats = hint_repeats
+        self.block_repeats = block_repeats
+        self.stall_abort_steps = stall_abort_steps
+        self.max_steps = max_steps
+        self.reset()
+
+    def reset(self) -> None:
+        self.attempts: Dict[Tuple, Counter] = {}
+        self.seen_states: set = set()
+        self.recent_states: Deque[Tuple] = deque(maxlen=4)
+        self.state: Optional[Tuple] = None
+        self.step_actions: List[Tuple] = []
+        self.stall_steps = 0
+        self.noop_streak = 0
+        self.blocked_repeats = 0
+        self.warnings: List[str] = []
+        self.stats = {"hints": 0, "blocked": 0, "noops": 0, "oscillations": 0, "steps_saved": 0}
+
+    def observe(self, step: int, observation: Dict) -> Optional[str]:
+        state = state_fingerprint(observation)
+        self.warnings = []
+        navigating = any(_changes_page(tool, json.loads(args)) for tool, args in self.step_actions)
+
+        if self.state is not None and state == self.state and navigating:
+            self.noop_streak += 1
+            self.stats["noops"] += 1
+            self.warnings.append(
+                "The previous actions did not change the page at all. Do not repeat them; "
+                "try a different element, scroll, or navigate elsewhere."
+            )
+        else:
+            self.noop_streak = 0
+
+        if state in self.seen_states:
+            if navigating:
+                self.stall_steps += 1
+        else:
+            self.stall_steps = 0
+            self.blocked_repeats = 0
+            self.seen_states.add(state)
+
+        self.recent_states.append(state)
+        if (
+            len(self.recent_states) == 4
+            and self.recent_states[0] == self.recent_states[2]
+            and self.recent_states[1] == self.recent_states[3]
+            and self.recent_states[0] != self.recent_states[1]
+        ):
+            self.stats["oscillations"] += 1
+            self.warnings.append(
+                "You are going back and forth between the same two pages "
+                f"({self.recent_states[0][0]} and {self.recent_states[1][0]}). "
+                "Break the cycle with a different approach."
+            )
+
+        repeated = [
+            f"{tool}({args}) x{count}"
+            for (tool, args), count in self.attempts.get(state, {}).items()
+            if count >= self.hint_repeats
+        ]
+        if repeated:
+            self.warnings.append(
+                "Already tried on this exact page state without progress: "
+                + ", ".join(repeated)
+                + ". Repeating them will be blocked."
+            )
+
+        self.state = state
+        self.step_actions = []
+        if self.warnings:
+            self.stats["hints"] += 1
+
+        if self.stall_steps >= self.stall_abort_steps or self.blocked_repeats >= 2:
+            self.stats["steps_saved"] = max(0, self.max_steps - step + 1)
+            return (
+                f"No progress for {self.stall_steps} steps (only already visited page states, "
+                f"{self.stats['noops']} no-op steps, {self.stats['blocked']} blocked repeats, "
+                f"{self.stats['oscillations']} oscillations); stopping early."
+            )
+        return None
+
+    def hint(self) -> str:
+        if not self.warnings:
+            return ""
+        return "Progress warning:\n" + "\n".join(f"- {w}" for w in self.warnings) + "\n\n"
+
+    def check_action(self, tool_name: str, args: Dict) -> Optional[str]:
+        if self.state is None or tool_name == "finish_task":
+            return None
+        attempts = self.attempts.get(self.state, {}).get(action_fingerprint(tool_name, args), 0)
+        if attempts >= self.block_repeats:
+            self.stats["blocked"] += 1
+            self.blocked_repeats += 1
+            return (
+                f"Blocked: {tool_name}({args}) was already tried {attempts} times on this "
+                "unchanged page without progress. Choose a different action."
+            )
+        return None
+
+    def record_action(self, tool_name: str, args: Dict, result: str) -> None:
+        if self.state is None:
+            return
+        action = action_fingerprint(tool_name, args)
+        self.step_actions.append(action)
+        if not result.startswith("Blocked:"):
+            attempts = self.attempts.setdefault(self.state, Counter())
+            if not attempts[action] and not result.startswith("ERROR"):
+                self.blocked_repeats = 0
+            attempts[action] += 1
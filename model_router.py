@@ -0,0 +1,109 @@
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+from config import (
+    ROUTER_ENABLED,
+    ROUTER_FAST_MODEL,
+    ROUTER_STRONG_MODEL,
+    ROUTER_ESCALATE_ON,
+    ROUTER_STRONG_STEPS,
+    ROUTER_STAGE_KEYWORDS,
+)
+
+ESCALATION_REASONS = ("tool_error", "invalid_json", "low_confidence", "stage_change", "stall")
+
+
+def page_stage(observation: Dict[str, Any], keywords: List[str] = ROUTER_STAGE_KEYWORDS) -> str:
+    url = observation.get("url") or ""
+    text = f"{urlparse(url).path} {observation.get('title') or ''}".lower()
+    for keyword in keywords:
+        if keyword in text:
+            return keyword
+    return urlparse(url).hostname or ""
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        fast_model: str = ROUTER_FAST_MODEL,
+        strong_model: str = ROUTER_STRONG_MODEL,
+        escalate_on: List[str] = ROUTER_ESCALATE_ON,
+        strong_steps: int = ROUTER_STRONG_STEPS,
+        enabled: bool = ROUTER_ENABLED,
+    ):
+        unknown = set(escalate_on) - set(ESCALATION_REASONS)
+        if unknown:
+            raise ValueError(f"Unknown escalation reasons {sorted(unknown)}")
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.escalate_on = set(escalate_on)
+        self.strong_steps = strong_steps
+        self.enabled = enabled and fast_model != strong_model
+        self.reset()
+
+    def reset(self) -> None:
+        self.pending: List[str] = []
+        self.strong_left = 0
+        self.stage: Optional[str] = None
+        self.decisions = 0
+        self.escalations = 0
+        self.reasons: Dict[str, int] = {}
+        self.models: Dict[str, Dict[str, Any]] = {}
+
+    def escalate(self, reason: str) -> None:
+        if self.enabled and reason in self.escalate_on and reason not in self.pending:
+            self.pending.append(reason)
+
+    def note_tool_result(self, result_text: str) -> None:
+        if result_text.startswith(("ERROR", "Unknown tool", "Blocked:")):
+            self.escalate("tool_error")
+
+    def choose(self, observation: Dict[str, Any]) -> str:
+        if not self.enabled:
+            return self.strong_model
+        stage = page_stage(observation)
+        if self.stage is not None and stage != self.stage:
+            self.escalate("stage_change")
+        self.stage = stage
+
+        self.decisions += 1
+        if self.pending:
+            self.escalations += 1
+            for reason in self.pending:
+                self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            self.pending = []
+            self.strong_left = self.strong_steps
+        if self.strong_left > 0:
+            self.strong_left -= 1
+            return self.strong_model
+        return self.fast_model
+
+    def record(self, model: str, latency_ms: float, usage: Dict[str, Any]) -> None:
+        stats = self.models.setdefault(
+            model,
+            {
+                "calls": 0,
+                "latency_ms": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cached_tokens": 0,
+            },
+        )
+        stats["calls"] += 1
+        stats["latency_ms"] += latency_ms
+        for field in ("prompt_tokens", "completion_tokens", "cached_tokens"):
+            stats[field] += usage.get(field) or 0
+
+    def escalation_rate(self) -> float:
+        return self.escalations / self.decisions if self.decisions else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        models = {}
+        for model, stats in self.models.items():
+            models[model] = dict(stats, latency_ms=round(stats["latency_ms"], 1))
+            models[model]["latency_ms_avg"] = round(stats["latency_ms"] / stats["calls"], 1)
+        return {
+            "models": models,
+            "escalations": self.escalations,
+            "escalation_rate": round(self.escalation_rate(), 3),
+            "reasons": dict(self.reasons),
+        }
@@ -0,0 +1,177 @@
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+from config import NETWORK_PROFILE
+
+TRACKER_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "mc.yandex.ru",
+    "mc.yandex.com",
+    "an.yandex.ru",
+    "adfox.ru",
+    "adfox.yandex.ru",
+    "top-fwz1.mail.ru",
+    "ad.mail.ru",
+    "connect.facebook.net",
+    "criteo.com",
+    "criteo.net",
+    "hotjar.com",
+    "scorecardresearch.com",
+    "sentry.io",
+    "tiktok.com",
+    "vk.com/rtrg",
+]
+
+PROFILES: Dict[str, Dict[str, List[str]]] = {
+    "off": {
+        "block_resource_types": [],
+        "block_domains": [],
+        "allow_domains": [],
+    },
+    "agent": {
+        "block_resource_types": ["image", "media", "font"],
+        "block_domains": TRACKER_DOMAINS,
+        "allow_domains": [],
+    },
+}
+
+DEFAULT_BYTES_BY_TYPE = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "script": 60_000,
+    "stylesheet": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+
+
+def _domain_matches(url: str, rules: List[str]) -> Optional[str]:
+    parsed = urlparse(url)
+    host = parsed.hostname or ""
+    for rule in rules:
+        domain, _, path = rule.partition("/")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        if path and not parsed.path.lstrip("/").startswith(path):
+            continue
+        return rule
+    return None
+
+
+class RoutingPolicy:
+    def __init__(
+        self,
+        profile: str = NETWORK_PROFILE,
+        block_resource_types: Optional[List[str]] = None,
+        block_domains: Optional[List[str]] = None,
+        allow_domains: Optional[List[str]] = None,
+    ):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown network profile {profile!r}")
+        rules = PROFILES[profile]
+        self.profile = profile
+        self.block_resource_types = set(
+            rules["block_resource_types"] if block_resource_types is None else block_resource_types
+        )
+        self.block_domains = list(
+            rules["block_domains"] if block_domains is None else block_domains
+        )
+        self.allow_domains = list(
+            rules["allow_domains"] if allow_domains is None else allow_domains
+        )
+
+        self.totals = self._empty_stats()
+        self.step = self._empty_stats()
+        self._bytes_seen: Dict[str, List[int]] = {}
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            "requests_allowed": 0,
+            "requests_blocked": 0,
+            "bytes_saved_estimate": 0,
+            "blocked_by_type": {},
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.block_resource_types or self.block_domains)
+
+    def decide(self, url: str, resource_type: str) -> Optional[str]:
+        if url.startswith(("data:", "blob:", "about:")):
+            return None
+        if self.allow_domains and _domain_matches(url, self.allow_domains):
+            return None
+        if resource_type in self.block_resource_types:
+            return f"type:{resource_type}"
+        rule = _domain_matches(url, self.block_domains)
+        if rule:
+            return f"domain:{rule}"
+        return None
+
+    def _estimated_bytes(self, resource_type: str) -> int:
+        seen = self._bytes_seen.get(resource_type)
+        if seen and seen[0]:
+            return seen[1] // seen[0]
+        return DEFAULT_BYTES_BY_TYPE.get(resource_type, 10_000)
+
+    def _count(self, resource_type: str, blocked: bool) -> None:
+        for stats in (self.totals, self.step):
+            if blocked:
+                stats["requests_blocked"] += 1
+                stats["bytes_saved_estimate"] += self._estimated_bytes(resource_type)
+                by_type = stats["blocked_by_type"]
+                by_type[resource_type] = by_type.get(resource_type, 0) + 1
+            else:
+                stats["requests_allowed"] += 1
+
+    def _on_response(self, response) -> None:
+        try:
+            length = int(response.headers.get("content-length") or 0)
+            resource_type = response.request.resource_type
+        except Exception:
+            return
+        if length <= 0:
+            return
+        seen = self._bytes_seen.setdefault(resource_type, [0, 0])
+        seen[0] += 1
+        seen[1] += length
+
+    def _handle(self, route) -> None:
+        request = route.request
+        blocked = self.decide(request.url, request.resource_type) is not None
+        self._count(request.resource_type, blocked)
+        if blocked:
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    async def _handle_async(self, route) -> None:
+        request = route.request
+        blocked = self.decide(request.url, request.resource_type) is not None
+        self._count(request.resource_type, blocked)
+        if blocked:
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def install(self, context) -> None:
+        if not self.enabled:
+            return
+        context.on("response", self._on_response)
+        context.route("**/*", self._handle)
+
+    async def install_async(self, context) -> None:
+        if not self.enabled:
+            return
+        context.on("response", self._on_response)
+        await context.route("**/*", self._handle_async)
+
+    def take_step_stats(self) -> Dict[str, Any]:
+        stats = self.step
+        self.step = self._empty_stats()
+        return stats
@@ -0,0 +1,56 @@
+from typing import Dict, Any, Optional, Tuple
+
+
+class ObservationCache:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.key: Optional[Tuple] = None
+        self.observation: Optional[Dict[str, Any]] = None
+        self.frame_versions: Tuple = ()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def _copy(observation: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(
+            observation,
+            clickable_elements=list(observation["clickable_elements"]),
+            input_elements=list(observation["input_elements"]),
+        )
+
+    def needs_frame_versions(self, key: Optional[Tuple]) -> bool:
+        return self.enabled and key is not None and key == self.key and bool(self.frame_versions)
+
+    def lookup(
+        self, key: Optional[Tuple], frame_versions: Optional[Tuple] = None
+    ) -> Optional[Dict[str, Any]]:
+        if (
+            self.enabled
+            and key is not None
+            and key == self.key
+            and (not self.frame_versions or frame_versions == self.frame_versions)
+        ):
+            self.stats["hits"] += 1
+            return self._copy(self.observation)
+        self.stats["misses"] += 1
+        return None
+
+    def store(
+        self, key: Optional[Tuple], observation: Dict[str, Any], frame_versions: Tuple = ()
+    ) -> None:
+        if not self.enabled or key is None:
+            self.invalidate()
+            return
+        self.key = key
+        self.observation = self._copy(observation)
+        self.frame_versions = frame_versions
+
+    def invalidate(self) -> None:
+        if self.key is not None:
+            self.stats["invalidations"] += 1
+        self.key = None
+        self.observation = None
+        self.frame_versions = ()
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
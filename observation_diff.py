@@ -0,0 +1,198 @@
+import re
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, Optional, Tuple
+from config import OBS_DIFF_MAX_RATIO
+from observation_format import VerboseSerializer, get_serializer
+
+
+def split_text_sections(text: str) -> List[str]:
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+    if len(lines) > 1:
+        return lines
+    return [part for part in re.split(r"(?<=[.!?…])\s+", text.strip()) if part]
+
+
+def _element_key(el: Dict[str, Any], occurrences: Dict[Tuple, int]) -> Tuple:
+    if el.get("selector", "").startswith("[data-agent-id="):
+        return ("handle", el["selector"])
+    signature = tuple(
+        el.get(field) for field in ("tag", "text", "href", "type", "placeholder", "name", "label")
+    )
+    occurrence = occurrences.get(signature, 0)
+    occurrences[signature] = occurrence + 1
+    return ("content", signature, occurrence)
+
+
+def _element_content(el: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, v) for k, v in el.items() if k not in ("index", "selector", "nth", "signals", "frame")))
+
+
+class ObservationDiffer:
+    def __init__(
+        self,
+        max_diff_ratio: float = OBS_DIFF_MAX_RATIO,
+        serializer: Optional[VerboseSerializer] = None,
+    ):
+        self.max_diff_ratio = max_diff_ratio
+        self.serializer = serializer or get_serializer()
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.full_renders = 0
+        self.diff_renders = 0
+
+    def reset(self) -> None:
+        self.snapshot = None
+
+    def render(self, observation: Dict[str, Any]) -> Tuple[str, bool]:
+        previous = self.snapshot
+        if previous is None or previous["url"] != observation["url"]:
+            return self._render_full(observation), True
+
+        clickables = self._diff_elements(
+            previous["clickables"], observation["clickable_elements"]
+        )
+        inputs = self._diff_elements(previous["inputs"], observation.get("input_elements", []))
+        sections = split_text_sections(self.serializer.body(observation["body_text"]))
+
+        diff_text = self._format_diff(observation, previous, clickables, inputs, sections)
+        full_text = self.serializer.full(observation)
+        if len(diff_text) > self.max_diff_ratio * len(full_text):
+            return self._render_full(observation), True
+
+        self._remember(observation, clickables, inputs, sections)
+        self.diff_renders += 1
+        return diff_text, False
+
+    def _render_full(self, observation: Dict[str, Any]) -> str:
+        self.serializer.begin(observation)
+        self._remember(
+            observation,
+            self._assign_fresh(observation["clickable_elements"]),
+            self._assign_fresh(observation.get("input_elements", [])),
+            split_text_sections(self.serializer.body(observation["body_text"])),
+        )
+        self.full_renders += 1
+        return self.serializer.full(observation)
+
+    def _assign_fresh(self, elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+        mapping = {}
+        occurrences: Dict[Tuple, int] = {}
+        for i, el in enumerate(elements):
+            el["index"] = i
+            mapping[_element_key(el, occurrences)] = {
+                "index": i,
+                "content": _element_content(el),
+            }
+        return {"mapping": mapping, "next_index": len(elements)}
+
+    def _diff_elements(
+        self,
+        previous: Dict[str, Any],
+        elements: List[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        old_mapping = previous["mapping"]
+        next_index = previous["next_index"]
+        mapping = {}
+        occurrences: Dict[Tuple, int] = {}
+        added, changed = [], []
+
+        for el in elements:
+            key = _element_key(el, occurrences)
+            content = _element_content(el)
+            old = old_mapping.get(key)
+            if old is None:
+                el["index"] = next_index
+                next_index += 1
+                added.append(el)
+            else:
+                el["index"] = old["index"]
+                if old["content"] != content:
+                    changed.append(el)
+            mapping[key] = {"index": el["index"], "content": content}
+
+        removed = sorted(
+            old["index"] for key, old in old_mapping.items() if key not in mapping
+        )
+        return {
+            "mapping": mapping,
+            "next_index": next_index,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": len(elements) - len(added) - len(changed),
+        }
+
+    def _remember(
+        self,
+        observation: Dict[str, Any],
+        clickables: Dict[str, Any],
+        inputs: Dict[str, Any],
+        sections: List[str],
+    ) -> None:
+        self.snapshot = {
+            "url": observation["url"],
+            "title": observation["title"],
+            "clickables": {"mapping": clickables["mapping"], "next_index": clickables["next_index"]},
+            "inputs": {"mapping": inputs["mapping"], "next_index": inputs["next_index"]},
+            "sections": sections,
+        }
+
+    def _format_diff(
+        self,
+        observation: Dict[str, Any],
+        previous: Dict[str, Any],
+        clickables: Dict[str, Any],
+        inputs: Dict[str, Any],
+        sections: List[str],
+    ) -> str:
+        content = (
+            "Page update (same page as the previous observation, only changes are shown; "
+            "indices of unchanged elements stay the same):\n"
+            f"URL: {observation['url']}\n"
+        )
+        if observation["title"] != previous["title"]:
+            content += f"Title: {observation['title']}\n"
+
+        added_sections, removed_sections = [], []
+        matcher = SequenceMatcher(a=previous["sections"], b=sections, autojunk=False)
+        for op, a_start, a_end, b_start, b_end in matcher.get_opcodes():
+            if op in ("replace", "delete"):
+                removed_sections.extend(previous["sections"][a_start:a_end])
+            if op in ("replace", "insert"):
+                added_sections.extend(sections[b_start:b_end])
+
+        if removed_sections:
+            content += "Removed text:\n"
+            for section in removed_sections:
+                content += f"  - {section[:80]}\n"
+        if added_sections:
+            content += "Added text:\n"
+            for section in added_sections:
+                content += f"  + {section}\n"
+
+        for title, diff, formatter in (
+            (self.serializer.clickables_title, clickables, self.serializer.clickables),
+            (self.serializer.inputs_title, inputs, self.serializer.inputs),
+        ):
+            if diff["removed"]:
+                removed = ", ".join(f"[{i}]" for i in diff["removed"])
+                content += f"{title} removed: {removed}\n"
+            if diff["added"]:
+                content += f"{title} added:\n"
+                content += formatter(diff["added"])
+            if diff["changed"]:
+                content += f"{title} changed:\n"
+                content += formatter(diff["changed"])
+
+        if not (
+            added_sections
+            or removed_sections
+            or any(d["added"] or d["changed"] or d["removed"] for d in (clickables, inputs))
+        ):
+            content += "No changes since the previous observation.\n"
+
+        content += (
+            f"Unchanged: {clickables['unchanged']} clickable elements, "
+            f"{inputs['unchanged']} input elements, "
+            f"{len(sections) - len(added_sections)} text sections.\n"
+        )
+        return content
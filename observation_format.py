@@ -0,0 +1,199 @@
+import posixpath
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+from config import OBSERVATION_FORMAT, MAX_PAGE_TEXT_TOKENS
+from a11y_tree import render_a11y_tree
+from token_counter import truncate_to_tokens
+
+HREF_TABLE_MIN_USES = 2
+HREF_TABLE_MIN_PREFIX = 24
+
+
+def _frame_suffix(item: Dict[str, Any]) -> str:
+    return f" frame={item['frame']}" if item.get("frame") else ""
+
+
+class VerboseSerializer:
+    name = "verbose"
+    clickables_title = "Clickable elements (index, tag, text, href)"
+    inputs_title = "Input elements (index, type, placeholder, label, name)"
+
+    def __init__(self, max_text_tokens: int = MAX_PAGE_TEXT_TOKENS):
+        self.max_text_tokens = max_text_tokens
+
+    def begin(self, observation: Dict[str, Any]) -> None:
+        pass
+
+    def body(self, text: str) -> str:
+        return truncate_to_tokens(text, self.max_text_tokens)
+
+    def clickable(self, el: Dict[str, Any]) -> str:
+        return (
+            f"  [{el['index']}] <{el['tag']}> text='{el['text']}' href={el['href']}"
+            f"{_frame_suffix(el)}\n"
+        )
+
+    def input(self, inp: Dict[str, Any]) -> str:
+        return (
+            f"  [{inp['index']}] type={inp['type']} "
+            f"placeholder='{inp['placeholder']}' "
+            f"label='{inp['label']}' "
+            f"name='{inp['name']}'{_frame_suffix(inp)}\n"
+        )
+
+    def clickables(self, elements: List[Dict[str, Any]]) -> str:
+        return "".join(self.clickable(el) for el in elements)
+
+    def inputs(self, inputs: List[Dict[str, Any]]) -> str:
+        return "".join(self.input(inp) for inp in inputs)
+
+    def _header(self, observation: Dict[str, Any]) -> str:
+        return (
+            f"Current page:\n"
+            f"URL: {observation['url']}\n"
+            f"Title: {observation['title']}\n"
+        )
+
+    def _a11y(self, observation: Dict[str, Any]) -> str:
+        return self._header(observation) + (
+            "Accessibility tree ([n] = clickable element index, "
+            "[input n] = input element index):\n"
+        ) + render_a11y_tree(
+            observation["a11y_tree"],
+            observation["clickable_elements"],
+            observation.get("input_elements", []),
+        )
+
+    def full(self, observation: Dict[str, Any]) -> str:
+        if observation.get("a11y_tree") is not None:
+            return self._a11y(observation)
+        content = self._header(observation)
+        content += f"Body (truncated): {self.body(observation['body_text'])}\n\n"
+        content += f"{self.clickables_title}:\n"
+        content += self.clickables(observation["clickable_elements"])
+        content += f"\n{self.inputs_title}:\n"
+        content += self.inputs(observation.get("input_elements", []))
+        return content
+
+
+def _cell(value: Any) -> str:
+    return " ".join(str(value).split()).replace("|", "¦")
+
+
+def _index_ranges(indices: List[int]) -> str:
+    parts = []
+    start = prev = indices[0]
+    for index in indices[1:] + [None]:
+        if index is not None and index == prev + 1:
+            prev = index
+            continue
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+        if index is not None:
+            start = prev = index
+    return ",".join(parts)
+
+
+class CompactSerializer(VerboseSerializer):
+    name = "compact"
+    clickables_title = "Clickable elements (index|tag|text|href; identical elements share a row)"
+    inputs_title = "Input elements (index|type|fields)"
+
+    def __init__(self, max_text_tokens: int = MAX_PAGE_TEXT_TOKENS):
+        super().__init__(max_text_tokens)
+        self.origin = ""
+        self.href_table: Dict[str, str] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = urlparse(url or "")
+        return f"{parsed.scheme}://{parsed.netloc}" if parsed.netloc else ""
+
+    @staticmethod
+    def _prefix(href: str) -> str:
+        parsed = urlparse(href)
+        directory = posixpath.dirname(parsed.path)
+        return f"{parsed.scheme}://{parsed.netloc}{directory.rstrip('/')}/"
+
+    def begin(self, observation: Dict[str, Any]) -> None:
+        self.origin = self._origin(observation.get("url", ""))
+        counts: Counter = Counter()
+        for el in observation.get("clickable_elements", []):
+            href = el.get("href") or ""
+            if self._origin(href) and self._origin(href) != self.origin:
+                counts[self._prefix(href)] += 1
+        self.href_table = {}
+        for prefix, uses in counts.most_common():
+            if uses >= HREF_TABLE_MIN_USES and len(prefix) >= HREF_TABLE_MIN_PREFIX:
+                self.href_table[prefix] = f"~{len(self.href_table) + 1}/"
+
+    def short_href(self, href: Optional[str]) -> str:
+        if not href:
+            return ""
+        if self.origin and href.startswith(self.origin + "/"):
+            return href[len(self.origin):]
+        for prefix, alias in self.href_table.items():
+            if href.startswith(prefix):
+                return alias + href[len(prefix):]
+        return href
+
+    def _clickable_cells(self, el: Dict[str, Any]) -> Tuple[str, ...]:
+        cells = [
+            _cell(el.get("tag", "")),
+            _cell(el.get("text", "")),
+            _cell(self.short_href(el.get("href"))),
+        ]
+        if el.get("frame"):
+            cells.append(f"frame={el['frame']}")
+        while cells and not cells[-1]:
+            cells.pop()
+        return tuple(cells)
+
+    def clickable(self, el: Dict[str, Any]) -> str:
+        return "|".join((str(el["index"]),) + self._clickable_cells(el)) + "\n"
+
+    def input(self, inp: Dict[str, Any]) -> str:
+        cells = [str(inp["index"]), _cell(inp.get("type", ""))]
+        for field in ("label", "placeholder", "name"):
+            if inp.get(field):
+                cells.append(f"{field}={_cell(inp[field])}")
+        if inp.get("frame"):
+            cells.append(f"frame={inp['frame']}")
+        return "|".join(cells) + "\n"
+
+    def clickables(self, elements: List[Dict[str, Any]]) -> str:
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for el in elements:
+            groups.setdefault(self._clickable_cells(el), []).append(el["index"])
+        return "".join(
+            "|".join((_index_ranges(sorted(indices)),) + cells) + "\n"
+            for cells, indices in groups.items()
+        )
+
+    def full(self, observation: Dict[str, Any]) -> str:
+        if observation.get("a11y_tree") is not None:
+            return self._a11y(observation)
+        content = self._header(observation)
+        content += f"Body: {self.body(observation['body_text'])}\n\n"
+        if self.href_table:
+            aliases = " ".join(
+                f"{alias[:-1]}={prefix}" for prefix, alias in self.href_table.items()
+            )
+            content += f"Link prefixes: {aliases}\n"
+        content += f"{self.clickables_title}:\n"
+        content += self.clickables(observation["clickable_elements"])
+        content += f"\n{self.inputs_title}:\n"
+        content += self.inputs(observation.get("input_elements", []))
+        return content
+
+
+SERIALIZERS = {
+    VerboseSerializer.name: VerboseSerializer,
+    CompactSerializer.name: CompactSerializer,
+}
+
+
+def get_serializer(name: str = OBSERVATION_FORMAT) -> VerboseSerializer:
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown observation format {name!r}")
+    return SERIALIZERS[name]()
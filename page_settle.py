@@ -0,0 +1,313 @@
+import time
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+from playwright.sync_api import BrowserContext, Page, Request, Frame
+from config import (
+    SETTLE_MAX_MS,
+    SETTLE_MIN_MS,
+    SETTLE_DOM_QUIET_MS,
+    SETTLE_NETWORK_QUIET_MS,
+    SETTLE_POLL_MS,
+    SETTLE_LONG_REQUEST_MS,
+    SETTLE_SITE_OVERRIDES,
+)
+
+SETTLE_INIT_SCRIPT = """
+(() => {
+    if (window.__agentSettleInstalled) {
+        return;
+    }
+    window.__agentSettleInstalled = true;
+    window.__agentLastMutation = performance.now();
+    window.__agentDocId = Math.random().toString(36).slice(2);
+    window.__agentDomVersion = 0;
+    const observer = new MutationObserver((records) => {
+        for (const record of records) {
+            if (record.type === "attributes" && record.attributeName === "data-agent-id") {
+                continue;
+            }
+            window.__agentLastMutation = performance.now();
+            window.__agentDomVersion++;
+            return;
+        }
+    });
+    observer.observe(document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        characterData: true,
+    });
+})();
+"""
+
+DOM_IDLE_SCRIPT = """
+() => window.__agentLastMutation === undefined
+    ? null
+    : performance.now() - window.__agentLastMutation
+"""
+
+DOM_VERSION_SCRIPT = """
+() => window.__agentDomVersion === undefined
+    ? null
+    : [
+        window.__agentDocId,
+        window.__agentDomVersion,
+        Math.round(window.scrollX),
+        Math.round(window.scrollY),
+        window.innerWidth,
+        window.innerHeight,
+    ]
+"""
+
+IGNORED_RESOURCE_TYPES = ("websocket", "eventsource", "manifest")
+MAX_REPORTS = 200
+
+
+class PageSettler:
+    def __init__(
+        self,
+        context: BrowserContext,
+        max_ms: int = SETTLE_MAX_MS,
+        min_ms: int = SETTLE_MIN_MS,
+        dom_quiet_ms: int = SETTLE_DOM_QUIET_MS,
+        network_quiet_ms: int = SETTLE_NETWORK_QUIET_MS,
+        poll_ms: int = SETTLE_POLL_MS,
+        site_overrides: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        self.defaults = {
+            "max_ms": max_ms,
+            "min_ms": min_ms,
+            "dom_quiet_ms": dom_quiet_ms,
+            "network_quiet_ms": network_quiet_ms,
+            "poll_ms": poll_ms,
+        }
+        self.site_overrides = SETTLE_SITE_OVERRIDES if site_overrides is None else site_overrides
+
+        self.inflight: Dict[Request, Dict[str, Any]] = {}
+        self.created = time.monotonic()
+        self.last_network_activity: Dict[Page, float] = {}
+        self.last_navigation: Dict[Page, float] = {}
+        self.reports: List[Dict[str, Any]] = []
+
+        context.on("request", self._on_request)
+        context.on("requestfinished", self._on_request_done)
+        context.on("requestfailed", self._on_request_done)
+        context.on("page", self._watch_page)
+        for page in context.pages:
+            self._watch_page(page)
+        self._install_scripts(context)
+
+    def _install_scripts(self, context: BrowserContext) -> None:
+        context.add_init_script(SETTLE_INIT_SCRIPT)
+        for page in context.pages:
+            try:
+                page.evaluate(SETTLE_INIT_SCRIPT)
+            except Exception:
+                pass
+
+    def _watch_page(self, page: Page) -> None:
+        page.on("framenavigated", lambda frame: self._on_navigated(page, frame))
+        page.on("close", lambda _: self._forget_page(page))
+
+    def _forget_page(self, page: Page) -> None:
+        self.last_network_activity.pop(page, None)
+        self.last_navigation.pop(page, None)
+        for request in [r for r, info in self.inflight.items() if info["page"] is page]:
+            del self.inflight[request]
+
+    def _on_navigated(self, page: Page, frame: Frame) -> None:
+        if frame.parent_frame is None:
+            self.last_navigation[page] = time.monotonic()
+
+    def _on_request(self, request: Request) -> None:
+        if request.resource_type in IGNORED_RESOURCE_TYPES:
+            return
+        try:
+            page = request.frame.page
+        except Exception:
+            return
+        now = time.monotonic()
+        self.inflight[request] = {"page": page, "started": now}
+        self.last_network_activity[page] = now
+
+    def _on_request_done(self, request: Request) -> None:
+        info = self.inflight.pop(request, None)
+        if info is not None:
+            self.last_network_activity[info["page"]] = time.monotonic()
+
+    def _pending_requests(self, page: Page, now: float, long_request_ms: int) -> int:
+        count = 0
+        for info in self.inflight.values():
+            if info["page"] is not page:
+                continue
+            if (now - info["started"]) * 1000 >= long_request_ms:
+                continue
+            count += 1
+        return count
+
+    def _settings_for(self, url: str) -> Dict[str, int]:
+        settings = dict(self.defaults)
+        host = urlparse(url).hostname or ""
+        for suffix, overrides in self.site_overrides.items():
+            if host == suffix or host.endswith("." + suffix):
+                settings.update(overrides)
+        return settings
+
+    def mark(self) -> float:
+        return time.monotonic()
+
+    def _begin(self, page: Page, reason: str, since: Optional[float]) -> Dict[str, Any]:
+        started = time.monotonic()
+        try:
+            url = page.url
+        except Exception:
+            url = ""
+        settings = self._settings_for(url)
+        return {
+            "reason": reason,
+            "url": url,
+            "settings": settings,
+            "started": started,
+            "since": started if since is None else since,
+            "deadline": started + settings["max_ms"] / 1000,
+            "waited_for": set(),
+            "timed_out": False,
+            "navigated": False,
+            "network_quiet": False,
+            "pending": 0,
+        }
+
+    def _remaining_ms(self, state: Dict[str, Any]) -> int:
+        return max(1, int((state["deadline"] - time.monotonic()) * 1000))
+
+    def _next_action(self, state: Dict[str, Any], page: Page) -> str:
+        now = time.monotonic()
+        if now >= state["deadline"]:
+            state["timed_out"] = True
+            return "done"
+
+        if not state["navigated"] and self.last_navigation.get(page, 0.0) >= state["since"]:
+            state["navigated"] = True
+            state["waited_for"].add("navigation")
+            return "navigation"
+
+        state["pending"] = self._pending_requests(page, now, SETTLE_LONG_REQUEST_MS)
+        state["network_quiet"] = (
+            state["pending"] == 0
+            and (now - self.last_network_activity.get(page, self.created)) * 1000
+            >= state["settings"]["network_quiet_ms"]
+        )
+        if not state["network_quiet"]:
+            state["waited_for"].add("network")
+        return "check_dom"
+
+    def _is_quiet(self, state: Dict[str, Any], dom_idle_ms: Optional[float]) -> bool:
+        dom_quiet = dom_idle_ms is not None and dom_idle_ms >= state["settings"]["dom_quiet_ms"]
+        if not dom_quiet:
+            state["waited_for"].add("dom")
+        elapsed_ms = (time.monotonic() - state["started"]) * 1000
+        return state["network_quiet"] and dom_quiet and elapsed_ms >= state["settings"]["min_ms"]
+
+    def _finish(self, state: Dict[str, Any], page: Page) -> Dict[str, Any]:
+        try:
+            url = page.url
+        except Exception:
+            url = state["url"]
+        report = {
+            "reason": state["reason"],
+            "url": url,
+            "elapsed_ms": round((time.monotonic() - state["started"]) * 1000, 1),
+            "waited_for": sorted(state["waited_for"]),
+            "navigated": state["navigated"],
+            "timed_out": state["timed_out"],
+            "pending_requests": state["pending"],
+        }
+        self.reports.append(report)
+        if len(self.reports) > MAX_REPORTS:
+            self.reports = self.reports[-MAX_REPORTS:]
+        return report
+
+    def settle(self, page: Page, reason: str, since: Optional[float] = None) -> Dict[str, Any]:
+        state = self._begin(page, reason, since)
+        while True:
+            action = self._next_action(state, page)
+            if action == "done":
+                break
+            if action == "navigation":
+                try:
+                    page.wait_for_load_state("domcontentloaded", timeout=self._remaining_ms(state))
+                except Exception:
+                    state["timed_out"] = True
+                    break
+                continue
+
+            try:
+                dom_idle_ms = page.evaluate(DOM_IDLE_SCRIPT)
+            except Exception:
+                dom_idle_ms = None
+            if self._is_quiet(state, dom_idle_ms):
+                break
+
+            try:
+                page.wait_for_timeout(state["settings"]["poll_ms"])
+            except Exception:
+                break
+        return self._finish(state, page)
+
+    def stats_by_host(self) -> Dict[str, Dict[str, Any]]:
+        stats: Dict[str, Dict[str, Any]] = {}
+        for report in self.reports:
+            host = urlparse(report["url"]).hostname or ""
+            entry = stats.setdefault(
+                host, {"settles": 0, "total_ms": 0.0, "max_ms": 0.0, "timeouts": 0}
+            )
+            entry["settles"] += 1
+            entry["total_ms"] += report["elapsed_ms"]
+            entry["max_ms"] = max(entry["max_ms"], report["elapsed_ms"])
+            if report["timed_out"]:
+                entry["timeouts"] += 1
+        for entry in stats.values():
+            entry["avg_ms"] = round(entry["total_ms"] / entry["settles"], 1)
+        return stats
+
+
+class AsyncPageSettler(PageSettler):
+    def _install_scripts(self, context: BrowserContext) -> None:
+        pass
+
+    async def install_scripts(self, context) -> None:
+        await context.add_init_script(SETTLE_INIT_SCRIPT)
+        for page in context.pages:
+            try:
+                await page.evaluate(SETTLE_INIT_SCRIPT)
+            except Exception:
+                pass
+
+    async def settle(self, page, reason: str, since: Optional[float] = None) -> Dict[str, Any]:
+        state = self._begin(page, reason, since)
+        while True:
+            action = self._next_action(state, page)
+            if action == "done":
+                break
+            if action == "navigation":
+                try:
+                    await page.wait_for_load_state(
+                        "domcontentloaded", timeout=self._remaining_ms(state)
+                    )
+                except Exception:
+                    state["timed_out"] = True
+                    break
+                continue
+
+            try:
+                dom_idle_ms = await page.evaluate(DOM_IDLE_SCRIPT)
+            except Exception:
+                dom_idle_ms = None
+            if self._is_quiet(state, dom_idle_ms):
+                break
+
+            try:
+                await page.wait_for_timeout(state["settings"]["poll_ms"])
+            except Exception:
+                break
+        return self._finish(state, page)
@@ -0,0 +1,82 @@
+import json
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+
+def _complete_arguments(arguments: str) -> bool:
+    try:
+        return isinstance(json.loads(arguments), dict)
+    except ValueError:
+        return False
+
+
+class ToolCallStream:
+    def __init__(self):
+        self.content_parts: List[str] = []
+        self.calls: Dict[int, Dict[str, Any]] = {}
+        self.ready: List[Any] = []
+        self.finish_reason: Optional[str] = None
+        self.usage = None
+        self.chunks = 0
+
+    def _tool_call(self, index: int):
+        call = self.calls[index]
+        return SimpleNamespace(
+            id=call["id"] or f"call_{index}",
+            type="function",
+            function=SimpleNamespace(name=call["name"], arguments=call["arguments"]),
+        )
+
+    def _take_ready(self, stream_done: bool) -> List[Any]:
+        taken = []
+        while len(self.ready) in self.calls:
+            index = len(self.ready)
+            call = self.calls[index]
+            complete = stream_done or (
+                call["name"]
+                and (index + 1 in self.calls or _complete_arguments(call["arguments"]))
+            )
+            if not complete:
+                break
+            tool_call = self._tool_call(index)
+            self.ready.append(tool_call)
+            taken.append(tool_call)
+        return taken
+
+    def feed(self, chunk) -> List[Any]:
+        self.chunks += 1
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        for choice in getattr(chunk, "choices", None) or []:
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            delta = choice.delta
+            if delta is None:
+                continue
+            if delta.content:
+                self.content_parts.append(delta.content)
+            for part in delta.tool_calls or []:
+                call = self.calls.setdefault(part.index, {"id": None, "name": "", "arguments": ""})
+                if part.id:
+                    call["id"] = part.id
+                function = part.function
+                if function is not None:
+                    if function.name:
+                        call["name"] += function.name
+                    if function.arguments:
+                        call["arguments"] += function.arguments
+        return self._take_ready(stream_done=False)
+
+    def finish(self) -> List[Any]:
+        return self._take_ready(stream_done=True)
+
+    def response(self):
+        message = SimpleNamespace(
+            role="assistant",
+            content="".join(self.content_parts) or None,
+            tool_calls=list(self.ready) or None,
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason=self.finish_reason)],
+            usage=self.usage,
+        )
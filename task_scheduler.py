@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, Optional
+from playwright.async_api import async_playwright
+from config import (
+    AGENT_CONCURRENCY,
+    SCHEDULER_HEADLESS,
+    PROFILE_SNAPSHOT_PATH,
+    TRAJECTORY_CACHE_ENABLED,
+)
+from async_agent import AsyncAutonomousAgent
+from context_pool import ContextPool, load_snapshot
+from llm_client import AsyncLLMClient
+from approvals import ApprovalQueue
+from trajectory_cache import TrajectoryCache
+
+
+class TaskScheduler:
+    def __init__(
+        self,
+        concurrency: int = AGENT_CONCURRENCY,
+        headless: bool = SCHEDULER_HEADLESS,
+        snapshot_path: str = PROFILE_SNAPSHOT_PATH,
+        pool_size: Optional[int] = None,
+        approvals: Optional[ApprovalQueue] = None,
+        trajectory_cache: Optional[TrajectoryCache] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.headless = headless
+        self.snapshot_path = snapshot_path
+        self.pool_size = pool_size
+        self.approvals = approvals
+        if trajectory_cache is None and TRAJECTORY_CACHE_ENABLED:
+            trajectory_cache = TrajectoryCache()
+        self.trajectory_cache = trajectory_cache
+        self.pool_stats: Dict[str, Any] = {}
+        self.llm_stats: Dict[str, Any] = {}
+
+    async def run_tasks(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        client = AsyncLLMClient()
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            pool = ContextPool(
+                browser,
+                size=self.pool_size or min(self.concurrency, len(tasks)) or 1,
+                storage_state=load_snapshot(self.snapshot_path),
+            )
+            try:
+                await pool.start()
+                return await asyncio.gather(
+                    *(
+                        self._run_task(task_id, task, pool, client, semaphore)
+                        for task_id, task in enumerate(tasks)
+                    )
+                )
+            finally:
+                self.pool_stats = pool.stats()
+                self.llm_stats = client.snapshot()
+                await pool.close()
+                await browser.close()
+                await client.close()
+
+    async def _run_task(
+        self,
+        task_id: int,
+        task: str,
+        pool: ContextPool,
+        client: AsyncLLMClient,
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.perf_counter()
+            result: Dict[str, Any] = {"task_id": task_id, "task": task}
+            controller = None
+            try:
+                controller = await pool.acquire()
+                approver = self.approvals.for_task(task_id) if self.approvals else None
+                agent = AsyncAutonomousAgent(
+                    controller,
+                    client=client,
+                    approver=approver,
+                    trajectory_cache=self.trajectory_cache,
+                )
+                agent.log_prefix = f"[TASK {task_id}] "
+                result.update(await agent.run(task))
+            except Exception as e:
+                result.update({"status": "error", "error": str(e)})
+            finally:
+                if controller is not None:
+                    await pool.release(controller)
+            result["elapsed_s"] = round(time.perf_counter() - started, 2)
+            return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many agent tasks concurrently.")
+    parser.add_argument("tasks_file", help="Text file with one task per line.")
+    parser.add_argument("--concurrency", type=int, default=AGENT_CONCURRENCY)
+    parser.add_argument("--pool-size", type=int, default=None)
+    parser.add_argument("--headed", action="store_true", help="Show browser windows.")
+    args = parser.parse_args()
+
+    with open(args.tasks_file, encoding="utf-8") as f:
+        tasks = [line.strip() for line in f if line.strip()]
+
+    scheduler = TaskScheduler(
+        concurrency=args.concurrency,
+        headless=not args.headed,
+        pool_size=args.pool_size,
+    )
+    results = asyncio.run(scheduler.run_tasks(tasks))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"[POOL] {scheduler.pool_stats}")
+    print(f"[LLM] {scheduler.llm_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional, Tuple
+from playwright.async_api import async_playwright
+from config import (
+    AGENT_CONCURRENCY,
+    SCHEDULER_HEADLESS,
+    PROFILE_SNAPSHOT_PATH,
+    TASK_SERVER_HOST,
+    TASK_SERVER_PORT,
+    APPROVAL_POLICY,
+)
+from approvals import ApprovalQueue, load_policy
+from context_pool import ContextPool, load_snapshot
+from llm_client import AsyncLLMClient
+from task_scheduler import TaskScheduler
+
+
+class TaskServer(TaskScheduler):
+    def __init__(
+        self,
+        concurrency: int = AGENT_CONCURRENCY,
+        headless: bool = SCHEDULER_HEADLESS,
+        snapshot_path: str = PROFILE_SNAPSHOT_PATH,
+        pool_size: Optional[int] = None,
+        approvals: Optional[ApprovalQueue] = None,
+    ):
+        super().__init__(
+            concurrency=concurrency,
+            headless=headless,
+            snapshot_path=snapshot_path,
+            pool_size=pool_size,
+            approvals=approvals or ApprovalQueue(),
+        )
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.running = 0
+        self.started = time.time()
+        self._pool: Optional[ContextPool] = None
+        self._client: Optional[AsyncLLMClient] = None
+        self._lock = threading.Lock()
+
+    def submit(self, task: str) -> str:
+        if self.loop is None:
+            raise RuntimeError("Task server is not running")
+        task_id = uuid.uuid4().hex[:8]
+        with self._lock:
+            self.records[task_id] = {
+                "task_id": task_id,
+                "task": task,
+                "status": "queued",
+                "submitted": time.time(),
+            }
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.queue.put_nowait(task_id)
+        else:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, task_id)
+        return task_id
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self.records.get(task_id)
+            return dict(record) if record is not None else None
+
+    def list_tasks(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"task_id": r["task_id"], "task": r["task"], "status": r["status"]}
+                for r in self.records.values()
+            ]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses: Dict[str, int] = {}
+            for record in self.records.values():
+                statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "running": self.running,
+            "tasks": statuses,
+            "approvals": self.approvals.metrics(),
+            "pool": self._pool.stats() if self._pool is not None else {},
+            "llm": self._client.snapshot() if self._client is not None else {},
+        }
+
+    async def _worker(
+        self, pool: ContextPool, client: AsyncLLMClient, semaphore: asyncio.Semaphore
+    ) -> None:
+        while True:
+            task_id = await self.queue.get()
+            with self._lock:
+                record = self.records[task_id]
+                record["status"] = "running"
+                record["started"] = time.time()
+            self.running += 1
+            try:
+                result = await self._run_task(task_id, record["task"], pool, client, semaphore)
+            finally:
+                self.running -= 1
+                self.queue.task_done()
+            with self._lock:
+                record.update(result)
+                record["finished"] = time.time()
+
+    async def serve(
+        self,
+        initial_tasks: List[str] = (),
+        address: Optional[Tuple[str, int]] = (TASK_SERVER_HOST, TASK_SERVER_PORT),
+        exit_when_idle: bool = False,
+    ) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        client = AsyncLLMClient()
+        http_server = start_http_server(self, address) if address else None
+        workers: List[asyncio.Task] = []
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            pool = ContextPool(
+                browser,
+                size=self.pool_size or self.concurrency,
+                storage_state=load_snapshot(self.snapshot_path),
+            )
+            try:
+                await pool.start()
+                self._pool, self._client = pool, client
+                workers = [
+                    asyncio.create_task(self._worker(pool, client, semaphore))
+                    for _ in range(self.concurrency)
+                ]
+                for task in initial_tasks:
+                    self.submit(task)
+                if exit_when_idle:
+                    await self.queue.join()
+                else:
+                    await asyncio.Event().wait()
+            finally:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if http_server is not None:
+                    http_server.shutdown()
+                self.pool_stats = pool.stats()
+                self.llm_stats = client.snapshot()
+                self._pool = self._client = None
+                await pool.close()
+                await browser.close()
+                await client.close()
+
+
+class _TaskServerHandler(BaseHTTPRequestHandler):
+    server_version = "AgentTaskServer/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length).decode("utf-8"))
+        return data if isinstance(data, dict) else {}
+
+    def _parts(self) -> List[str]:
+        return [part for part in self.path.split("?", 1)[0].split("/") if part]
+
+    def do_GET(self):
+        app: TaskServer = self.server.app
+        parts = self._parts()
+        if parts == ["metrics"]:
+            self._send(200, app.metrics())
+        elif parts == ["tasks"]:
+            self._send(200, app.list_tasks())
+        elif len(parts) == 2 and parts[0] == "tasks":
+            record = app.get_task(parts[1])
+            if record is None:
+                self._send(404, {"error": "unknown task"})
+            else:
+                self._send(200, record)
+        elif parts == ["approvals"]:
+            self._send(200, app.approvals.list_pending())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        app: TaskServer = self.server.app
+        parts = self._parts()
+        try:
+            body = self._json_body()
+        except ValueError:
+            self._send(400, {"error": "invalid JSON"})
+            return
+
+        if parts == ["tasks"]:
+            task = (body.get("task") or "").strip()
+            if not task:
+                self._send(400, {"error": "task is required"})
+                return
+            self._send(202, {"task_id": app.submit(task)})
+        elif len(parts) == 2 and parts[0] == "approvals":
+            if app.approvals.resolve(parts[1], bool(body.get("approve"))):
+                self._send(200, {"id": parts[1], "approve": bool(body.get("approve"))})
+            else:
+                self._send(404, {"error": "unknown or already resolved approval"})
+        else:
+            self._send(404, {"error": "not found"})
+
+
+def start_http_server(app: TaskServer, address: Tuple[str, int]) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(address, _TaskServerHandler)
+    server.app = app
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    print(f"[SERVER] Listening on http://{host}:{port}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the agent as an unattended task server.")
+    parser.add_argument("--host", default=TASK_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=TASK_SERVER_PORT)
+    parser.add_argument("--no-http", action="store_true", help="Only run tasks from --tasks-file.")
+    parser.add_argument("--tasks-file", help="Text file with one task per line to enqueue.")
+    parser.add_argument("--exit-when-idle", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=AGENT_CONCURRENCY)
+    parser.add_argument("--pool-size", type=int, default=None)
+    parser.add_argument("--headed", action="store_true", help="Show browser windows.")
+    parser.add_argument(
+        "--approval-policy",
+        default=APPROVAL_POLICY,
+        help="ask (queue for POST /approvals/<id>), allow, deny or module:function",
+    )
+    args = parser.parse_args()
+
+    tasks: List[str] = []
+    if args.tasks_file:
+        with open(args.tasks_file, encoding="utf-8") as f:
+            tasks = [line.strip() for line in f if line.strip()]
+
+    policy = args.approval_policy
+    if args.no_http and policy == "ask":
+        print("[SERVER] --no-http leaves no way to answer approvals; sensitive actions are denied")
+        policy = "deny"
+
+    server = TaskServer(
+        concurrency=args.concurrency,
+        headless=not args.headed,
+        pool_size=args.pool_size,
+        approvals=ApprovalQueue(load_policy(policy)),
+    )
+    try:
+        asyncio.run(
+            server.serve(
+                tasks,
+                address=None if args.no_http else (args.host, args.port),
+                exit_when_idle=args.exit_when_idle,
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.metrics(), ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from a11y_tree import build_a11y_state
+
+SNAPSHOT = """
+- main:
+  - button "Menu"
+  - button
+  - button "Add to cart"
+  - button
+  - button "Add to cart"
+  - link "Home":
+    - /url: /
+  - link
+"""
+
+
+def _clickables():
+    return build_a11y_state(
+        SNAPSHOT, max_elements=50, max_inputs=10, max_text_chars=1000
+    )["clickable_elements"]
+
+
+def test_unnamed_nodes_count_nth_across_all_names_of_the_role():
+    buttons = [el for el in _clickables() if el["role"] == "button"]
+    assert [(el["accessible_name"], el["nth"]) for el in buttons] == [
+        ("Menu", 0),
+        ("", 1),
+        ("Add to cart", 0),
+        ("", 3),
+        ("Add to cart", 1),
+    ]
+
+
+def test_unnamed_link_after_named_link():
+    links = [el for el in _clickables() if el["role"] == "link"]
+    assert [(el["accessible_name"], el["nth"]) for el in links] == [("Home", 0), ("", 1)]
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+import pytest
+
+from approvals import ApprovalQueue, deny_policy, ask_policy, load_policy
+
+
+def test_builtin_policies_decide_without_queueing():
+    queue = ApprovalQueue(policy=deny_policy)
+    assert asyncio.run(queue.request("click_element", {"index": 1})) is False
+    assert queue.stats["policy_denied"] == 1
+    assert queue.list_pending() == []
+    assert load_policy("allow")("navigate", {}) is True
+
+
+def test_resolve_from_another_thread_answers_the_waiting_task():
+    queue = ApprovalQueue(policy=ask_policy, timeout_s=5)
+
+    async def scenario():
+        waiter = asyncio.create_task(queue.request("submit_order", {}, task_id=7))
+        while not queue.list_pending():
+            await asyncio.sleep(0.01)
+        [entry] = queue.list_pending()
+        assert entry["task_id"] == 7
+        thread = threading.Thread(target=queue.resolve, args=(entry["id"], True))
+        thread.start()
+        approved = await waiter
+        thread.join()
+        assert queue.resolve(entry["id"], False) is False
+        return approved
+
+    assert asyncio.run(scenario()) is True
+    metrics = queue.metrics()
+    assert metrics["approved"] == 1
+    assert metrics["pending"] == 0
+    assert metrics["max_pending"] == 1
+    assert "latency_ms_p50" in metrics
+
+
+def test_unanswered_request_expires_as_denied():
+    queue = ApprovalQueue(policy=ask_policy, timeout_s=0.05)
+    assert asyncio.run(queue.request("pay", {})) is False
+    assert queue.stats["expired"] == 1
+
+
+def test_custom_policy_is_loaded_by_module_path():
+    assert load_policy("approvals:deny_policy") is deny_policy
+    with pytest.raises(ModuleNotFoundError):
+        load_policy("no_such_module:policy")
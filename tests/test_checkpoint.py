@@ -0,0 +1,56 @@
+import os
+import stat
+
+from checkpoint import CheckpointStore
+
+STORAGE = {"cookies": [{"name": "session", "value": "secret"}], "origins": []}
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_torn_line_is_ignored_and_truncated_on_reopen(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints"), fsync=False)
+    checkpoint = store.create("order a burger")
+    checkpoint.step(1, {"tool": "navigate"}, [], "https://shop.example/", STORAGE)
+    checkpoint.close()
+    path = store.path(checkpoint.run_id)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "step", "step": 2, "tu')
+
+    state = store.load(checkpoint.run_id)
+    assert state["step"] == 1
+    assert state["storage_state"] == STORAGE
+    assert state["valid_bytes"] < os.path.getsize(path)
+
+    reopened = store.reopen(state)
+    reopened.step(2, {"tool": "click"}, [], "https://shop.example/", STORAGE)
+    reopened.finish("finished")
+
+    state = store.load(checkpoint.run_id)
+    assert state["step"] == 2
+    assert [turn["tool"] for turn in state["turns"]] == ["navigate", "click"]
+    assert state["status"] == "finished"
+    assert reopened.stats["storage_writes"] == 0
+
+
+def test_checkpoint_files_are_private(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints"), fsync=False)
+    checkpoint = store.create("task")
+    checkpoint.close()
+    assert _mode(store.directory) == 0o700
+    assert _mode(store.path(checkpoint.run_id)) == 0o600
+
+
+def test_latest_skips_finished_runs(tmp_path):
+    store = CheckpointStore(str(tmp_path), fsync=False)
+    interrupted = store.create("first task")
+    interrupted.close()
+    finished = store.create("second task")
+    finished.finish("finished")
+    os.utime(store.path(interrupted.run_id), (1, 1))
+
+    assert store.latest() == interrupted.run_id
+    assert store.latest("second task") is None
+    assert store.latest("first task") == interrupted.run_id
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from dom_extractor import evaluate_in_frames, frame_versions
+
+
+class FakeImplFrame:
+    def __init__(self, name, delay_s):
+        self.name = name
+        self.delay_s = delay_s
+
+    async def evaluate(self, expression, arg=None):
+        await asyncio.sleep(self.delay_s)
+        return {"value": self.name, "version": [1, 2]}
+
+
+class FakeFrame:
+    def __init__(self, name, delay_s):
+        self._impl_obj = FakeImplFrame(name, delay_s)
+
+    def _sync(self, coro):
+        return asyncio.run(coro)
+
+
+def test_slow_frame_does_not_starve_the_others():
+    frames = [FakeFrame("slow", 2), FakeFrame("a", 0.01), FakeFrame("b", 0.01)]
+    started = time.perf_counter()
+    results = evaluate_in_frames(frames, "() => null", None, timeout_ms=200)
+    assert time.perf_counter() - started < 1
+    assert [result and result["value"] for result in results] == [None, "a", "b"]
+    assert frame_versions(results) == ((), (1, 2), (1, 2))
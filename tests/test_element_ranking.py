@@ -0,0 +1,32 @@
+import element_ranking
+from element_ranking import rank_elements
+
+
+def _elements(count):
+    return [
+        {
+            "index": i,
+            "tag": "a",
+            "text": f"Бургер классический с сыром {i}",
+            "href": f"/product/{i}",
+            "signals": {},
+        }
+        for i in range(count)
+    ]
+
+
+def test_ranking_counts_tokens_once_per_block_and_respects_budget(monkeypatch):
+    calls = []
+
+    def dense_tokenizer(text):
+        calls.append(text)
+        return len(text) // 2
+
+    monkeypatch.setattr(element_ranking, "count_tokens", dense_tokenizer)
+    elements = _elements(1000)
+    kept, stats = rank_elements(elements, "закажи бургер 7", token_budget=500)
+
+    assert stats["tokens"] <= 500
+    assert stats["kept"] == len(kept) > 0
+    assert len(calls) <= 3
+    assert elements[7] in kept
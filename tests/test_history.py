@@ -0,0 +1,45 @@
+from history import ConversationHistory, message_tokens
+
+
+def _history(steps, full_every=5, budget=2000):
+    history = ConversationHistory("system", "User task: test", token_budget=budget)
+    for step in range(1, steps + 1):
+        full = step % full_every == 1
+        page = ("full page " if full else "diff ") + "x" * 800
+        history.start_turn(step, {"url": f"https://site/{step}", "title": ""}, page, full)
+        history.add_message({"role": "assistant", "content": f"step {step}"})
+        history.add_action({"tool": "click_element", "args": {"index": step}}, f"clicked {step}")
+    return history
+
+
+def test_build_compacts_old_turns_into_a_summary_within_budget():
+    history = _history(20)
+    messages = history.build()
+
+    assert sum(message_tokens(m) for m in messages) <= history.token_budget
+    assert history.compacted_turns > 0
+    summary = messages[2]["content"]
+    assert summary.startswith("Earlier steps (observations compacted):")
+    assert "'index': 1}" in summary
+    assert messages[-1]["content"] == "step 20"
+
+
+def test_most_recent_full_turn_is_never_compacted():
+    history = _history(19, budget=900)
+    history.build()
+    assert history.turns[0]["full"]
+    assert history.turns[0]["step"] == 16
+
+
+def test_small_history_is_not_compacted():
+    history = _history(2, budget=10000)
+    messages = history.build()
+    assert history.compacted_turns == 0
+    assert len(messages) == 2 + 2 * 2
+
+
+def test_needs_full_observation_without_a_full_turn():
+    history = ConversationHistory("system", "task")
+    assert history.needs_full_observation()
+    history.start_turn(1, {"url": "u"}, "full page", True)
+    assert not history.needs_full_observation()
@@ -0,0 +1,52 @@
+from memory import ProgressMonitor, state_fingerprint
+
+
+def _observation(step=0):
+    return {
+        "url": "https://shop.example/checkout",
+        "body_text": f"Checkout\nDelivery in {30 - step} min\nTotal {1000 + step} ₽",
+        "clickable_elements": [{"tag": "button", "text": "Pay", "href": None}],
+        "input_elements": [{"type": "text", "placeholder": "Address", "label": ""}],
+    }
+
+
+def _run(actions):
+    monitor = ProgressMonitor()
+    for step, (tool, args) in enumerate(actions, 1):
+        reason = monitor.observe(step, _observation(step))
+        if reason:
+            return step, reason
+        monitor.record_action(tool, args, "ok")
+    return None
+
+
+def test_live_counters_do_not_change_the_state():
+    assert state_fingerprint(_observation(1)) == state_fingerprint(_observation(2))
+    changed = dict(_observation(1), clickable_elements=[{"tag": "a", "text": "Cart"}])
+    assert state_fingerprint(changed) != state_fingerprint(_observation(1))
+
+
+def test_filling_form_fields_is_not_a_stall():
+    actions = [("type_into_input_index", {"index": i, "text": "x"}) for i in range(8)]
+    actions.append(("press_key", {"key": "Tab"}))
+    actions.append(("explore_links", {"indices": [1]}))
+    assert _run(actions) is None
+
+
+def test_clicks_that_leave_the_page_unchanged_stall():
+    result = _run([("click_element", {"index": i}) for i in range(10)])
+    assert result is not None
+    assert "No progress" in result[1]
+
+
+def test_blocked_repeats_reset_after_a_new_action():
+    monitor = ProgressMonitor(block_repeats=1)
+    monitor.observe(1, _observation())
+    monitor.record_action("click_element", {"index": 0}, "ok")
+    assert monitor.check_action("click_element", {"index": 0})
+    monitor.record_action("scroll", {"direction": "down"}, "ok")
+    monitor.observe(2, {"url": "https://shop.example/cart"})
+    monitor.observe(3, _observation())
+    assert monitor.check_action("click_element", {"index": 0})
+    assert monitor.blocked_repeats == 1
+    assert monitor.observe(4, _observation()) is None
@@ -0,0 +1,63 @@
+import pytest
+
+from model_router import ModelRouter, page_stage
+
+MENU = {"url": "https://shop.example/menu", "title": "Menu"}
+CART = {"url": "https://shop.example/cart", "title": "Your order"}
+
+
+def _router(**kwargs):
+    return ModelRouter(
+        fast_model="fast",
+        strong_model="strong",
+        escalate_on=["tool_error", "stage_change", "stall"],
+        strong_steps=2,
+        enabled=True,
+        **kwargs,
+    )
+
+
+def test_tool_error_escalates_for_strong_steps_then_returns_to_fast():
+    router = _router()
+    assert router.choose(MENU) == "fast"
+    router.note_tool_result("ERROR: element not found")
+    assert [router.choose(MENU) for _ in range(3)] == ["strong", "strong", "fast"]
+    assert router.snapshot()["reasons"] == {"tool_error": 1}
+    assert router.escalation_rate() == 0.25
+
+
+def test_stage_change_escalates_and_disabled_reasons_are_ignored():
+    router = _router()
+    router.choose(MENU)
+    router.escalate("invalid_json")
+    assert router.choose(MENU) == "fast"
+    assert router.choose(CART) == "strong"
+    assert router.reasons == {"stage_change": 1}
+
+    router.reset()
+    assert router.choose(CART) == "fast"
+
+
+def test_page_stage_prefers_keywords_over_host():
+    assert page_stage(CART) == "cart"
+    assert page_stage({"url": "https://eda.example/r/1", "title": "Оформление заказа"}) == "оформ"
+    assert page_stage(MENU) == "shop.example"
+
+
+def test_router_validates_reasons_and_disables_for_single_model():
+    with pytest.raises(ValueError):
+        ModelRouter(escalate_on=["bad_reason"])
+    router = ModelRouter(fast_model="same", strong_model="same", enabled=True)
+    router.escalate("tool_error")
+    assert router.choose(MENU) == "same"
+    assert router.decisions == 0
+
+
+def test_record_aggregates_usage_per_model():
+    router = _router()
+    router.record("fast", 100.0, {"prompt_tokens": 10, "completion_tokens": 2})
+    router.record("fast", 300.0, {"prompt_tokens": 20, "cached_tokens": 5})
+    stats = router.snapshot()["models"]["fast"]
+    assert stats["calls"] == 2
+    assert stats["latency_ms_avg"] == 200.0
+    assert (stats["prompt_tokens"], stats["completion_tokens"], stats["cached_tokens"]) == (30, 2, 5)
@@ -0,0 +1,46 @@
+from observation_cache import ObservationCache
+
+KEY = (1, "script", "https://shop.example/", (), ("doc", 4, 0, 0, 1280, 720))
+
+
+def _observation():
+    return {
+        "url": "https://shop.example/",
+        "title": "Shop",
+        "body_text": "Shop",
+        "clickable_elements": [{"index": 0, "tag": "a", "text": "Menu"}],
+        "input_elements": [],
+    }
+
+
+def test_hit_returns_a_copy_of_the_stored_observation():
+    cache = ObservationCache()
+    cache.store(KEY, _observation())
+
+    first = cache.lookup(KEY)
+    first["clickable_elements"].append({"index": 1})
+    second = cache.lookup(KEY)
+    assert len(second["clickable_elements"]) == 1
+    assert cache.lookup(KEY[:-1] + (("doc", 5, 0, 0, 1280, 720),)) is None
+    assert cache.stats == {"hits": 2, "misses": 1, "invalidations": 0}
+
+
+def test_frame_versions_must_match_when_frames_were_stored():
+    cache = ObservationCache()
+    cache.store(KEY, _observation(), (("frame", 1),))
+    assert cache.needs_frame_versions(KEY)
+    assert cache.lookup(KEY, (("frame", 2),)) is None
+    assert cache.lookup(KEY, (("frame", 1),)) is not None
+
+
+def test_disabled_cache_or_missing_key_never_hits():
+    cache = ObservationCache(enabled=False)
+    cache.store(KEY, _observation())
+    assert cache.lookup(KEY) is None
+
+    cache = ObservationCache()
+    cache.store(KEY, _observation())
+    cache.store(None, _observation())
+    assert cache.lookup(KEY) is None
+    assert cache.stats["invalidations"] == 1
+    assert cache.hit_rate() == 0.0
@@ -0,0 +1,59 @@
+from observation_diff import ObservationDiffer
+from observation_format import VerboseSerializer
+
+
+MENU = tuple(f"Dish {n}" for n in range(20))
+
+
+def _observation(url="https://shop.example/menu", buttons=MENU):
+    return {
+        "url": url,
+        "title": "Menu",
+        "body_text": "Menu\n" + "\n".join(f"{name} - fresh and hot" for name in buttons),
+        "clickable_elements": [
+            {"tag": "button", "text": text, "href": None, "selector": ""} for text in buttons
+        ],
+        "input_elements": [],
+    }
+
+
+def _differ():
+    return ObservationDiffer(max_diff_ratio=0.9, serializer=VerboseSerializer())
+
+
+def test_first_render_is_full_then_diffs_keep_indices():
+    differ = _differ()
+    _, full = differ.render(_observation())
+    assert full
+
+    observation = _observation(buttons=MENU[:1] + MENU[2:] + ("Shake",))
+    content, full = differ.render(observation)
+    assert not full
+    assert "removed: [1]" in content
+    assert "[20] <button> text='Shake'" in content
+    indices = [el["index"] for el in observation["clickable_elements"]]
+    assert indices == [0] + list(range(2, 21))
+
+
+def test_unchanged_page_reports_no_changes():
+    differ = _differ()
+    differ.render(_observation())
+    content, full = differ.render(_observation())
+    assert not full
+    assert "No changes since the previous observation." in content
+
+
+def test_resync_on_navigation_reset_or_large_diff():
+    differ = _differ()
+    differ.render(_observation())
+    assert differ.render(_observation(url="https://shop.example/cart"))[1]
+
+    differ.reset()
+    assert differ.render(_observation(url="https://shop.example/cart"))[1]
+
+    differ.max_diff_ratio = 0.1
+    changed = _observation(url="https://shop.example/cart", buttons=("Pay", "Back"))
+    content, full = differ.render(changed)
+    assert full
+    assert content.startswith("Current page:")
+    assert [el["index"] for el in changed["clickable_elements"]] == [0, 1]
@@ -0,0 +1,85 @@
+import pytest
+
+from observation_format import CompactSerializer, get_serializer
+
+PAGE = "https://shop.example/catalog"
+CDN = "https://static.partner-images.example/catalog/items/"
+
+
+def _observation():
+    clickables = [
+        {"tag": "a", "text": "Home", "href": "https://shop.example/"},
+        {"tag": "button", "text": "Add | to cart", "href": None},
+        {"tag": "button", "text": "Add | to cart", "href": None},
+        {"tag": "button", "text": "Add | to cart", "href": None},
+        {"tag": "a", "text": "Photo 1", "href": CDN + "1.jpg"},
+        {"tag": "a", "text": "Photo 2", "href": CDN + "2.jpg"},
+        {"tag": "a", "text": "Docs", "href": "https://docs.example/"},
+        {"tag": "button", "text": "Add | to cart", "href": None},
+    ]
+    for index, el in enumerate(clickables):
+        el["index"] = index
+    return {
+        "url": PAGE,
+        "title": "Catalog",
+        "body_text": "Catalog",
+        "clickable_elements": clickables,
+        "input_elements": [],
+    }
+
+
+def _expand(indices):
+    for part in indices.split(","):
+        start, _, end = part.partition("-")
+        yield from range(int(start), int(end or start) + 1)
+
+
+def _parse(text):
+    lines = text.splitlines()
+    aliases = {}
+    for line in lines:
+        if line.startswith("Link prefixes: "):
+            for item in line[len("Link prefixes: "):].split():
+                alias, _, prefix = item.partition("=")
+                aliases[alias + "/"] = prefix
+    start = next(i for i, line in enumerate(lines) if line.startswith("Clickable elements")) + 1
+    rows = {}
+    for line in lines[start:]:
+        if not line:
+            break
+        indices, *cells = line.split("|")
+        cells += [""] * (3 - len(cells))
+        tag, text, href = cells
+        for alias, prefix in aliases.items():
+            if href.startswith(alias):
+                href = prefix + href[len(alias):]
+        if href.startswith("/"):
+            href = "https://shop.example" + href
+        for index in _expand(indices):
+            rows[index] = (tag, text, href or None)
+    return rows
+
+
+def test_compact_rows_round_trip_to_elements():
+    observation = _observation()
+    serializer = CompactSerializer()
+    serializer.begin(observation)
+    text = serializer.full(observation)
+
+    assert "1-3,7|button|Add ¦ to cart\n" in text
+    assert "|/\n" in text
+    assert f"~1={CDN}" in text
+    assert "~1/1.jpg" in text
+
+    rows = _parse(text)
+    expected = {
+        el["index"]: (el["tag"], el["text"].replace("|", "¦"), el["href"])
+        for el in observation["clickable_elements"]
+    }
+    assert rows == expected
+
+
+def test_get_serializer_rejects_unknown_format():
+    assert isinstance(get_serializer("compact"), CompactSerializer)
+    with pytest.raises(ValueError):
+        get_serializer("yaml")
@@ -0,0 +1,58 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from page_settle import PageSettler
+
+
+class FakeEmitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, arg):
+        for handler in self.handlers.get(event, []):
+            handler(arg)
+
+
+class FakeContext(FakeEmitter):
+    pages = []
+
+    def add_init_script(self, script):
+        pass
+
+
+class FakeRequest:
+    resource_type = "xhr"
+
+    def __init__(self, page):
+        self.frame = SimpleNamespace(page=page)
+
+
+def test_background_page_traffic_does_not_block_foreground_settle():
+    context = FakeContext()
+    settler = PageSettler(context, network_quiet_ms=50)
+    foreground, background = FakeEmitter(), FakeEmitter()
+    context.emit("page", foreground)
+    context.emit("page", background)
+
+    context.emit("request", FakeRequest(background))
+    time.sleep(0.06)
+    finished = FakeRequest(background)
+    context.emit("request", finished)
+    context.emit("requestfinished", finished)
+    state = settler._begin(foreground, "click", None)
+    assert settler._next_action(state, foreground) == "check_dom"
+    assert state["network_quiet"] and state["pending"] == 0
+
+    background_state = settler._begin(background, "click", None)
+    settler._next_action(background_state, background)
+    assert background_state["pending"] == 1
+
+    background.emit("close", background)
+    assert not settler.inflight
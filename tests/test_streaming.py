@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+from streaming import ToolCallStream
+
+
+def _chunk(content=None, tool_calls=None, finish_reason=None, usage=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    choice = SimpleNamespace(index=0, delta=delta, finish_reason=finish_reason)
+    return SimpleNamespace(choices=[choice], usage=usage)
+
+
+def _part(index, arguments, name=None, call_id=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=call_id, function=function)
+
+
+def test_call_is_released_once_its_arguments_parse():
+    stream = ToolCallStream()
+    assert stream.feed(_chunk(tool_calls=[_part(0, '{"ind', "click_element", "call_a")])) == []
+    assert stream.feed(_chunk(tool_calls=[_part(0, 'ex": 3')])) == []
+    released = stream.feed(_chunk(tool_calls=[_part(0, "}")]))
+    assert [(c.id, c.function.name, c.function.arguments) for c in released] == [
+        ("call_a", "click_element", '{"index": 3}')
+    ]
+    assert stream.feed(_chunk(tool_calls=[_part(0, "")])) == []
+
+
+def test_next_call_start_releases_the_previous_one():
+    stream = ToolCallStream()
+    stream.feed(_chunk(tool_calls=[_part(0, "not json", "scroll")]))
+    released = stream.feed(_chunk(tool_calls=[_part(1, '{"url": "htt', "navigate")]))
+    assert [c.function.name for c in released] == ["scroll"]
+    assert released[0].id == "call_0"
+
+    rest = stream.finish()
+    assert [c.function.name for c in rest] == ["navigate"]
+    assert [c.function.name for c in stream.ready] == ["scroll", "navigate"]
+
+
+def test_response_assembles_content_calls_and_usage():
+    stream = ToolCallStream()
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=4)
+    stream.feed(_chunk(content="Opening "))
+    stream.feed(_chunk(content="the cart", tool_calls=[_part(0, "{}", "open_cart")]))
+    stream.feed(_chunk(finish_reason="tool_calls"))
+    stream.feed(SimpleNamespace(choices=[], usage=usage))
+    stream.finish()
+
+    response = stream.response()
+    message = response.choices[0].message
+    assert message.content == "Opening the cart"
+    assert [c.function.name for c in message.tool_calls] == ["open_cart"]
+    assert response.choices[0].finish_reason == "tool_calls"
+    assert response.usage is usage
+    assert stream.chunks == 4
+
+
+def test_empty_stream_has_no_tool_calls():
+    stream = ToolCallStream()
+    stream.feed(_chunk(content="Done", finish_reason="stop"))
+    assert stream.finish() == []
+    assert stream.response().choices[0].message.tool_calls is None
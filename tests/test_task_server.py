@@ -0,0 +1,105 @@
+import json
+import sys
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("openai")
+
+import task_server
+
+
+class FakeBrowser:
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = self
+
+    async def launch(self, headless=True):
+        return FakeBrowser()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self, browser, size, storage_state=None):
+        pass
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class FakeClient:
+    def snapshot(self):
+        return {}
+
+    async def close(self):
+        pass
+
+
+async def fake_run_task(self, task_id, task, pool, client, semaphore):
+    return {"status": "finished", "summary": task}
+
+
+async def approving_run_task(self, task_id, task, pool, client, semaphore):
+    approved = await self.approvals.for_task(task_id).approve_async("click_element", {})
+    return {"status": "finished" if approved else "denied", "summary": task}
+
+
+def _serve(tmp_path, monkeypatch, capsys, run_task, *args):
+    tasks_file = tmp_path / "tasks.txt"
+    tasks_file.write_text("first task\n\nsecond task\nthird task\n", encoding="utf-8")
+    monkeypatch.setattr(task_server, "async_playwright", FakePlaywright)
+    monkeypatch.setattr(task_server, "ContextPool", FakePool)
+    monkeypatch.setattr(task_server, "AsyncLLMClient", FakeClient)
+    monkeypatch.setattr(task_server, "load_snapshot", lambda path: None)
+    monkeypatch.setattr(task_server.TaskServer, "_run_task", run_task)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "task_server.py",
+            "--tasks-file",
+            str(tasks_file),
+            "--no-http",
+            "--exit-when-idle",
+            "--concurrency",
+            "2",
+            *args,
+        ],
+    )
+
+    task_server.main()
+
+    out = capsys.readouterr().out
+    return out, json.loads(out[out.index("{\n"):])
+
+
+def test_exit_when_idle_drains_tasks_file(tmp_path, monkeypatch, capsys):
+    _, metrics = _serve(
+        tmp_path, monkeypatch, capsys, fake_run_task, "--approval-policy", "deny"
+    )
+    assert metrics["tasks"] == {"finished": 3}
+    assert metrics["queue_depth"] == 0
+
+
+def test_ask_policy_without_http_denies_instead_of_waiting(tmp_path, monkeypatch, capsys):
+    out, metrics = _serve(
+        tmp_path, monkeypatch, capsys, approving_run_task, "--approval-policy", "ask"
+    )
+    assert "sensitive actions are denied" in out
+    assert metrics["tasks"] == {"denied": 3}
+    assert metrics["approvals"]["policy_denied"] == 3
@@ -0,0 +1,38 @@
+from trajectory_cache import TrajectoryCache
+
+OBSERVATION = {
+    "url": "https://shop.example/catalog",
+    "clickable_elements": [
+        {"index": 0, "tag": "a", "text": "Burgers"},
+        {"index": 1, "tag": "button", "text": "Add to cart"},
+    ],
+    "input_elements": [],
+}
+
+
+def _record(cache, task, start_url):
+    session = cache.start_run(task, start_url)
+    session.record(OBSERVATION, "click_element", {"index": 1}, "Clicked element 1")
+    session.finish(True)
+
+
+def test_replay_requires_same_parameters_and_start_host():
+    cache = TrajectoryCache(path=None)
+    _record(cache, "Order 1.5 kg of beef", "https://shop.example/")
+
+    assert not cache.start_run("Order 15 kg of beef", "https://shop.example/").replaying
+    assert not cache.start_run("Order 1.5 kg of beef", "https://other.example/").replaying
+
+    session = cache.start_run("order 1.5 kg of beef!", "https://shop.example/")
+    assert session.next_replay(OBSERVATION) == ("click_element", {"index": 1})
+
+
+def test_caches_sharing_a_file_merge_entries(tmp_path):
+    path = str(tmp_path / "trajectories.json")
+    first, second = TrajectoryCache(path=path), TrajectoryCache(path=path)
+    _record(first, "first task", "")
+    _record(second, "second task", "")
+
+    merged = TrajectoryCache(path=path)
+    assert merged.start_run("first task").replaying
+    assert merged.start_run("second task").replaying
@@ -0,0 +1,55 @@
+from functools import lru_cache
+from typing import Optional, Any
+from config import OPENAI_MODEL, TOKENIZER_FALLBACK_ENCODING
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+_encoding: Optional[Any] = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    _encoding_loaded = True
+    if tiktoken is None:
+        return None
+    try:
+        _encoding = tiktoken.encoding_for_model(OPENAI_MODEL)
+    except KeyError:
+        try:
+            _encoding = tiktoken.get_encoding(TOKENIZER_FALLBACK_ENCODING)
+        except Exception:
+            _encoding = None
+    except Exception:
+        _encoding = None
+    return _encoding
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = get_encoding()
+    if encoding is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def tokenizer_name() -> str:
+    encoding = get_encoding()
+    return encoding.name if encoding is not None else f"chars/{CHARS_PER_TOKEN}"
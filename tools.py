@@ -1,6 +1,7 @@
-from typing import Any, Dict
-from config import SECURITY_CONFIRM_WORDS
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from config import SECURITY_CONFIRM_WORDS, EXPLORE_MAX_TABS
 from browser_controller import BrowserController
+from approvals import ConsoleApprover
 
 
 def is_potentially_destructive(action_name: str, params: Dict[str, Any]) -> bool:
@@ -49,6 +50,32 @@ def get_tool_schemas():
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "explore_links",
+                "description": (
+                    "Preview several candidate links in one step: open them in background tabs, "
+                    "and get the title, final URL and a short text excerpt of each page. "
+                    "The current page stays open and unchanged. Use it on list or search "
+                    "pages to compare candidates in one step instead of opening them one by one."
+                ),
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "indices": {
+                            "type": "array",
+                            "items": {"type": "integer"},
+                            "description": (
+                                "Indices of link elements from clickable_elements "
+                                f"(at most {EXPLORE_MAX_TABS} are opened)."
+                            ),
+                        }
+                    },
+                    "required": ["indices"],
+                },
+            },
+        },
         {
             "type": "function",
             "function": {
@@ -141,58 +168,117 @@ def get_tool_schemas():
     ]
 
 
-def execute_tool(
+def format_explore_results(results: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"Explored {len(results)} links in background tabs; the current page is unchanged."
+    ]
+    for item in results:
+        if "error" in item:
+            lines.append(f"[{item['index']}] {item['href']} - failed to load: {item['error']}")
+            continue
+        partial = " (still loading, partial content)" if item["partial"] else ""
+        lines.append(f"[{item['index']}] {item['title']} - {item['url']}{partial}")
+        lines.append(f"    {item['text']}")
+    return "\n".join(lines)
+
+
+def _plan_tool(
     browser: BrowserController, tool_name: str, tool_args: Dict[str, Any]
-) -> str:
-    if is_potentially_destructive(tool_name, tool_args):
-        answer = input(
-            f"[SECURITY] Модель хочет выполнить потенциально опасное действие "
-            f"{tool_name}({tool_args}). Разрешить? [y/N]: "
-        ).strip().lower()
-        if answer not in ("y", "yes", "д", "да"):
-            return "User denied destructive action."
+) -> Tuple[Optional[Callable[[], Any]], Union[str, Callable[[Any], str]]]:
+    if tool_name == "navigate":
+        return (
+            lambda: browser.goto(tool_args["url"]),
+            f"Navigated to {tool_args['url']}",
+        )
 
-    try:
-        if tool_name == "navigate":
-            browser.goto(tool_args["url"])
-            return f"Navigated to {tool_args['url']}"
+    elif tool_name == "click_element":
+        return (
+            lambda: browser.click_by_element_index(tool_args["index"]),
+            f"Clicked element with index {tool_args['index']}",
+        )
 
-        elif tool_name == "click_element":
-            browser.click_by_element_index(tool_args["index"])
-            return f"Clicked element with index {tool_args['index']}"
+    elif tool_name == "explore_links":
+        return (
+            lambda: browser.explore_links(tool_args["indices"]),
+            format_explore_results,
+        )
 
-        elif tool_name == "type_into_selector":
-            browser.type_text(
+    elif tool_name == "type_into_selector":
+        return (
+            lambda: browser.type_text(
                 tool_args["selector"],
                 tool_args["text"],
                 tool_args.get("press_enter", False),
-            )
-            return (
+            ),
+            (
                 f"Typed into {tool_args['selector']} text='{tool_args['text']}' "
                 f"press_enter={tool_args.get('press_enter', False)}"
-            )
+            ),
+        )
 
-        elif tool_name == "type_into_input_index":
-            browser.type_into_input_index(
+    elif tool_name == "type_into_input_index":
+        return (
+            lambda: browser.type_into_input_index(
                 tool_args["index"],
                 tool_args["text"],
                 tool_args.get("press_enter", False),
-            )
-            return (
+            ),
+            (
                 f"Typed into input index {tool_args['index']} "
                 f"text='{tool_args['text']}' "
                 f"press_enter={tool_args.get('press_enter', False)}"
-            )
+            ),
+        )
+
+    elif tool_name == "press_key":
+        return (
+            lambda: browser.press_key(tool_args["key"]),
+            f"Pressed key {tool_args['key']}",
+        )
+
+    elif tool_name == "finish_task":
+        return None, f"TASK_FINISHED: {tool_args['summary']}"
+
+    else:
+        return None, f"Unknown tool {tool_name}"
+
 
-        elif tool_name == "press_key":
-            browser.press_key(tool_args["key"])
-            return f"Pressed key {tool_args['key']}"
+def execute_tool(
+    browser: BrowserController,
+    tool_name: str,
+    tool_args: Dict[str, Any],
+    approver: Optional[Any] = None,
+) -> str:
+    if is_potentially_destructive(tool_name, tool_args):
+        if not (approver or ConsoleApprover()).approve(tool_name, tool_args):
+            return "User denied destructive action."
 
-        elif tool_name == "finish_task":
-            return f"TASK_FINISHED: {tool_args['summary']}"
+    try:
+        action, result = _plan_tool(browser, tool_name, tool_args)
+        if action is not None:
+            output = action()
+            if callable(result):
+                return result(output)
+        return result
 
-        else:
-            return f"Unknown tool {tool_name}"
+    except Exception as e:
+        return f"ERROR executing {tool_name}: {e}"
+
+
+async def execute_tool_async(
+    browser, tool_name: str, tool_args: Dict[str, Any], approver: Optional[Any] = None
+) -> str:
+    if is_potentially_destructive(tool_name, tool_args):
+        if not await (approver or ConsoleApprover()).approve_async(tool_name, tool_args):
+            return "User denied destructive action."
+
+    try:
+        action, result = _plan_tool(browser, tool_name, tool_args)
+        if action is not None:
+            output = await action()
+            if callable(result):
+                return result(output)
+        return result
 
     except Exception as e:
         return f"ERROR executing {tool_name}: {e}"
@@ -0,0 +1,239 @@
+import argparse
+import contextvars
+import importlib
+import json
+import os
+import time
+import uuid
+from typing import List, Dict, Any, Callable, Optional
+from config import TRACE_ENABLED, TRACE_DIR, TRACE_EXPORTERS
+
+Exporter = Callable[[Dict[str, Any]], None]
+
+
+class _NullSpan:
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class RunTrace:
+    def __init__(self, tracer: "Tracer", task: str, run_id: Optional[str] = None):
+        self.tracer = tracer
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.started = time.perf_counter()
+        self.step = 0
+        self.next_span_id = 1
+        self.path = None
+        self.file = None
+        if tracer.trace_dir:
+            os.makedirs(tracer.trace_dir, exist_ok=True)
+            self.path = os.path.join(tracer.trace_dir, f"{self.run_id}.jsonl")
+            self.file = open(self.path, "w", encoding="utf-8", buffering=1)
+        self.emit({"type": "run_start", "task": task, "time": time.time()})
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        record["run"] = self.run_id
+        if self.file is not None:
+            self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        for exporter in self.tracer.exporters:
+            try:
+                exporter(record)
+            except Exception as e:
+                print(f"[TRACE] Exporter {exporter!r} failed: {e}")
+
+    def close(self, status: str) -> None:
+        self.emit({"type": "run_end", "status": status, "duration_ms": self.elapsed_ms()})
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+_current_run: contextvars.ContextVar[Optional[RunTrace]] = contextvars.ContextVar(
+    "trace_run", default=None
+)
+_current_span: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "trace_span", default=None
+)
+
+
+class Span:
+    def __init__(self, run: RunTrace, name: str, attrs: Dict[str, Any]):
+        self.run = run
+        self.name = name
+        self.attrs = attrs
+        self.span_id = run.next_span_id
+        run.next_span_id += 1
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        self.step = self.run.step
+        self.start_ms = self.run.elapsed_ms()
+        self._token = _current_span.set(self.span_id)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.run.emit(
+            {
+                "type": "span",
+                "id": self.span_id,
+                "parent": self.parent,
+                "step": self.step,
+                "name": self.name,
+                "start_ms": round(self.start_ms, 3),
+                "duration_ms": round(self.run.elapsed_ms() - self.start_ms, 3),
+                "attrs": self.attrs,
+            }
+        )
+        return False
+
+
+class Tracer:
+    def __init__(
+        self,
+        enabled: bool = TRACE_ENABLED,
+        trace_dir: Optional[str] = TRACE_DIR,
+        exporters: Optional[List[Exporter]] = None,
+    ):
+        self.enabled = enabled
+        self.trace_dir = trace_dir
+        self.exporters: List[Exporter] = list(exporters or [])
+
+    def add_exporter(self, exporter: Exporter) -> None:
+        self.exporters.append(exporter)
+
+    def start_run(self, task: str, run_id: Optional[str] = None) -> Optional[RunTrace]:
+        if not self.enabled:
+            return None
+        run = RunTrace(self, task, run_id)
+        _current_run.set(run)
+        return run
+
+    def end_run(self, status: str) -> None:
+        run = _current_run.get()
+        if run is None:
+            return
+        run.close(status)
+        _current_run.set(None)
+
+    def set_step(self, step: int) -> None:
+        run = _current_run.get()
+        if run is not None:
+            run.step = step
+
+    def span(self, name: str, **attrs):
+        run = _current_run.get()
+        if run is None:
+            return NULL_SPAN
+        return Span(run, name, attrs)
+
+    def event(self, name: str, **attrs) -> None:
+        run = _current_run.get()
+        if run is None:
+            return
+        run.emit(
+            {
+                "type": "event",
+                "parent": _current_span.get(),
+                "step": run.step,
+                "name": name,
+                "at_ms": round(run.elapsed_ms(), 3),
+                "attrs": attrs,
+            }
+        )
+
+
+def load_exporter(path: str) -> Exporter:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def llm_usage(response) -> Dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None),
+        "completion_tokens": getattr(usage, "completion_tokens", None),
+        "cached_tokens": getattr(details, "cached_tokens", None) if details else None,
+    }
+
+
+tracer = Tracer(exporters=[load_exporter(path) for path in TRACE_EXPORTERS])
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_trace(records: List[Dict[str, Any]], top: int = 3) -> List[Dict[str, Any]]:
+    steps: Dict[int, Dict[str, Any]] = {}
+    for record in records:
+        if record.get("type") != "span":
+            continue
+        step = steps.setdefault(record["step"], {"step": record["step"], "phases": {}, "total_ms": 0.0})
+        phases = step["phases"]
+        phases[record["name"]] = phases.get(record["name"], 0.0) + record["duration_ms"]
+        if record["parent"] is None:
+            step["total_ms"] += record["duration_ms"]
+        if record["name"] == "model":
+            step["prompt_tokens"] = record["attrs"].get("prompt_tokens")
+            step["cached_tokens"] = record["attrs"].get("cached_tokens")
+
+    summary = []
+    for step in sorted(steps.values(), key=lambda s: s["step"]):
+        slowest = sorted(step["phases"].items(), key=lambda item: item[1], reverse=True)
+        step["slowest"] = slowest[:top]
+        summary.append(step)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize an agent trace")
+    parser.add_argument("trace", help="Path to a traces/<run>.jsonl file")
+    parser.add_argument("--top", type=int, default=3, help="Slowest phases to show per step")
+    args = parser.parse_args()
+
+    records = load_trace(args.trace)
+    for record in records:
+        if record.get("type") == "run_start":
+            print(f"Task: {record['task']}")
+        elif record.get("type") == "run_end":
+            print(f"Status: {record['status']}, {record['duration_ms']:.0f} ms total")
+
+    totals: Dict[str, float] = {}
+    for step in summarize_trace(records, args.top):
+        slowest = ", ".join(f"{name} {ms:.0f} ms" for name, ms in step["slowest"])
+        tokens = ""
+        if step.get("prompt_tokens") is not None:
+            tokens = f" | prompt {step['prompt_tokens']} tok, cached {step.get('cached_tokens') or 0}"
+        print(f"  step {step['step']:>3}: {step['total_ms']:>8.0f} ms | {slowest}{tokens}")
+        for name, ms in step["phases"].items():
+            totals[name] = totals.get(name, 0.0) + ms
+
+    print("Totals by phase:")
+    for name, ms in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<16}{ms:>10.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+from config import (
+    TRAJECTORY_CACHE_PATH,
+    TRAJECTORY_CACHE_MAX_ENTRIES,
+    TRAJECTORY_CACHE_TTL_S,
+    TRAJECTORY_MIN_SIMILARITY,
+)
+
+CACHE_VERSION = 2
+FINGERPRINT_ELEMENTS = 40
+INDEX_TOOLS = {"click_element": "clickable", "type_into_input_index": "input"}
+NOT_REPLAYED_TOOLS = ("finish_task", "explore_links")
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (text or "").lower())).strip()
+
+
+def task_key(task: str, start_url: str = "") -> str:
+    # Normalization drops punctuation, so quantities and house numbers are kept verbatim.
+    params = " ".join(re.findall(r"\d+(?:[.,:/-]\d+)*", task or ""))
+    host = urlparse(start_url or "").hostname or ""
+    return f"{host}|{normalize_text(task)}|{params}"
+
+
+def url_pattern(url: str) -> str:
+    parsed = urlparse(url or "")
+    segments = []
+    for segment in parsed.path.split("/"):
+        if re.search(r"\d", segment) and re.fullmatch(r"[\w-]+", segment) and len(segment) > 2:
+            segment = "*"
+        segments.append(segment)
+    return f"{parsed.hostname or ''}{'/'.join(segments)}"
+
+
+def page_fingerprint(observation: Dict[str, Any]) -> List[str]:
+    texts = set()
+    for el in observation.get("clickable_elements", [])[:FINGERPRINT_ELEMENTS]:
+        text = normalize_text(el.get("text", ""))
+        if text:
+            texts.add(text)
+    for inp in observation.get("input_elements", []):
+        text = normalize_text(inp.get("placeholder") or inp.get("label") or inp.get("name") or "")
+        if text:
+            texts.add(f"input:{text}")
+    return sorted(texts)
+
+
+def fingerprint_similarity(a: List[str], b: List[str]) -> float:
+    set_a, set_b = set(a), set(b)
+    if not set_a and not set_b:
+        return 1.0
+    return len(set_a & set_b) / len(set_a | set_b)
+
+
+def describe_clickable(el: Dict[str, Any], elements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    text = normalize_text(el.get("text", ""))
+    same = [
+        e
+        for e in elements
+        if e.get("tag") == el.get("tag") and normalize_text(e.get("text", "")) == text
+    ]
+    return {
+        "tag": el.get("tag"),
+        "text": text,
+        "occurrence": next((i for i, e in enumerate(same) if e is el), 0),
+    }
+
+
+def describe_input(inp: Dict[str, Any], inputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    desc = {
+        field: normalize_text(inp.get(field, ""))
+        for field in ("type", "placeholder", "name", "label")
+    }
+    same = [i for i in inputs if _input_matches(i, desc)]
+    desc["occurrence"] = next((n for n, i in enumerate(same) if i is inp), 0)
+    return desc
+
+
+def _input_matches(inp: Dict[str, Any], desc: Dict[str, Any]) -> bool:
+    return all(
+        normalize_text(inp.get(field, "")) == desc[field]
+        for field in ("type", "placeholder", "name", "label")
+    )
+
+
+def resolve_element(desc: Dict[str, Any], kind: str, observation: Dict[str, Any]) -> Optional[int]:
+    if kind == "clickable":
+        candidates = [
+            el
+            for el in observation.get("clickable_elements", [])
+            if el.get("tag") == desc["tag"] and normalize_text(el.get("text", "")) == desc["text"]
+        ]
+    else:
+        candidates = [
+            inp for inp in observation.get("input_elements", []) if _input_matches(inp, desc)
+        ]
+    if not candidates:
+        return None
+    occurrence = min(desc.get("occurrence", 0), len(candidates) - 1)
+    return candidates[occurrence]["index"]
+
+
+def _find_by_index(items: List[Dict[str, Any]], index: Any) -> Optional[Dict[str, Any]]:
+    for item in items:
+        if item.get("index") == index:
+            return item
+    return None
+
+
+class TrajectorySession:
+    def __init__(self, cache: "TrajectoryCache", task_key: str, entry: Optional[Dict[str, Any]]):
+        self.cache = cache
+        self.task_key = task_key
+        self.replay_steps = list(entry["steps"]) if entry else []
+        self.replaying = bool(self.replay_steps)
+        self.cursor = 0
+        self.recorded: List[Dict[str, Any]] = []
+        self.replayed = 0
+
+    def next_replay(self, observation: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        if not self.replaying:
+            return None
+        while self.cursor < len(self.replay_steps) and (
+            self.replay_steps[self.cursor]["tool"] in NOT_REPLAYED_TOOLS
+        ):
+            self.cursor += 1
+        if self.cursor >= len(self.replay_steps):
+            self.replaying = False
+            return None
+
+        expected = self.replay_steps[self.cursor]
+        args = dict(expected["args"])
+        matched = (
+            expected["url_pattern"] == url_pattern(observation.get("url", ""))
+            and fingerprint_similarity(expected["fingerprint"], page_fingerprint(observation))
+            >= TRAJECTORY_MIN_SIMILARITY
+        )
+        if matched and expected["tool"] in INDEX_TOOLS:
+            index = resolve_element(expected["element"], INDEX_TOOLS[expected["tool"]], observation)
+            if index is None:
+                matched = False
+            else:
+                args["index"] = index
+
+        if not matched:
+            self.replaying = False
+            self.cache.stats["misses"] += 1
+            return None
+
+        self.cursor += 1
+        self.replayed += 1
+        self.cache.stats["hits"] += 1
+        return expected["tool"], args
+
+    def record(
+        self,
+        observation: Dict[str, Any],
+        tool_name: str,
+        args: Dict[str, Any],
+        result_text: str,
+    ) -> None:
+        if result_text.startswith(("ERROR", "User denied", "Unknown tool", "Skipped")):
+            return
+        step = {
+            "url_pattern": url_pattern(observation.get("url", "")),
+            "fingerprint": page_fingerprint(observation),
+            "tool": tool_name,
+            "args": {k: v for k, v in args.items() if k != "index"},
+            "element": None,
+        }
+        if tool_name == "click_element":
+            elements = observation.get("clickable_elements", [])
+            el = _find_by_index(elements, args.get("index"))
+            if el is None:
+                return
+            step["element"] = describe_clickable(el, elements)
+        elif tool_name == "type_into_input_index":
+            inputs = observation.get("input_elements", [])
+            inp = _find_by_index(inputs, args.get("index"))
+            if inp is None:
+                return
+            step["element"] = describe_input(inp, inputs)
+        self.recorded.append(step)
+
+    def finish(self, success: bool) -> None:
+        if success and self.recorded:
+            self.cache.store(self.task_key, self.recorded)
+
+
+class TrajectoryCache:
+    def __init__(
+        self,
+        path: Optional[str] = TRAJECTORY_CACHE_PATH,
+        max_entries: int = TRAJECTORY_CACHE_MAX_ENTRIES,
+        ttl_s: float = TRAJECTORY_CACHE_TTL_S,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def _load(self) -> None:
+        self.entries = self._read()
+        self._evict()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            for key, entry in self._read().items():
+                current = self.entries.get(key)
+                if current is None or entry["last_used"] > current["last_used"]:
+                    self.entries[key] = entry
+            self._evict()
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": CACHE_VERSION, "entries": self.entries},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+
+    def _evict(self) -> None:
+        now = time.time()
+        expired = [
+            key for key, entry in self.entries.items() if now - entry["last_used"] > self.ttl_s
+        ]
+        for key in expired:
+            del self.entries[key]
+        overflow = len(self.entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self.entries, key=lambda key: self.entries[key]["last_used"])
+            for key in oldest[:overflow]:
+                del self.entries[key]
+            expired.extend(oldest[:overflow])
+        self.stats["evicted"] += len(expired)
+
+    def start_run(self, task: str, start_url: str = "") -> TrajectorySession:
+        key = task_key(task, start_url)
+        self._evict()
+        self.stats["lookups"] += 1
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry["last_used"] = time.time()
+        return TrajectorySession(self, key, entry)
+
+    def store(self, task_key: str, steps: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        self.entries[task_key] = {"created": now, "last_used": now, "steps": steps}
+        self.stats["stored"] += 1
+        self._evict()
+        self._save()
+
+    def hit_rate(self) -> float:
+        attempts = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / attempts if attempts else 0.0